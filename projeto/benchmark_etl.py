@@ -0,0 +1,358 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import resource
+import tempfile
+import itertools
+import subprocess
+import contextlib
+from datetime import datetime
+
+# Cenários medidos. Cada um roda em um processo próprio, com um diretório de
+# resultados temporário e o provedor sintético, sem acesso à rede.
+CENARIOS = {
+    'etl': "ETL completo (main_process.main) com universo fictício",
+    'acoes': "baixar_historico_acoes",
+    'cripto': "baixar_historico_cripto",
+    'cambio': "baixar_historico_cambio",
+    'indices': "buscar_dados_economicos",
+    'ibrx50': "processar_ibrx50",
+    'escrita': "gravação do histórico em CSV e Parquet",
+}
+
+# Cenários com universo fixo, que não variam com o número de símbolos.
+CENARIOS_UNIVERSO_FIXO = ('cripto', 'cambio', 'indices')
+
+# Cenários dos carregadores de histórico, medidos também sem lotes
+# (tamanho_lote=1, um ticker por requisição) para que os workers façam diferença.
+CENARIOS_COM_LOTE = ('acoes', 'cripto', 'cambio')
+
+SIMBOLOS_PADRAO = [50, 500]
+ANOS_PADRAO = [1, 10]
+WORKERS_PADRAO_BENCHMARK = [1, 8]
+TAMANHOS_LOTE_PADRAO = [25, 1]
+
+# Latência simulada de cada requisição ao provedor sintético, em segundos.
+# Sem ela as requisições são instantâneas e a concorrência não aparece nos tempos.
+LATENCIA_PADRAO = 0.05
+
+
+def _get_results_dir():
+    """
+    Retorna o diretório de resultados do projeto.
+    """
+    return os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'results'))
+
+
+def _bytes_gravados(diretorio):
+    """
+    Soma o tamanho de todos os arquivos gravados no diretório.
+    """
+    total = 0
+    for raiz, _, arquivos in os.walk(diretorio):
+        for arquivo in arquivos:
+            total += os.path.getsize(os.path.join(raiz, arquivo))
+    return total
+
+
+def _preparar_cenario(cenario, simbolos, anos, workers, tamanho_lote=None, latencia=0.0):
+    """
+    Prepara um cenário no processo atual (importações, provedor e dados de
+    entrada) e devolve a função a ser medida, que retorna o número de linhas
+    produzidas. Deve ser chamado com PUCINVEST_RESULTS_DIR apontando para um
+    diretório vazio.
+    """
+    import pandas as pd
+    from etl.provedores import ProvedorSintetico, definir_provedor_mercado
+    from etl.armazenamento import ler_historico, EscritorHistorico
+    from etl.acoes import baixar_historico_acoes
+    from etl.criptomoedas import baixar_historico_cripto
+    from etl.cambio import baixar_historico_cambio
+    from etl.indices_economicos import buscar_dados_economicos
+    from etl.tratar_ibrx50 import processar_ibrx50
+    from etl.historico import baixar_em_lotes
+
+    definir_provedor_mercado(ProvedorSintetico(anos_historico=anos, latencia=latencia))
+    tickers = ProvedorSintetico.universo(simbolos)
+    lote = {} if tamanho_lote is None else {'tamanho_lote': tamanho_lote}
+
+    if cenario == 'etl':
+        import main_process
+
+        def executar():
+            main_process.main(workers=workers, universo=simbolos)
+            return sum(
+                len(ler_historico(nome, colunas=['Data']))
+                for nome in ('historico_acoes', 'historico_criptomoedas', 'historico_cambio')
+            ) + len(ler_historico('dados_economicos'))
+        return executar
+
+    if cenario == 'acoes':
+        return lambda: baixar_historico_acoes(workers=workers, tickers=tickers, **lote)
+
+    if cenario == 'cripto':
+        return lambda: baixar_historico_cripto(workers=workers, **lote)
+
+    if cenario == 'cambio':
+        return lambda: baixar_historico_cambio(workers=workers, **lote)
+
+    if cenario == 'indices':
+        return lambda: len(buscar_dados_economicos(workers=workers, incremental=False))
+
+    if cenario == 'ibrx50':
+        df_composicao = pd.DataFrame({
+            "Código": tickers,
+            "Ação": tickers,
+            "Tipo": "ON",
+            "Qtde. Teórica": "1.000.000",
+            "Part. (%)": "0,100",
+        })
+        return lambda: len(processar_ibrx50(df_composicao))
+
+    if cenario == 'escrita':
+        inicio = (datetime.now() - pd.Timedelta(days=3650)).strftime('%Y-%m-%d')
+        hist = baixar_em_lotes([f"{ticker}.SA" for ticker in tickers], inicio, workers=workers)
+        hist.columns = ['Data', 'Simbolo', 'Preco', 'Volume']
+
+        def executar():
+            with EscritorHistorico('historico_benchmark') as escritor:
+                escritor.escrever(hist)
+            return escritor.linhas
+        return executar
+
+    raise ValueError(f"Cenário desconhecido: {cenario}")
+
+
+def _medir_no_processo(cenario, simbolos, anos, workers, tamanho_lote=None, latencia=0.0):
+    """
+    Ponto de entrada do processo filho: executa o cenário e imprime as
+    medições como JSON na última linha da saída padrão.
+    """
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    results_dir = os.environ['PUCINVEST_RESULTS_DIR']
+
+    saida = sys.stdout
+    with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+        executar = _preparar_cenario(cenario, simbolos, anos, workers, tamanho_lote, latencia)
+        inicio = time.perf_counter()
+        linhas = executar()
+        tempo = time.perf_counter() - inicio
+
+    # ru_maxrss é informado em KB no Linux e em bytes no macOS.
+    pico_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if platform.system() != 'Darwin':
+        pico_rss *= 1024
+
+    saida.write(json.dumps({
+        'tempo_s': round(tempo, 4),
+        'pico_rss_bytes': int(pico_rss),
+        'linhas': int(linhas),
+        'linhas_por_s': round(linhas / tempo, 1) if tempo > 0 else None,
+        'bytes_gravados': _bytes_gravados(results_dir),
+    }) + '\n')
+
+
+def medir(cenario, simbolos, anos, workers, tamanho_lote=None, latencia=0.0):
+    """
+    Executa um cenário em um processo separado, com diretório de resultados
+    temporário, e devolve as medições.
+
+    Args:
+        cenario (str): Chave de CENARIOS.
+        simbolos (int): Quantidade de ações do universo fictício (None nos
+                        cenários de universo fixo).
+        anos (float): Anos de histórico gerados pelo provedor sintético.
+        workers (int): Número máximo de requisições simultâneas.
+        tamanho_lote (int): Tickers por requisição nos cenários de
+                            CENARIOS_COM_LOTE. None usa o padrão do carregador.
+        latencia (float): Latência simulada de cada requisição, em segundos.
+
+    Returns:
+        dict: Parâmetros do cenário e medições (tempo_s, pico_rss_bytes,
+              linhas, linhas_por_s, bytes_gravados). Se o cenário falhar ou
+              não produzir nenhuma linha, inclui também 'erro'.
+    """
+    resultado = {
+        'cenario': cenario, 'simbolos': simbolos, 'anos': anos, 'workers': workers,
+        'tamanho_lote': tamanho_lote, 'latencia_s': latencia,
+    }
+    diretorio = tempfile.mkdtemp(prefix='benchmark_etl_')
+    results_dir = os.path.join(diretorio, 'results')
+    os.makedirs(results_dir)
+
+    ambiente = dict(
+        os.environ,
+        PUCINVEST_RESULTS_DIR=results_dir,
+        PUCINVEST_PROVEDOR='sintetico',
+        PUCINVEST_CACHE='desligado',
+    )
+    comando = [
+        sys.executable, os.path.abspath(__file__), '--medir',
+        cenario, str(simbolos), str(anos), str(workers), str(tamanho_lote), str(latencia),
+    ]
+
+    try:
+        # cwd no diretório temporário: o main_process grava o log em ./results.
+        processo = subprocess.run(comando, cwd=diretorio, env=ambiente, capture_output=True, text=True)
+        if processo.returncode != 0:
+            resultado['erro'] = processo.stderr.strip().splitlines()[-1] if processo.stderr.strip() else 'falha'
+        else:
+            resultado.update(json.loads(processo.stdout.strip().splitlines()[-1]))
+            if resultado['linhas'] == 0:
+                # Um cenário sem dados mede apenas o tratamento de erro.
+                resultado['erro'] = 'nenhuma linha produzida'
+    finally:
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+    return resultado
+
+
+def _revisao_git():
+    """
+    Retorna o commit atual do repositório, se disponível.
+    """
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def comparar(atual, anterior):
+    """
+    Imprime a razão de tempo entre duas execuções do benchmark, por cenário.
+    Razões acima de 1 indicam regressão.
+    """
+    def chave(resultado):
+        return (resultado['cenario'], resultado['simbolos'], resultado['anos'], resultado['workers'],
+                resultado.get('tamanho_lote'), resultado.get('latencia_s', 0.0))
+
+    anteriores = {chave(r): r for r in anterior['resultados'] if 'erro' not in r}
+
+    print(f"\nComparação com {anterior.get('revisao')} ({anterior.get('executado_em')}):")
+    for resultado in atual['resultados']:
+        base = anteriores.get(chave(resultado))
+        if base is None or 'erro' in resultado:
+            continue
+        razao = resultado['tempo_s'] / base['tempo_s'] if base['tempo_s'] else float('inf')
+        alerta = "  <-- regressão" if razao > 1.2 else ""
+        print(f"  {chave(resultado)}: {base['tempo_s']:.3f}s -> {resultado['tempo_s']:.3f}s ({razao:.2f}x){alerta}")
+
+
+def executar_benchmark(cenarios=None, simbolos=None, anos=None, workers=None, saida=None,
+                       tamanhos_lote=None, latencia=LATENCIA_PADRAO):
+    """
+    Mede os cenários para todas as combinações de símbolos, anos, workers e
+    tamanhos de lote e grava o resultado em JSON.
+
+    Args:
+        cenarios (list): Cenários a medir. None mede todos.
+        simbolos (list): Tamanhos do universo fictício de ações.
+        anos (list): Anos de histórico.
+        workers (list): Números de workers.
+        saida (str): Arquivo JSON de saída. None grava em results/benchmarks/.
+        tamanhos_lote (list): Tickers por requisição nos cenários de CENARIOS_COM_LOTE.
+        latencia (float): Latência simulada de cada requisição, em segundos.
+
+    Returns:
+        dict: Metadados da execução e lista de resultados.
+    """
+    cenarios = cenarios or list(CENARIOS)
+    simbolos = simbolos or SIMBOLOS_PADRAO
+    anos = anos or ANOS_PADRAO
+    workers = workers or WORKERS_PADRAO_BENCHMARK
+    tamanhos_lote = tamanhos_lote or TAMANHOS_LOTE_PADRAO
+
+    relatorio = {
+        'executado_em': datetime.now().isoformat(timespec='seconds'),
+        'revisao': _revisao_git(),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+        'latencia_s': latencia,
+        'resultados': [],
+    }
+
+    combinacoes = []
+    for cenario, n_simbolos, n_anos, n_workers, lote in itertools.product(
+            cenarios, simbolos, anos, workers, tamanhos_lote):
+        if cenario in CENARIOS_UNIVERSO_FIXO:
+            n_simbolos = None
+        if cenario not in CENARIOS_COM_LOTE:
+            lote = None
+        if (cenario, n_simbolos, n_anos, n_workers, lote) not in combinacoes:
+            combinacoes.append((cenario, n_simbolos, n_anos, n_workers, lote))
+
+    for cenario, n_simbolos, n_anos, n_workers, lote in combinacoes:
+        print(f"Medindo {cenario} (símbolos={n_simbolos}, anos={n_anos}, workers={n_workers}, lote={lote})...")
+        resultado = medir(cenario, n_simbolos, n_anos, n_workers, lote, latencia)
+        relatorio['resultados'].append(resultado)
+
+        if 'erro' in resultado:
+            print(f"  erro: {resultado['erro']}")
+        if 'tempo_s' in resultado:
+            print(f"  {resultado['tempo_s']:.3f}s, {resultado['linhas']} linhas, "
+                  f"{resultado['linhas_por_s']} linhas/s, pico RSS {resultado['pico_rss_bytes'] / 2**20:.0f} MB, "
+                  f"{resultado['bytes_gravados'] / 2**20:.1f} MB gravados")
+
+    if saida is None:
+        diretorio = os.path.join(_get_results_dir(), 'benchmarks')
+        os.makedirs(diretorio, exist_ok=True)
+        saida = os.path.join(diretorio, f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+
+    with open(saida, 'w', encoding='UTF-8') as file:
+        json.dump(relatorio, file, ensure_ascii=False, indent=2)
+    print(f"\nResultados salvos em {saida}")
+
+    return relatorio
+
+
+def _parse_args():
+    """
+    Lê os argumentos de linha de comando do benchmark.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark do ETL do PUC Invest com provedor sintético")
+    parser.add_argument("--cenarios", nargs="+", choices=list(CENARIOS), help="Cenários a medir (padrão: todos)")
+    parser.add_argument("--simbolos", nargs="+", type=int, help=f"Tamanhos do universo de ações (padrão: {SIMBOLOS_PADRAO})")
+    parser.add_argument("--anos", nargs="+", type=float, help=f"Anos de histórico (padrão: {ANOS_PADRAO})")
+    parser.add_argument("--workers", nargs="+", type=int, help=f"Números de workers (padrão: {WORKERS_PADRAO_BENCHMARK})")
+    parser.add_argument("--tamanhos-lote", nargs="+", type=int,
+                        help=f"Tickers por requisição nos carregadores de histórico (padrão: {TAMANHOS_LOTE_PADRAO})")
+    parser.add_argument("--latencia", type=float, default=LATENCIA_PADRAO,
+                        help=f"Latência simulada de cada requisição, em segundos (padrão: {LATENCIA_PADRAO})")
+    parser.add_argument("--saida", help="Arquivo JSON de saída (padrão: results/benchmarks/benchmark_<data>.json)")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior para comparar os tempos")
+    parser.add_argument("--medir", nargs=6, metavar=("CENARIO", "SIMBOLOS", "ANOS", "WORKERS", "LOTE", "LATENCIA"),
+                        help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = _parse_args()
+
+    if args.medir:
+        cenario, n_simbolos, n_anos, n_workers, lote, latencia = args.medir
+        n_simbolos = int(n_simbolos) if n_simbolos != 'None' else 0
+        lote = int(lote) if lote != 'None' else None
+        _medir_no_processo(cenario, n_simbolos, float(n_anos), int(n_workers), lote, float(latencia))
+    else:
+        relatorio = executar_benchmark(args.cenarios, args.simbolos, args.anos, args.workers, args.saida,
+                                       args.tamanhos_lote, args.latencia)
+        if args.comparar:
+            with open(args.comparar, 'r', encoding='UTF-8') as file:
+                comparar(relatorio, json.load(file))
+
+        falhas = [resultado for resultado in relatorio['resultados'] if 'erro' in resultado]
+        if falhas:
+            print(f"\n{len(falhas)} de {len(relatorio['resultados'])} medições falharam:")
+            for resultado in falhas:
+                print(f"  {resultado['cenario']} (símbolos={resultado['simbolos']}, "
+                      f"lote={resultado['tamanho_lote']}): {resultado['erro']}")
+            sys.exit(1)
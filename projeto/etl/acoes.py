@@ -1,157 +1,153 @@
-import yfinance as yf
 import pandas as pd
 from datetime import datetime, timedelta
-import time
 import os
-import requests
-from etl.cambio import get_usdbrl_rate
-import re
+from etl.historico import (
+    iterar_lotes,
+    calcular_datas_iniciais,
+    ler_ultimas_datas,
+    TAMANHO_LOTE_PADRAO,
+)
+from etl.concorrencia import iterar_em_paralelo, WORKERS_PADRAO
+from etl.armazenamento import EscritorHistorico
+from etl.matriz import gerar_matriz
+from etl.variacoes import obter_maiores_variacoes, formatar_variacoes
+from etl.provedores import obter_provedor_mercado
+from etl.cotacoes import obter_cotacoes
+from etl.instrumentacao import medir_simbolo
+from etl.checkpoint import Checkpoint
+from etl.catalogo import obter_artefato
 
 def _get_results_dir():
     """
     Retorna o diretório de resultados do projeto.
     """
-    return os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'results'))
+    return os.path.abspath(os.environ.get('PUCINVEST_RESULTS_DIR') or os.path.join(os.path.dirname(__file__), '..', '..', 'results'))
 
-def baixar_historico_acoes():
+def baixar_historico_acoes(tamanho_lote=TAMANHO_LOTE_PADRAO, incremental=False,
+                           workers=WORKERS_PADRAO, tickers=None):
     """
     Baixa o histórico dos últimos 10 anos de todas as ações do IBOVESPA
-    e salva em um arquivo CSV.
+    e salva em um arquivo CSV (e no Parquet correspondente).
+
+    Cada ação é gravada assim que chega (ver EscritorHistorico), então o
+    histórico completo nunca fica em memória.
+
+    Args:
+        tamanho_lote (int): Quantidade de tickers por requisição ao provedor.
+                            Use 1 (ou None) para baixar um ticker por vez.
+        incremental (bool): Se True, baixa apenas o trecho ainda não salvo de cada
+                            ação (com uma janela de sobreposição) e mescla ao CSV.
+        workers (int): Número máximo de downloads simultâneos.
+        tickers (list): Códigos das ações (sem o sufixo .SA). None usa a
+                        carteira do IBrX-50 registrada no catálogo (ver etl.catalogo).
+
+    Returns:
+        int: Número de linhas do histórico salvo (0 se nada foi baixado ou se
+             a carteira do IBrX-50 não estiver no catálogo). O histórico é
+             lido com ler_historico('historico_acoes').
     """
     try:
         results_dir = _get_results_dir()
         
-        arquivos_na_pasta = [os.path.join(results_dir, f) for f in os.listdir(results_dir) if f.endswith(".csv")]
+        if tickers is None:
+            registro_ibrx50 = obter_artefato('ibrx50')
+            if registro_ibrx50 is None:
+                print("Carteira do IBrX-50 não encontrada no catálogo. Execute a etapa ibrx50 antes.")
+                return 0
 
-        if not arquivos_na_pasta:
-            print("Nenhum arquivo .csv encontrado na pasta.")
-        else:
-            caminho_arquivo_recente = max(arquivos_na_pasta, key=os.path.getmtime)
-            nome_arquivo_recente = os.path.basename(caminho_arquivo_recente)
-            print(f"O arquivo baixado mais recentemente é: {nome_arquivo_recente}")
-        
-        padrao_data = r"(\d{2}-\d{2}-\d{2})"
-        match = re.search(padrao_data, nome_arquivo_recente)
-        
-        if match:
-            data_arquivo = match.group(1)
-            print(f"Data do arquivo: {data_arquivo}")
+            nome_arquivo = registro_ibrx50['caminho']
+            print(f"Carteira do IBrX-50 obtida do catálogo: {os.path.basename(nome_arquivo)}")
+
+            df_acoes = pd.read_csv(nome_arquivo, skiprows=1)
+            df_acoes.columns = ['Código']
+            tickers = df_acoes['Código'].tolist()
 
-        nome_arquivo = os.path.join(results_dir, f"IBXLDia_{data_arquivo}.csv")
-        #data_atual = datetime.now().strftime('%d-%m-%y')
-        #nome_arquivo = os.path.join(results_dir, f'IBXLDia_{data_atual}.csv')
-        
-        df_acoes = pd.read_csv(nome_arquivo, skiprows=1)
-        df_acoes.columns = ['Código']
-        tickers = df_acoes['Código'].tolist()
-        
         data_inicial = (datetime.now() - timedelta(days=3650)).strftime('%Y-%m-%d')
+        nome_arquivo_historico = os.path.join(results_dir, 'historico_acoes.csv')
         
-        dados_historicos = []
+        mapa_tickers = {f"{ticker}.SA": ticker for ticker in tickers}
+        if incremental:
+            ultimas_datas = ler_ultimas_datas('historico_acoes')
+            datas_iniciais = calcular_datas_iniciais(mapa_tickers, data_inicial, ultimas_datas)
+        else:
+            datas_iniciais = {ticker_yf: data_inicial for ticker_yf in mapa_tickers}
+        
+        checkpoint = Checkpoint('historico_acoes')
         
         print("Iniciando download do histórico das ações...")
         
-        for ticker in tickers:
-            ticker_yf = f"{ticker}.SA"
-            try:
-                acao = yf.Ticker(ticker_yf)
-                hist = acao.history(start=data_inicial)
-                
-                if hist.empty:
-                    continue
-                
-                hist['Ticker'] = ticker
-                hist['Nome'] = ticker
+        def formatar(hist):
+            hist = hist[['Date', 'Ticker', 'Nome', 'Close', 'Volume']]
+            hist.columns = ['Data', 'Simbolo', 'Nome_Empresa', 'Preco', 'Volume']
+            return hist
+        
+        with EscritorHistorico('historico_acoes', nome_arquivo_historico, incremental) as escritor:
+            if tamanho_lote and tamanho_lote > 1:
+                for hist in iterar_lotes(list(mapa_tickers), datas_iniciais, tamanho_lote, workers, checkpoint):
+                    if hist.empty:
+                        continue
+                    hist['Ticker'] = hist['Ticker'].map(mapa_tickers)
+                    hist['Nome'] = hist['Ticker']
+                    escritor.escrever(formatar(hist))
+            else:
+                provedor = obter_provedor_mercado()
                 
-                hist = hist.reset_index()
-                hist['Date'] = hist['Date'].dt.strftime('%Y-%m-%d')
+                def baixar_ticker(ticker_yf):
+                    ticker = mapa_tickers[ticker_yf]
+                    with medir_simbolo(ticker_yf, inicio=datas_iniciais[ticker_yf]) as metricas:
+                        hist = checkpoint.obter(
+                            ticker_yf,
+                            datas_iniciais[ticker_yf],
+                            lambda: provedor.historico(ticker_yf, datas_iniciais[ticker_yf]),
+                        )
+                        metricas['linhas'] = len(hist)
+                    
+                    if hist.empty:
+                        return hist
+                    
+                    hist['Ticker'] = ticker
+                    hist['Nome'] = ticker
+                    
+                    hist = hist.reset_index()
+                    
+                    print(f"Dados baixados para {ticker}")
+                    return hist
                 
-                dados_historicos.append(hist)
-                
-                print(f"Dados baixados para {ticker}")
-                
-            except Exception as e:
-                print(f"Erro ao baixar dados de {ticker}: {str(e)}")
-                continue
-        
-        if dados_historicos:
-            df_historico = pd.concat(dados_historicos, ignore_index=True)
-            
-            df_historico = df_historico[['Date', 'Ticker', 'Nome', 'Close', 'Volume']]
-            df_historico.columns = ['Data', 'Simbolo', 'Nome_Empresa', 'Preco', 'Volume']
-            
-            df_historico['Variacao'] = df_historico.groupby('Simbolo')['Preco'].pct_change() * 100
-            
-            nome_arquivo_historico = os.path.join(results_dir, 'historico_acoes.csv')
-            df_historico.to_csv(nome_arquivo_historico, index=False)
+                for ticker_yf, hist, erro in iterar_em_paralelo(mapa_tickers, baixar_ticker, workers):
+                    if erro is not None:
+                        print(f"Erro ao baixar dados de {mapa_tickers[ticker_yf]}: {str(erro)}")
+                    elif not hist.empty:
+                        escritor.escrever(formatar(hist))
+        
+        if escritor.simbolos:
+            checkpoint.limpar()
             print(f"\nHistórico salvo com sucesso em '{nome_arquivo_historico}'")
-            
-            return df_historico
+            gerar_matriz('historico_acoes')
+            return escritor.linhas
         else:
             print("\nNenhum dado histórico foi baixado")
-            return pd.DataFrame()
+            return 0
             
     except Exception as e:
         print(f"Erro ao processar dados históricos: {str(e)}")
-        return pd.DataFrame()
+        return 0
 
 def obter_melhores_e_piores_acoes(periodo='1d'):
     """
-    Obtém as 5 melhores e 5 piores ações do período especificado usando o arquivo histórico.
+    Obtém as 5 melhores e 5 piores ações do período especificado, com a
+    mesma variação de obter_variacoes (ver obter_maiores_variacoes).
     
     Args:
         periodo (str): Período de análise ('1d' para 30 dias, '1mo' para mensal, '1y' para anual)
     """
     try:
-        results_dir = _get_results_dir()
-        nome_arquivo = os.path.join(results_dir, 'historico_acoes.csv')
-        df_historico = pd.read_csv(nome_arquivo)
-        df_historico['Data'] = pd.to_datetime(df_historico['Data'])
-        
-        data_mais_recente = df_historico['Data'].max()
-        
-        if periodo == '1d':
-            data_inicio = data_mais_recente - pd.Timedelta(days=30)
-            df_periodo = df_historico[df_historico['Data'] >= data_inicio].copy()
-            df_periodo = df_periodo.groupby('Simbolo').agg({
-                'Preco': ['first', 'last'],
-                'Nome_Empresa': 'first'
-            }).reset_index()
-            df_periodo.columns = ['Simbolo', 'Preco_Inicial', 'Preco_Final', 'Nome_Empresa']
-            df_periodo['Variacao'] = ((df_periodo['Preco_Final'] / df_periodo['Preco_Inicial']) - 1) * 100
-            
-        elif periodo == '1mo':
-            df_historico['Mes_Ano'] = df_historico['Data'].dt.to_period('M')
-            df_periodo = df_historico.groupby(['Simbolo', 'Mes_Ano', 'Nome_Empresa'])['Preco'].mean().reset_index()
-            df_periodo = df_periodo.sort_values(['Simbolo', 'Mes_Ano'])
-            df_periodo = df_periodo.groupby('Simbolo').agg({
-                'Preco': ['first', 'last'],
-                'Nome_Empresa': 'first'
-            }).reset_index()
-            df_periodo.columns = ['Simbolo', 'Preco_Inicial', 'Preco_Final', 'Nome_Empresa']
-            df_periodo['Variacao'] = ((df_periodo['Preco_Final'] / df_periodo['Preco_Inicial']) - 1) * 100
-            
-        else:
-            df_historico['Ano'] = df_historico['Data'].dt.year
-            df_periodo = df_historico.groupby(['Simbolo', 'Ano', 'Nome_Empresa'])['Preco'].mean().reset_index()
-            df_periodo = df_periodo.sort_values(['Simbolo', 'Ano'])
-            df_periodo = df_periodo.groupby('Simbolo').agg({
-                'Preco': ['first', 'last'],
-                'Nome_Empresa': 'first'
-            }).reset_index()
-            df_periodo.columns = ['Simbolo', 'Preco_Inicial', 'Preco_Final', 'Nome_Empresa']
-            df_periodo['Variacao'] = ((df_periodo['Preco_Final'] / df_periodo['Preco_Inicial']) - 1) * 100
-        
-        if df_periodo.empty:
-            return pd.DataFrame(), pd.DataFrame()
+        melhores, piores = obter_maiores_variacoes('historico_acoes', periodo)
         
-        df_periodo['Preço'] = df_periodo['Preco_Final'].round(2)
-        df_periodo['Variação (%)'] = df_periodo['Variacao'].round(2)
-        df_periodo['Símbolo'] = df_periodo['Simbolo']
-        df_periodo['Empresa'] = df_periodo['Nome_Empresa']
+        if melhores.empty:
+            return pd.DataFrame(), pd.DataFrame()
         
-        melhores = df_periodo.nlargest(5, 'Variacao')[['Símbolo', 'Empresa', 'Preço', 'Variação (%)']]
-        piores = df_periodo.nsmallest(5, 'Variacao')[['Símbolo', 'Empresa', 'Preço', 'Variação (%)']]
+        melhores = formatar_variacoes(melhores, 'Empresa')
+        piores = formatar_variacoes(piores, 'Empresa')
         
         return melhores, piores
     
@@ -162,6 +158,7 @@ def obter_melhores_e_piores_acoes(periodo='1d'):
 def get_current_prices_acoes(df):
     """
     Obtém os preços atuais das ações e calcula a variação percentual em relação ao preço de compra.
+    Os preços de todas as linhas são buscados em uma única consulta (ver obter_cotacoes).
     
     Args:
         df (DataFrame): DataFrame contendo as informações das ações com as colunas:
@@ -181,10 +178,16 @@ def get_current_prices_acoes(df):
             "WEGE3": "WEGE3.SA",
         }
         
-        df_acoes.loc[:, "preco_atual_br"] = df_acoes["nome"].apply(
-            lambda x: yf.Ticker(symbol_map.get(x, f"{x}.SA")).history(period="1d")["Close"].iloc[-1]
-            if x in symbol_map or x.endswith(".SA") else 0.0
-        )
+        def get_symbol(nome_acao):
+            """Converte o nome da ação no ticker do Yahoo Finance (None se não for reconhecido)."""
+            if nome_acao in symbol_map:
+                return symbol_map[nome_acao]
+            if isinstance(nome_acao, str) and nome_acao.endswith(".SA"):
+                return nome_acao
+            return None
+        
+        precos = obter_cotacoes(df_acoes["nome"].map(get_symbol))
+        df_acoes.loc[:, "preco_atual_br"] = precos.fillna(0.0)
         
         df_acoes.loc[:, "preco_compra_br"] = df_acoes["preco_inicial"]
         
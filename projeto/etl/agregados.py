@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+
+# Agregados materializados junto com cada histórico de ativos. Cada um vira
+# o artefato <historico>_<sufixo> (ex: historico_acoes_mensal).
+#   mensal  - uma linha por símbolo e mês;
+#   anual   - uma linha por símbolo e ano;
+#   recente - uma linha por símbolo com os últimos DIAS_JANELA_RECENTE dias
+#             até o último pregão do símbolo, mais a última variação diária.
+AGREGACOES = {'mensal': 'M', 'anual': 'Y'}
+SUFIXO_RECENTE = 'recente'
+DIAS_JANELA_RECENTE = 30
+
+COLUNAS_AGREGADOS = [
+    'Data', 'Simbolo', 'Nome', 'Data_Final', 'Primeiro', 'Ultimo',
+    'Media', 'Minimo', 'Maximo', 'Volume', 'Dias',
+]
+
+
+def nome_agregado(nome, sufixo):
+    """
+    Retorna o nome do artefato agregado de um histórico (ex: 'historico_acoes_mensal').
+    """
+    return f"{nome}_{sufixo}"
+
+
+def _agregar(simbolo, nome, datas, precos, volumes, chave):
+    """
+    Agrega os preços diários de um símbolo por período.
+
+    As linhas devem estar ordenadas por data, de modo que cada período ocupa
+    um bloco contíguo e pode ser reduzido com np.ufunc.reduceat.
+
+    Args:
+        simbolo (str): Símbolo do ativo.
+        nome (str): Nome do ativo.
+        datas (ndarray): Datas do pregão (datetime64[ns]).
+        precos (ndarray): Preços (float64, sem valores ausentes).
+        volumes (ndarray): Volumes (float64).
+        chave (ndarray): Data de início do período de cada linha.
+
+    Returns:
+        DataFrame: Uma linha por período, com COLUNAS_AGREGADOS.
+    """
+    inicio = np.flatnonzero(np.r_[True, chave[1:] != chave[:-1]])
+    fim = np.r_[inicio[1:], len(chave)] - 1
+    dias = fim - inicio + 1
+
+    return pd.DataFrame({
+        'Data': chave[inicio],
+        'Simbolo': simbolo,
+        'Nome': nome,
+        'Data_Final': datas[fim],
+        'Primeiro': precos[inicio],
+        'Ultimo': precos[fim],
+        'Media': np.add.reduceat(precos, inicio) / dias,
+        'Minimo': np.minimum.reduceat(precos, inicio),
+        'Maximo': np.maximum.reduceat(precos, inicio),
+        'Volume': np.add.reduceat(volumes, inicio),
+        'Dias': dias,
+    })
+
+
+class AgregadorHistorico:
+    """
+    Acumula, símbolo a símbolo, os agregados de um histórico de ativos
+    (primeiro, último, média, mínimo e máximo do preço, volume e dias de
+    pregão por mês, por ano e nos últimos DIAS_JANELA_RECENTE dias).
+
+    Recebe as mesmas linhas gravadas por EscritorHistorico; apenas os
+    agregados, bem menores que o histórico diário, ficam em memória.
+    """
+
+    def __init__(self):
+        self._partes = {sufixo: [] for sufixo in list(AGREGACOES) + [SUFIXO_RECENTE]}
+
+    def adicionar(self, df):
+        """
+        Agrega as linhas de um símbolo.
+
+        Args:
+            df (DataFrame): Linhas de um único símbolo ordenadas por Data, com
+                            as colunas Data, Simbolo e Preco e, opcionalmente,
+                            Volume, Variacao e o nome do ativo (coluna Nome_*;
+                            sem ela o próprio símbolo é usado como nome).
+        """
+        df = df.dropna(subset=['Preco'])
+        if df.empty:
+            return
+        if not df['Data'].is_monotonic_increasing:
+            df = df.sort_values('Data')
+
+        simbolo = str(df['Simbolo'].iloc[0])
+        coluna_nome = next((coluna for coluna in df.columns if coluna.startswith('Nome_')), 'Simbolo')
+        nome = str(df[coluna_nome].iloc[0])
+        datas = df['Data'].to_numpy('datetime64[ns]')
+        precos = df['Preco'].to_numpy('float64')
+        volumes = np.nan_to_num(df['Volume'].to_numpy('float64')) if 'Volume' in df.columns else np.zeros(len(df))
+
+        for sufixo, unidade in AGREGACOES.items():
+            chave = datas.astype(f'datetime64[{unidade}]').astype('datetime64[ns]')
+            self._partes[sufixo].append(_agregar(simbolo, nome, datas, precos, volumes, chave))
+
+        recente = datas >= datas[-1] - np.timedelta64(DIAS_JANELA_RECENTE, 'D')
+        chave = np.full(recente.sum(), datas[recente][0])
+        df_agregado = _agregar(simbolo, nome, datas[recente], precos[recente], volumes[recente], chave)
+        df_agregado['Ultima_Variacao'] = df['Variacao'].iloc[-1] if 'Variacao' in df.columns else np.nan
+        self._partes[SUFIXO_RECENTE].append(df_agregado)
+
+    def resultados(self):
+        """
+        Retorna os agregados acumulados.
+
+        Returns:
+            dict: Sufixo ('mensal', 'anual', 'recente') -> DataFrame. Vazio se
+                  nenhum símbolo foi adicionado.
+        """
+        return {
+            sufixo: pd.concat(partes, ignore_index=True)
+            for sufixo, partes in self._partes.items() if partes
+        }
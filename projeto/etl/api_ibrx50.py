@@ -0,0 +1,110 @@
+import os
+import json
+import base64
+import pandas as pd
+from etl.concorrencia import obter_sessao_http
+from etl.resiliencia import chamar
+
+# Endpoint JSON usado pela página do índice na B3. Pode ser substituído por
+# PUCINVEST_B3_URL para apontar para um servidor local de testes.
+URL_API_B3 = 'https://sistemaswebb3-listados.b3.com.br/indexProxy/indexCall/GetPortfolioDay'
+
+COLUNAS_COMPOSICAO = ["Código", "Ação", "Tipo", "Qtde. Teórica", "Part. (%)"]
+
+
+def _montar_url(url_base, indice, pagina, tamanho_pagina):
+    """
+    Monta a URL da API da B3, que recebe os parâmetros como JSON em base64 no caminho.
+    """
+    parametros = {
+        "language": "pt-br",
+        "pageNumber": pagina,
+        "pageSize": tamanho_pagina,
+        "index": indice,
+        "segment": "1",
+    }
+    codificado = base64.b64encode(json.dumps(parametros).encode("utf-8")).decode("ascii")
+    return f"{url_base.rstrip('/')}/{codificado}"
+
+
+def buscar_composicao_ibrx50(url_base=None, indice="IBXL", tamanho_pagina=120, timeout=None):
+    """
+    Busca a carteira do dia do IBrX-50 diretamente na API JSON da B3, sem navegador.
+
+    Args:
+        url_base (str): Endereço do endpoint GetPortfolioDay. None usa
+                        PUCINVEST_B3_URL ou URL_API_B3.
+        indice (str): Código do índice na B3.
+        tamanho_pagina (int): Quantidade de ativos por página da API.
+        timeout (int): Tempo máximo de cada requisição, em segundos. None usa
+                       o timeout configurado para o provedor 'b3'.
+
+    Returns:
+        DataFrame: Colunas Código, Ação, Tipo, Qtde. Teórica e Part. (%),
+                   no mesmo formato do CSV baixado pelo site.
+    """
+    url_base = url_base or os.environ.get("PUCINVEST_B3_URL", URL_API_B3)
+    sessao = obter_sessao_http()
+
+    registros = []
+    pagina = 1
+    total_paginas = 1
+
+    def buscar_pagina(url, timeout_provedor):
+        resposta = sessao.get(url, timeout=timeout or timeout_provedor)
+        resposta.raise_for_status()
+        return resposta.json()
+
+    while pagina <= total_paginas:
+        url = _montar_url(url_base, indice, pagina, tamanho_pagina)
+        dados = chamar("b3", lambda timeout_provedor: buscar_pagina(url, timeout_provedor))
+
+        registros.extend(dados.get("results") or [])
+        total_paginas = int((dados.get("page") or {}).get("totalPages") or 1)
+        pagina += 1
+
+    if not registros:
+        raise ValueError(f"A API da B3 não retornou ativos para o índice {indice}")
+
+    df = pd.DataFrame(
+        [
+            [
+                registro.get("cod"),
+                registro.get("asset"),
+                registro.get("type"),
+                registro.get("theoricalQty"),
+                registro.get("part"),
+            ]
+            for registro in registros
+        ],
+        columns=COLUNAS_COMPOSICAO,
+    )
+
+    print(f"Composição do {indice} obtida via API com {len(df)} ativos")
+    return df
+
+
+def obter_composicao_ibrx50(url_base=None):
+    """
+    Obtém a composição do IBrX-50 pela API HTTP e, se ela falhar, recorre ao
+    download pelo navegador (Selenium).
+
+    Args:
+        url_base (str): Endereço do endpoint da API (ver buscar_composicao_ibrx50).
+
+    Returns:
+        DataFrame: Composição obtida pela API, ou None quando o fallback por
+                   navegador foi usado (o CSV fica salvo em results/).
+
+    Raises:
+        RuntimeError: Se nem a API nem o navegador obtiveram a composição.
+    """
+    try:
+        return buscar_composicao_ibrx50(url_base)
+    except Exception as e:
+        print(f"Falha ao obter o IBrX-50 pela API ({str(e)}). Usando o navegador...")
+
+    from etl.scraping_ibrx50 import download_ibrx50_data
+    if download_ibrx50_data() is None:
+        raise RuntimeError("Não foi possível obter o IBrX-50 pela API nem pelo navegador")
+    return None
@@ -0,0 +1,455 @@
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from etl.catalogo import registrar_artefato
+from etl.agregados import AgregadorHistorico, nome_agregado
+from etl.instrumentacao import registrar_arquivo
+from etl.publicacao import (
+    publicar_arquivo,
+    criar_temporario,
+    substituir_arquivo,
+    descartar_temporario,
+)
+
+
+# Esquema compacto dos históricos de ativos. Símbolos e nomes são lidos como
+# categorias e as datas como datetime64; preços e variações ficam em float32,
+# exceto nas criptomoedas, cujas cotações passam de 100 mil e perderiam os
+# centavos em float32. O volume mantém float64 (valores acima de 2^24).
+COLUNAS_CATEGORICAS = ('Simbolo', 'Nome', 'Nome_Empresa', 'Nome_Cripto', 'Nome_Moeda')
+TIPOS_HISTORICO = {'Preco': 'float32', 'Volume': 'float64', 'Variacao': 'float32'}
+TIPOS_POR_ARTEFATO = {
+    'historico_criptomoedas': {'Preco': 'float64'},
+}
+
+
+def _get_results_dir():
+    """
+    Retorna o diretório de resultados do projeto.
+    """
+    return os.path.abspath(os.environ.get('PUCINVEST_RESULTS_DIR') or os.path.join(os.path.dirname(__file__), '..', '..', 'results'))
+
+
+def _coluna_data(df):
+    """
+    Retorna o nome da coluna de data do artefato ('Data' nos históricos de
+    ativos, 'Date' nos índices econômicos).
+    """
+    return 'Data' if 'Data' in df.columns else 'Date'
+
+
+def normalizar_datas(datas):
+    """
+    Converte as datas recebidas do provedor para o formato armazenado:
+    datetime64 sem fuso horário, à meia-noite do dia do pregão.
+
+    O yfinance devolve o índice no fuso da bolsa de cada ativo; descartar o
+    fuso (em vez de converter para UTC) preserva o dia local do pregão.
+
+    Args:
+        datas (Series): Datas com ou sem fuso horário, ou textos 'YYYY-MM-DD'.
+
+    Returns:
+        Series: Datas como datetime64[ns] normalizadas.
+    """
+    datas = pd.to_datetime(datas)
+    if datas.dt.tz is not None:
+        datas = datas.dt.tz_localize(None)
+    return datas.dt.normalize().astype('datetime64[ns]')
+
+
+def _tipos_numericos(df, nome=None):
+    """
+    Retorna os tipos numéricos do esquema compacto para as colunas presentes em `df`.
+    """
+    tipos = dict(TIPOS_HISTORICO, **TIPOS_POR_ARTEFATO.get(nome, {}))
+    return {coluna: tipo for coluna, tipo in tipos.items() if coluna in df.columns}
+
+
+def tipar_historico(df, nome=None):
+    """
+    Aplica o esquema compacto dos históricos (ver TIPOS_HISTORICO) às colunas
+    presentes em `df`: datas como datetime64, símbolos e nomes como categorias
+    e preços em float32 quando a precisão permite.
+
+    Args:
+        df (DataFrame): Histórico lido do CSV, do Parquet ou recém-baixado.
+        nome (str): Nome base do artefato (ex: 'historico_acoes').
+
+    Returns:
+        DataFrame: Histórico com os tipos do esquema.
+    """
+    conversoes = {
+        coluna: tipo for coluna, tipo in _tipos_numericos(df, nome).items()
+        if df[coluna].dtype != tipo
+    }
+    conversoes.update({
+        coluna: 'category' for coluna in COLUNAS_CATEGORICAS
+        if coluna in df.columns and not isinstance(df[coluna].dtype, pd.CategoricalDtype)
+    })
+    if conversoes:
+        df = df.astype(conversoes)
+
+    coluna_data = _coluna_data(df)
+    if coluna_data in df.columns and df[coluna_data].dtype != 'datetime64[ns]':
+        df = df.assign(**{coluna_data: pd.to_datetime(df[coluna_data]).astype('datetime64[ns]')})
+    return df
+
+
+def caminho_artefato(nome, extensao='parquet'):
+    """
+    Retorna o caminho completo de um artefato do ETL em results/.
+
+    Args:
+        nome (str): Nome base do artefato (ex: 'historico_acoes').
+        extensao (str): Extensão do arquivo ('parquet' ou 'csv').
+    """
+    return os.path.join(_get_results_dir(), f"{nome}.{extensao}")
+
+
+def salvar_parquet(df, nome, etapa=None):
+    """
+    Salva um artefato em Parquet com colunas tipadas e o registra no catálogo.
+
+    Históricos com coluna Simbolo são ordenados por (Simbolo, Data) e gravados
+    com um row group por símbolo, o que permite ao leitor pular os símbolos
+    não solicitados usando apenas as estatísticas do arquivo. O arquivo é
+    publicado de forma atômica (ver publicar_arquivo).
+
+    Args:
+        df (DataFrame): Dados a salvar.
+        nome (str): Nome base do artefato (ex: 'historico_acoes').
+        etapa (str): Etapa do ETL que gerou o artefato. None usa o próprio nome.
+
+    Returns:
+        str: Caminho do arquivo gravado.
+    """
+    nome_arquivo = caminho_artefato(nome)
+    df = df.copy()
+    coluna_data = _coluna_data(df)
+    df[coluna_data] = pd.to_datetime(df[coluna_data])
+
+    if 'Simbolo' not in df.columns:
+        tabela = pa.Table.from_pandas(df.sort_values(coluna_data), preserve_index=False)
+        publicar_arquivo(nome_arquivo, lambda temporario: pq.write_table(tabela, temporario))
+        _registrar(df, nome, nome_arquivo, etapa)
+        return nome_arquivo
+
+    df = df.sort_values(['Simbolo', coluna_data], ignore_index=True)
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+
+    limites = df.groupby('Simbolo', sort=False).size().cumsum().tolist()
+
+    def escrever(temporario):
+        with pq.ParquetWriter(temporario, tabela.schema) as writer:
+            inicio = 0
+            for fim in limites:
+                writer.write_table(tabela.slice(inicio, fim - inicio))
+                inicio = fim
+
+    publicar_arquivo(nome_arquivo, escrever)
+    _registrar(df, nome, nome_arquivo, etapa)
+    return nome_arquivo
+
+
+def _registrar(df, nome, nome_arquivo, etapa):
+    """
+    Registra no catálogo o artefato gravado, com sua data mais recente, e
+    contabiliza os bytes gravados na instrumentação.
+    """
+    _registrar_artefato(nome, nome_arquivo, etapa, len(df), df[_coluna_data(df)].max())
+
+
+def _registrar_artefato(nome, nome_arquivo, etapa, linhas, data_maxima):
+    registrar_arquivo(nome_arquivo)
+    data = None if data_maxima is None or pd.isna(data_maxima) else data_maxima.strftime('%Y-%m-%d')
+    registrar_artefato(nome, nome_arquivo, etapa or nome, linhas=linhas, data=data)
+
+
+class EscritorHistorico:
+    """
+    Grava um histórico de ativos símbolo a símbolo, sem manter o histórico
+    completo em memória.
+
+    Cada chamada a escrever() recebe as linhas de um ou mais símbolos, calcula
+    a Variacao de cada um e acrescenta um row group por símbolo ao Parquet e
+    as mesmas linhas ao CSV, ambos em arquivos temporários. Ao sair do bloco
+    with, os dois arquivos são publicados de forma atômica e registrados no
+    catálogo, junto com os agregados mensais, anuais e recentes de cada
+    símbolo (ver AgregadorHistorico). Se o bloco terminar com erro, ou nenhum
+    símbolo for escrito, os arquivos anteriores são mantidos.
+
+    No modo incremental, as linhas novas de cada símbolo são mescladas às já
+    salvas (lidas apenas para aquele símbolo, com poda de row groups),
+    prevalecendo o dado novo. A Variacao é recalculada apenas a partir da
+    primeira data baixada (a janela de sobreposição), usando a linha anterior
+    como base, e os símbolos salvos que não foram escritos
+    nesta carga são copiados do arquivo anterior. Sem o Parquet, o CSV
+    anterior é lido uma única vez por inteiro.
+
+    Exemplo:
+        with EscritorHistorico('historico_acoes', caminho_csv, incremental=True) as escritor:
+            for df_simbolo in frames:
+                escritor.escrever(df_simbolo)
+    """
+
+    def __init__(self, nome, caminho_csv=None, incremental=False, etapa=None):
+        """
+        Args:
+            nome (str): Nome base do artefato (ex: 'historico_acoes').
+            caminho_csv (str): Caminho do CSV. None usa results/<nome>.csv.
+            incremental (bool): Se True, mescla com o histórico já salvo.
+            etapa (str): Etapa do ETL registrada no catálogo. None usa o nome.
+        """
+        self.nome = nome
+        self.caminho_parquet = caminho_artefato(nome)
+        self.caminho_csv = caminho_csv or caminho_artefato(nome, 'csv')
+        self.incremental = incremental
+        self.etapa = etapa
+        self.linhas = 0
+        self.data_maxima = None
+        self.simbolos = set()
+        self._colunas = None
+        self._esquema = None
+        self._writer = None
+        self._csv_anterior = None
+        self._agregador = AgregadorHistorico()
+        self._temporario_parquet = criar_temporario(self.caminho_parquet)
+        self._temporario_csv = criar_temporario(self.caminho_csv)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo_erro, erro, rastreamento):
+        self.fechar(sucesso=tipo_erro is None)
+        return False
+
+    def _ler_existente(self, simbolo):
+        """
+        Lê as linhas já salvas de um símbolo.
+        """
+        if os.path.exists(self.caminho_parquet):
+            return ler_historico(self.nome, simbolos=[simbolo])
+
+        return self._ler_csv_anterior().get(simbolo, pd.DataFrame())
+
+    def _ler_csv_anterior(self):
+        """
+        Lê uma única vez o CSV anterior, separado por símbolo (usado apenas
+        quando o histórico ainda não tem Parquet).
+        """
+        if self._csv_anterior is None:
+            self._csv_anterior = {}
+            if os.path.exists(self.caminho_csv):
+                df_anterior = pd.read_csv(self.caminho_csv, dtype={'Simbolo': str})
+                df_anterior['Data'] = pd.to_datetime(df_anterior['Data'])
+                self._csv_anterior = dict(tuple(df_anterior.groupby('Simbolo', sort=False)))
+        return self._csv_anterior
+
+    def escrever(self, df):
+        """
+        Acrescenta ao histórico as linhas de um ou mais símbolos. Cada símbolo
+        deve ser escrito uma única vez.
+
+        Args:
+            df (DataFrame): Colunas Data, Simbolo e Preco, mais as colunas
+                            descritivas do artefato (ex: Nome_Empresa, Volume).
+                            Data pode vir com o fuso horário do provedor
+                            (ver normalizar_datas).
+        """
+        for simbolo, df_simbolo in df.groupby('Simbolo', sort=False):
+            df_simbolo = df_simbolo.assign(Data=normalizar_datas(df_simbolo['Data']))
+            inicio_novo = None
+
+            if self.incremental:
+                df_existente = self._ler_existente(simbolo)
+                if not df_existente.empty and 'Variacao' in df_existente.columns:
+                    inicio_novo = df_simbolo['Data'].min()
+                    df_simbolo = pd.concat([df_existente, df_simbolo.drop(columns='Variacao', errors='ignore')],
+                                           ignore_index=True)
+                elif not df_existente.empty:
+                    df_simbolo = pd.concat([df_existente, df_simbolo], ignore_index=True)
+
+            df_simbolo = df_simbolo.drop_duplicates(subset='Data', keep='last').sort_values('Data', ignore_index=True)
+            if inicio_novo is None:
+                df_simbolo['Variacao'] = df_simbolo['Preco'].pct_change() * 100
+            else:
+                # Apenas as linhas a partir da primeira data baixada mudam; a
+                # linha anterior a elas serve de base para a primeira variação.
+                alteradas = (df_simbolo['Data'] >= inicio_novo).to_numpy()
+                base = max(int(alteradas.argmax()) - 1, 0)
+                variacao = df_simbolo['Preco'].iloc[base:].pct_change() * 100
+                df_simbolo.loc[alteradas, 'Variacao'] = variacao[alteradas[base:]].to_numpy(df_simbolo['Variacao'].dtype)
+            self._anexar(df_simbolo)
+            self.simbolos.add(simbolo)
+
+    def _anexar(self, df):
+        """
+        Grava as linhas de um símbolo nos arquivos temporários.
+        """
+        df = df.astype(_tipos_numericos(df, self.nome))
+        df['Data'] = df['Data'].astype('datetime64[ns]')
+
+        if self._writer is None:
+            self._colunas = list(df.columns)
+            tabela = pa.Table.from_pandas(df, preserve_index=False)
+            self._esquema = tabela.schema
+            self._writer = pq.ParquetWriter(self._temporario_parquet, self._esquema)
+        else:
+            df = df[self._colunas]
+            tabela = pa.Table.from_pandas(df, schema=self._esquema, preserve_index=False)
+
+        self._writer.write_table(tabela)
+        df.to_csv(self._temporario_csv, mode='a', header=self.linhas == 0, index=False)
+        self._agregador.adicionar(df)
+
+        self.linhas += len(df)
+        data_maxima = df['Data'].max()
+        if self.data_maxima is None or data_maxima > self.data_maxima:
+            self.data_maxima = data_maxima
+
+    def _copiar_restantes(self):
+        """
+        Copia do histórico anterior os símbolos que não foram escritos nesta carga.
+        """
+        if os.path.exists(self.caminho_parquet):
+            arquivo = pq.ParquetFile(self.caminho_parquet)
+            for i in range(arquivo.num_row_groups):
+                df_grupo = arquivo.read_row_group(i).to_pandas()
+                df_grupo = df_grupo.loc[~df_grupo['Simbolo'].isin(self.simbolos)]
+                for _, df_simbolo in df_grupo.groupby('Simbolo', sort=False):
+                    self._anexar(df_simbolo)
+            return
+
+        for simbolo, df_simbolo in self._ler_csv_anterior().items():
+            if simbolo not in self.simbolos:
+                self._anexar(df_simbolo)
+
+    def fechar(self, sucesso=True):
+        """
+        Publica os arquivos gravados, ou os descarta se `sucesso` for False
+        ou nenhum símbolo tiver sido escrito.
+
+        Returns:
+            bool: True se o histórico foi publicado.
+        """
+        try:
+            publicar = sucesso and bool(self.simbolos)
+            if publicar and self.incremental:
+                self._copiar_restantes()
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+            self._csv_anterior = None
+
+            if not publicar:
+                descartar_temporario(self._temporario_parquet)
+                descartar_temporario(self._temporario_csv)
+                return False
+
+            substituir_arquivo(self._temporario_csv, self.caminho_csv)
+            substituir_arquivo(self._temporario_parquet, self.caminho_parquet)
+        except BaseException:
+            descartar_temporario(self._temporario_parquet)
+            descartar_temporario(self._temporario_csv)
+            raise
+
+        registrar_arquivo(self.caminho_csv)
+        _registrar_artefato(self.nome, self.caminho_parquet, self.etapa, self.linhas, self.data_maxima)
+
+        for sufixo, df_agregado in self._agregador.resultados().items():
+            salvar_parquet(df_agregado, nome_agregado(self.nome, sufixo), self.etapa or self.nome)
+        return True
+
+
+def ler_historico(nome, simbolos=None, data_inicio=None, data_fim=None, colunas=None):
+    """
+    Lê um artefato do ETL carregando apenas os símbolos, o intervalo de datas
+    e as colunas solicitados.
+
+    Usa o Parquet quando disponível (com poda de row groups e colunas) e, caso
+    contrário, recorre ao CSV correspondente.
+
+    Args:
+        nome (str): Nome base do artefato (ex: 'historico_acoes').
+        simbolos (list): Símbolos desejados. None carrega todos.
+        data_inicio (str | Timestamp): Data inicial inclusiva. None sem limite.
+        data_fim (str | Timestamp): Data final inclusiva. None sem limite.
+        colunas (list): Colunas desejadas. None carrega todas.
+
+    Returns:
+        DataFrame: Dados filtrados, já no esquema compacto (ver tipar_historico).
+    """
+    nome_parquet = caminho_artefato(nome)
+
+    if os.path.exists(nome_parquet):
+        esquema = pq.read_schema(nome_parquet)
+        coluna_data = 'Data' if 'Data' in esquema.names else 'Date'
+
+        filtros = []
+        if simbolos is not None and 'Simbolo' in esquema.names:
+            filtros.append(('Simbolo', 'in', list(simbolos)))
+        if data_inicio is not None:
+            filtros.append((coluna_data, '>=', pd.Timestamp(data_inicio)))
+        if data_fim is not None:
+            filtros.append((coluna_data, '<=', pd.Timestamp(data_fim)))
+
+        categoricas = [
+            coluna for coluna in COLUNAS_CATEGORICAS
+            if coluna in esquema.names and (colunas is None or coluna in colunas)
+        ]
+        tabela = pq.read_table(nome_parquet, columns=colunas, filters=filtros or None,
+                               read_dictionary=categoricas or None)
+        return tipar_historico(tabela.to_pandas(), nome)
+
+    df = pd.read_csv(caminho_artefato(nome, 'csv'))
+    if 'Unnamed: 0' in df.columns:
+        df = df.rename(columns={'Unnamed: 0': 'Date'})
+    df = tipar_historico(df, nome)
+    coluna_data = _coluna_data(df)
+
+    mascara = pd.Series(True, index=df.index)
+    if simbolos is not None and 'Simbolo' in df.columns:
+        mascara &= df['Simbolo'].isin(list(simbolos))
+    if data_inicio is not None:
+        mascara &= df[coluna_data] >= pd.Timestamp(data_inicio)
+    if data_fim is not None:
+        mascara &= df[coluna_data] <= pd.Timestamp(data_fim)
+
+    df = df.loc[mascara]
+    if colunas is not None:
+        df = df[colunas]
+    return df.reset_index(drop=True)
+
+
+def obter_data_mais_recente(nome):
+    """
+    Retorna a data mais recente de um artefato do ETL.
+
+    No Parquet a data é obtida das estatísticas dos row groups, sem ler os dados.
+
+    Args:
+        nome (str): Nome base do artefato (ex: 'historico_acoes').
+
+    Returns:
+        Timestamp: Maior data do artefato, ou None se ele estiver vazio.
+    """
+    nome_parquet = caminho_artefato(nome)
+
+    if os.path.exists(nome_parquet):
+        metadados = pq.ParquetFile(nome_parquet).metadata
+        nomes = metadados.schema.to_arrow_schema().names
+        indice = nomes.index('Data' if 'Data' in nomes else 'Date')
+
+        maximos = []
+        for i in range(metadados.num_row_groups):
+            estatisticas = metadados.row_group(i).column(indice).statistics
+            if estatisticas is None or not estatisticas.has_min_max:
+                return ler_historico(nome, colunas=[nomes[indice]])[nomes[indice]].max()
+            maximos.append(pd.Timestamp(estatisticas.max))
+        return max(maximos) if maximos else None
+
+    df = ler_historico(nome)
+    data_maxima = df[_coluna_data(df)].max()
+    return None if pd.isna(data_maxima) else data_maxima
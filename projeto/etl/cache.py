@@ -0,0 +1,193 @@
+import os
+import json
+import time
+import hashlib
+import contextvars
+from contextlib import contextmanager
+import pandas as pd
+from etl.instrumentacao import contar
+from etl.publicacao import publicar_arquivo
+
+# Modo do cache, definido pela variável de ambiente PUCINVEST_CACHE:
+#   'normal'     - usa a resposta salva enquanto estiver dentro do TTL;
+#   'gravar'     - sempre consulta o provedor e grava a resposta (sem expirar na reprodução);
+#   'reproduzir' - usa apenas respostas gravadas, sem acesso à rede;
+#   'desligado'  - não lê nem grava respostas.
+MODOS_CACHE = ('normal', 'gravar', 'reproduzir', 'desligado')
+
+# Tempo de vida (em segundos) das respostas de cada endpoint no modo 'normal'.
+TTL_ENDPOINTS = {
+    'yf_download': 6 * 3600,
+    'yf_history': 6 * 3600,
+    'yf_cotacao': 60,
+    'yf_cotacoes': 60,
+    'sgs': 12 * 3600,
+}
+
+TTL_PADRAO = 3600
+
+# Parâmetros de data das requisições. Na chave do cache eles são guardados
+# como distância em dias até hoje (ex: 'hoje-3650d'), já que os carregadores
+# pedem janelas relativas à data atual. Assim uma resposta gravada continua
+# sendo reproduzida nos dias seguintes e cada dia não cria uma nova entrada.
+CAMPOS_DATA = ('start', 'end')
+
+
+# Respostas do cache usadas pelo bloco registrar_respostas em execução.
+_respostas_registradas = contextvars.ContextVar('respostas_registradas', default=None)
+
+
+@contextmanager
+def registrar_respostas():
+    """
+    Registra as respostas que consultar() leu ou gravou no cache dentro do
+    bloco (na mesma thread). Usado pelos checkpoints para apontar para a
+    resposta em cache em vez de salvar outra cópia.
+
+    Yields:
+        list: Tuplas (caminho do arquivo no cache, resposta devolvida).
+    """
+    respostas = []
+    token = _respostas_registradas.set(respostas)
+    try:
+        yield respostas
+    finally:
+        _respostas_registradas.reset(token)
+
+
+def _registrar_resposta(caminho, resposta):
+    respostas = _respostas_registradas.get()
+    if respostas is not None:
+        respostas.append((caminho, resposta))
+    return resposta
+
+
+def _get_cache_dir():
+    """
+    Retorna o diretório onde as respostas dos provedores são armazenadas.
+    """
+    results_dir = os.environ.get('PUCINVEST_RESULTS_DIR') or os.path.join(os.path.dirname(__file__), '..', '..', 'results')
+    return os.path.abspath(os.path.join(results_dir, 'cache'))
+
+
+def obter_modo_cache():
+    """
+    Retorna o modo de cache configurado em PUCINVEST_CACHE ('normal' por padrão).
+    """
+    modo = os.environ.get('PUCINVEST_CACHE', 'normal').strip().lower()
+    if modo not in MODOS_CACHE:
+        raise ValueError(f"Modo de cache inválido: {modo}. Use um de {MODOS_CACHE}")
+    return modo
+
+
+def _normalizar_chave(chave, hoje=None):
+    """
+    Substitui as datas de CAMPOS_DATA pela distância em dias até `hoje`.
+    """
+    if not isinstance(chave, dict):
+        return chave
+    hoje = pd.Timestamp(hoje).normalize() if hoje is not None else pd.Timestamp.now().normalize()
+    normalizada = dict(chave)
+    for campo in CAMPOS_DATA:
+        if normalizada.get(campo) is not None:
+            dias = (hoje - pd.Timestamp(normalizada[campo]).normalize()).days
+            normalizada[campo] = f"hoje-{dias}d"
+    return normalizada
+
+
+def _caminho_resposta(endpoint, chave):
+    """
+    Calcula o arquivo da resposta a partir do endpoint e dos parâmetros da
+    requisição (com as datas relativas a hoje, ver _normalizar_chave).
+    """
+    conteudo = json.dumps([endpoint, _normalizar_chave(chave)], sort_keys=True, default=str)
+    resumo = hashlib.sha256(conteudo.encode('utf-8')).hexdigest()
+    return os.path.join(_get_cache_dir(), endpoint, f"{resumo}.pkl")
+
+
+def consultar(endpoint, chave, funcao, ttl=None):
+    """
+    Retorna a resposta de uma requisição a um provedor de dados, usando o
+    cache em disco conforme o modo configurado.
+
+    Args:
+        endpoint (str): Nome do endpoint (ex: 'yf_history', 'sgs').
+        chave (dict | list): Parâmetros que identificam a requisição.
+        funcao (callable): Função sem argumentos que faz a requisição real.
+        ttl (int): Tempo de vida em segundos. None usa TTL_ENDPOINTS.
+
+    Returns:
+        object: Resposta do provedor (normalmente um DataFrame).
+    """
+    modo = obter_modo_cache()
+    if modo == 'desligado':
+        return funcao()
+
+    caminho = _caminho_resposta(endpoint, chave)
+    ttl = TTL_ENDPOINTS.get(endpoint, TTL_PADRAO) if ttl is None else ttl
+
+    if modo == 'reproduzir':
+        if not os.path.exists(caminho):
+            raise FileNotFoundError(f"Resposta não gravada para {endpoint} {chave}")
+        contar('cache_hits')
+        return _registrar_resposta(caminho, pd.read_pickle(caminho))
+
+    if modo == 'normal' and os.path.exists(caminho):
+        if time.time() - os.path.getmtime(caminho) < ttl:
+            contar('cache_hits')
+            return _registrar_resposta(caminho, pd.read_pickle(caminho))
+
+    contar('cache_misses')
+    resposta = funcao()
+
+    publicar_arquivo(caminho, lambda temporario: pd.to_pickle(resposta, temporario))
+
+    return _registrar_resposta(caminho, resposta)
+
+
+def limpar_cache(endpoint=None):
+    """
+    Remove as respostas armazenadas de um endpoint, ou de todos.
+
+    Args:
+        endpoint (str): Endpoint a limpar. None remove todo o cache.
+
+    Returns:
+        int: Quantidade de arquivos removidos.
+    """
+    diretorio = _get_cache_dir() if endpoint is None else os.path.join(_get_cache_dir(), endpoint)
+    removidos = 0
+    for raiz, _, arquivos in os.walk(diretorio):
+        for arquivo in arquivos:
+            if arquivo.endswith('.pkl'):
+                os.remove(os.path.join(raiz, arquivo))
+                removidos += 1
+    return removidos
+
+
+def remover_expirados():
+    """
+    Remove as respostas com o TTL do endpoint vencido. Só é feito no modo
+    'normal': nos modos 'gravar' e 'reproduzir' as respostas gravadas não expiram.
+
+    Returns:
+        int: Quantidade de arquivos removidos.
+    """
+    if obter_modo_cache() != 'normal':
+        return 0
+
+    diretorio = _get_cache_dir()
+    if not os.path.isdir(diretorio):
+        return 0
+
+    agora = time.time()
+    removidos = 0
+    for endpoint in os.listdir(diretorio):
+        ttl = TTL_ENDPOINTS.get(endpoint, TTL_PADRAO)
+        for raiz, _, arquivos in os.walk(os.path.join(diretorio, endpoint)):
+            for arquivo in arquivos:
+                caminho = os.path.join(raiz, arquivo)
+                if arquivo.endswith('.pkl') and agora - os.path.getmtime(caminho) >= ttl:
+                    os.remove(caminho)
+                    removidos += 1
+    return removidos
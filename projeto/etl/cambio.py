@@ -1,173 +1,237 @@
-import yfinance as yf
 import pandas as pd
 from datetime import datetime, timedelta
 import time
 import os
+import json
 import requests
+from etl.historico import (
+    iterar_lotes,
+    calcular_datas_iniciais,
+    ler_ultimas_datas,
+    TAMANHO_LOTE_PADRAO,
+)
+from etl.concorrencia import iterar_em_paralelo, WORKERS_PADRAO
+from etl.armazenamento import EscritorHistorico, normalizar_datas
+from etl.matriz import gerar_matriz
+from etl.variacoes import obter_variacoes, formatar_variacoes
+from etl.provedores import obter_provedor_mercado
+from etl.cotacoes import obter_cotacoes, TICKER_USDBRL
+from etl.conversao import (
+    calcular_taxas_cruzadas,
+    verificar_consistencia,
+    ticker_cambio,
+    MOEDA_BASE,
+    MOEDA_PIVO,
+)
+from etl.instrumentacao import medir_simbolo, registrar_evento
+from etl.checkpoint import Checkpoint
 
 def _get_results_dir():
     """
     Retorna o diretório de resultados do projeto.
     """
-    return os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'results'))
+    return os.path.abspath(os.environ.get('PUCINVEST_RESULTS_DIR') or os.path.join(os.path.dirname(__file__), '..', '..', 'results'))
 
-def baixar_historico_cambio():
+def carregar_moedas(caminho=None):
     """
-    Baixa o histórico dos últimos 10 anos das principais moedas em relação ao Real
-    e salva em um arquivo CSV.
-    """
-    try:
-        moedas = {
-            "USDBRL=X": "Dólar Americano",
-            "EURBRL=X": "Euro",
-            "GBPBRL=X": "Libra Esterlina",
-            "JPYBRL=X": "Iene Japonês",
-            "CHFBRL=X": "Franco Suíço",
-            "CNYBRL=X": "Yuan Chinês",
-            "AUDBRL=X": "Dólar Australiano",
-            "CADBRL=X": "Dólar Canadense",
-        }
-
-        data_inicial = (datetime.now() - timedelta(days=3650)).strftime("%Y-%m-%d")
-
-        dados_historicos = []
-
-        print("Iniciando download do histórico das moedas...")
+    Lê a configuração das moedas cotadas em Real.
 
-        for simbolo, nome in moedas.items():
-            try:
-                moeda = yf.Ticker(simbolo)
-                hist = moeda.history(start=data_inicial)
+    Args:
+        caminho (str): Arquivo JSON com código ISO -> nome da moeda.
+                       None usa PUCINVEST_MOEDAS ou etl/moedas.json.
 
-                if hist.empty:
-                    continue
+    Returns:
+        dict: Código da moeda (ex: 'USD') -> nome (ex: 'Dólar Americano').
+    """
+    caminho = caminho or os.environ.get(
+        'PUCINVEST_MOEDAS',
+        os.path.join(os.path.dirname(__file__), 'moedas.json')
+    )
+    with open(caminho, 'r', encoding='UTF-8') as file:
+        return json.load(file)
+
+# Pares cotados diretamente baixados junto com os pares em dólar no modo
+# triangulado, apenas para conferir as taxas derivadas (verificar_consistencia).
+PARES_VERIFICACAO = ("EURBRL=X",)
+
+def baixar_historico_cambio(tamanho_lote=TAMANHO_LOTE_PADRAO, incremental=False,
+                            workers=WORKERS_PADRAO, triangular=False, moedas=None):
+    """
+    Baixa o histórico dos últimos 10 anos das moedas configuradas (ver
+    carregar_moedas) em relação ao Real e salva em um arquivo CSV (e no
+    Parquet correspondente).
 
-                hist["Simbolo"] = simbolo
-                hist["Nome"] = nome
+    Cada símbolo é gravado assim que chega (ver EscritorHistorico), então o
+    histórico completo nunca fica em memória.
 
-                hist = hist.reset_index()
-                hist["Date"] = hist["Date"].dt.strftime("%Y-%m-%d")
+    No modo triangulado são baixados apenas os pares em dólar (USDBRL=X,
+    USDEUR=X, ...) e cada XXXBRL=X é derivado deles (ver
+    calcular_taxas_cruzadas). Os pares de PARES_VERIFICACAO vêm no mesmo lote
+    e são comparados com as taxas derivadas; o desvio é impresso e registrado
+    nas métricas da execução.
 
-                dados_historicos.append(hist)
+    Args:
+        tamanho_lote (int): Quantidade de pares por requisição ao provedor.
+                            Use 1 (ou None) para baixar um par por vez.
+        incremental (bool): Se True, baixa apenas o trecho ainda não salvo de cada
+                            par (com uma janela de sobreposição) e mescla ao CSV.
+        workers (int): Número máximo de downloads simultâneos.
+        triangular (bool): Se True, deriva os pares em Real dos pares em dólar.
+        moedas (dict): Código da moeda -> nome (ver carregar_moedas). None lê a configuração.
+
+    Returns:
+        int: Número de linhas do histórico salvo (0 se nada foi baixado).
+    """
+    try:
+        moedas = {
+            ticker_cambio(codigo): nome
+            for codigo, nome in (moedas or carregar_moedas()).items()
+        }
 
-                print(f"Dados baixados para {nome} ({simbolo})")
+        data_inicial = (datetime.now() - timedelta(days=3650)).strftime("%Y-%m-%d")
 
-            except Exception as e:
-                print(f"Erro ao baixar dados de {simbolo}: {str(e)}")
-                continue
+        results_dir = _get_results_dir()
+        nome_arquivo = os.path.join(results_dir, "historico_cambio.csv")
 
-        if dados_historicos:
-            df_historico = pd.concat(dados_historicos, ignore_index=True)
+        if incremental:
+            ultimas_datas = ler_ultimas_datas("historico_cambio")
+            mapa_simbolos = {simbolo: simbolo for simbolo in moedas}
+            datas_iniciais = calcular_datas_iniciais(mapa_simbolos, data_inicial, ultimas_datas)
+        else:
+            datas_iniciais = {simbolo: data_inicial for simbolo in moedas}
+
+        if triangular:
+            # Cada par em Real depende do seu par em dólar e do USDBRL=X, que
+            # começa na menor data inicial entre eles.
+            codigos = {simbolo: simbolo[:3] for simbolo in moedas}
+            pares_pivo = {
+                ticker_cambio(MOEDA_PIVO, codigo): simbolo
+                for simbolo, codigo in codigos.items() if codigo != MOEDA_PIVO
+            }
+            pares_pivo[ticker_cambio(MOEDA_PIVO)] = ticker_cambio(MOEDA_PIVO)
+            datas_download = {par: datas_iniciais[simbolo] for par, simbolo in pares_pivo.items()}
+            datas_download[ticker_cambio(MOEDA_PIVO)] = min(datas_iniciais.values())
+            for par in PARES_VERIFICACAO:
+                if par in moedas:
+                    datas_download[par] = datas_iniciais[par]
+        else:
+            datas_download = datas_iniciais
 
-            df_historico = df_historico[["Date", "Simbolo", "Nome", "Close"]]
-            df_historico.columns = ["Data", "Simbolo", "Nome_Moeda", "Preco"]
+        checkpoint = Checkpoint("historico_cambio")
 
-            df_historico["Variacao"] = (
-                df_historico.groupby("Simbolo")["Preco"].pct_change() * 100
-            )
+        print("Iniciando download do histórico das moedas...")
 
-            results_dir = _get_results_dir()
-            nome_arquivo = os.path.join(results_dir, "historico_cambio.csv")
-            df_historico.to_csv(nome_arquivo, index=False)
+        def formatar(hist):
+            hist = hist[["Date", "Simbolo", "Nome", "Close"]]
+            hist.columns = ["Data", "Simbolo", "Nome_Moeda", "Preco"]
+            return hist
+
+        def baixar():
+            if tamanho_lote and tamanho_lote > 1:
+                for hist in iterar_lotes(list(datas_download), datas_download, tamanho_lote, workers, checkpoint):
+                    if hist.empty:
+                        continue
+                    hist["Simbolo"] = hist["Ticker"]
+                    hist["Nome"] = hist["Ticker"].map(moedas)
+                    yield hist
+            else:
+                provedor = obter_provedor_mercado()
+
+                def baixar_par(simbolo):
+                    with medir_simbolo(simbolo, inicio=datas_download[simbolo]) as metricas:
+                        hist = checkpoint.obter(
+                            simbolo,
+                            datas_download[simbolo],
+                            lambda: provedor.historico(simbolo, datas_download[simbolo]),
+                        )
+                        metricas["linhas"] = len(hist)
+
+                    if hist.empty:
+                        return hist
+
+                    hist["Simbolo"] = simbolo
+                    hist["Nome"] = moedas.get(simbolo)
+
+                    hist = hist.reset_index()
+
+                    print(f"Dados baixados para {moedas.get(simbolo, simbolo)} ({simbolo})")
+                    return hist
+
+                for simbolo, hist, erro in iterar_em_paralelo(datas_download, baixar_par, workers):
+                    if erro is not None:
+                        print(f"Erro ao baixar dados de {simbolo}: {str(erro)}")
+                    elif not hist.empty:
+                        yield hist
+
+        with EscritorHistorico("historico_cambio", nome_arquivo, incremental) as escritor:
+            if not triangular:
+                for hist in baixar():
+                    escritor.escrever(formatar(hist))
+            else:
+                # Os pares em dólar são poucos e curtos (uma cotação por dia),
+                # então ficam em memória até todos chegarem.
+                partes = [formatar(hist) for hist in baixar()]
+                if partes:
+                    df_baixado = pd.concat(partes, ignore_index=True)
+                    df_baixado["Data"] = normalizar_datas(df_baixado["Data"])
+
+                    df_pivo = df_baixado[df_baixado["Simbolo"].isin(pares_pivo)]
+                    df_derivado = calcular_taxas_cruzadas(
+                        df_pivo, [(codigo, MOEDA_BASE) for codigo in codigos.values()]
+                    )
+                    print(f"{df_derivado['Simbolo'].nunique()} pares derivados de "
+                          f"{df_pivo['Simbolo'].nunique()} pares em dólar")
+
+                    df_direto = df_baixado[df_baixado["Simbolo"].isin(PARES_VERIFICACAO)]
+                    if not df_direto.empty:
+                        df_consistencia = verificar_consistencia(df_derivado, df_direto)
+                        for par in df_consistencia.itertuples(index=False):
+                            print(f"Consistência {par.Simbolo}: desvio mediano {par.Desvio_Mediano:.3f}%, "
+                                  f"máximo {par.Desvio_Maximo:.3f}% em {par.Datas} datas"
+                                  f"{'' if par.Consistente else ' (acima da tolerância)'}")
+                            registrar_evento(
+                                "consistencia_cambio",
+                                simbolo=par.Simbolo,
+                                datas=int(par.Datas),
+                                desvio_mediano=float(par.Desvio_Mediano),
+                                desvio_maximo=float(par.Desvio_Maximo),
+                                consistente=bool(par.Consistente),
+                            )
+
+                    for simbolo, df_par in df_derivado.groupby("Simbolo", sort=False):
+                        df_par = df_par[df_par["Data"] >= pd.Timestamp(datas_iniciais[simbolo])]
+                        escritor.escrever(df_par.assign(Nome_Moeda=moedas[simbolo])[
+                            ["Data", "Simbolo", "Nome_Moeda", "Preco"]
+                        ])
+
+        if escritor.simbolos:
+            checkpoint.limpar()
             print(f"\nHistórico salvo com sucesso em '{nome_arquivo}'")
-
-            return df_historico
+            gerar_matriz('historico_cambio')
+            return escritor.linhas
         else:
             print("\nNenhum dado histórico foi baixado")
-            return pd.DataFrame()
+            return 0
 
     except Exception as e:
         print(f"Erro ao processar dados históricos: {str(e)}")
-        return pd.DataFrame()
+        return 0
 
 
 def obter_variacao_cambio(periodo="1d"):
     """
-    Obtém a variação das moedas no período especificado.
+    Obtém a variação das moedas no período especificado (ver obter_variacoes).
 
     Args:
         periodo (str): Período de análise ('1d' para 30 dias, '1mo' para mensal, '1y' para anual)
     """
     try:
-        results_dir = _get_results_dir()
-        nome_arquivo = os.path.join(results_dir, "historico_cambio.csv")
-        df_historico = pd.read_csv(nome_arquivo)
-        df_historico["Data"] = pd.to_datetime(df_historico["Data"])
-
-        data_mais_recente = df_historico["Data"].max()
-
-        if periodo == "1d":
-            data_inicio = data_mais_recente - pd.Timedelta(days=30)
-            df_periodo = df_historico[df_historico["Data"] >= data_inicio].copy()
-            df_periodo = (
-                df_periodo.groupby("Simbolo")
-                .agg({"Preco": ["first", "last"], "Nome_Moeda": "first"})
-                .reset_index()
-            )
-            df_periodo.columns = [
-                "Simbolo",
-                "Preco_Inicial",
-                "Preco_Final",
-                "Nome_Moeda",
-            ]
-
-        elif periodo == "1mo":
-            df_historico["Mes_Ano"] = df_historico["Data"].dt.to_period("M")
-            df_periodo = (
-                df_historico.groupby(["Simbolo", "Mes_Ano", "Nome_Moeda"])["Preco"]
-                .mean()
-                .reset_index()
-            )
-            df_periodo = df_periodo.sort_values(["Simbolo", "Mes_Ano"])
-            df_periodo = (
-                df_periodo.groupby("Simbolo")
-                .agg({"Preco": ["first", "last"], "Nome_Moeda": "first"})
-                .reset_index()
-            )
-            df_periodo.columns = [
-                "Simbolo",
-                "Preco_Inicial",
-                "Preco_Final",
-                "Nome_Moeda",
-            ]
+        df_variacoes = obter_variacoes("historico_cambio", periodo)
 
-        else:
-            df_historico["Ano"] = df_historico["Data"].dt.year
-            df_periodo = (
-                df_historico.groupby(["Simbolo", "Ano", "Nome_Moeda"])["Preco"]
-                .mean()
-                .reset_index()
-            )
-            df_periodo = df_periodo.sort_values(["Simbolo", "Ano"])
-            df_periodo = (
-                df_periodo.groupby("Simbolo")
-                .agg({"Preco": ["first", "last"], "Nome_Moeda": "first"})
-                .reset_index()
-            )
-            df_periodo.columns = [
-                "Simbolo",
-                "Preco_Inicial",
-                "Preco_Final",
-                "Nome_Moeda",
-            ]
-
-        df_periodo["Variacao"] = (
-            (df_periodo["Preco_Final"] / df_periodo["Preco_Inicial"]) - 1
-        ) * 100
-
-        if df_periodo.empty:
+        if df_variacoes.empty:
             return pd.DataFrame()
 
-        df_periodo["Preço"] = df_periodo["Preco_Final"].round(
-            4
-        )
-        df_periodo["Variação (%)"] = df_periodo["Variacao"].round(2)
-        df_periodo["Símbolo"] = df_periodo["Simbolo"]
-        df_periodo["Nome"] = df_periodo["Nome_Moeda"]
-
-        return df_periodo[["Símbolo", "Nome", "Preço", "Variação (%)"]].sort_values(
-            "Variação (%)", ascending=False
-        )
+        return formatar_variacoes(df_variacoes, casas_preco=4)
 
     except Exception as e:
         print(f"Erro ao obter variação do câmbio: {str(e)}")
@@ -176,12 +240,16 @@ def obter_variacao_cambio(periodo="1d"):
 
 def get_usdbrl_rate():
     """
-    Obtém a taxa de câmbio USD/BRL mais recente.
+    Obtém a taxa de câmbio USD/BRL mais recente pelo serviço de cotações
+    (último fechamento, reaproveitado por TTL_COTACOES segundos).
+
+    Para converter históricos use etl.conversao, que aplica a taxa de cada dia.
     """
     try:
-        usdbrl = yf.Ticker("USDBRL=X")
-        hist = usdbrl.history(period="1d", interval="1m")
-        return hist["Close"].iloc[-1]
+        taxa = obter_cotacoes([TICKER_USDBRL]).iloc[0]
+        if pd.isna(taxa):
+            raise ValueError("cotação indisponível")
+        return float(taxa)
     except Exception as e:
         print(f"Erro ao buscar taxa USD/BRL: {e}")
         return 5.0
\ No newline at end of file
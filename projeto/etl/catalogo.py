@@ -0,0 +1,144 @@
+import os
+import json
+import hashlib
+import threading
+from datetime import datetime
+from etl.publicacao import publicar_arquivo
+
+_catalogo_lock = threading.Lock()
+
+
+def _get_results_dir():
+    """
+    Retorna o diretório de resultados do projeto.
+    """
+    return os.path.abspath(os.environ.get('PUCINVEST_RESULTS_DIR') or os.path.join(os.path.dirname(__file__), '..', '..', 'results'))
+
+
+def _caminho_catalogo():
+    """
+    Retorna o caminho do arquivo de catálogo dos artefatos do ETL.
+    """
+    return os.path.join(_get_results_dir(), 'catalogo.json')
+
+
+def _ler_catalogo():
+    """
+    Lê o catálogo do disco. Retorna um catálogo vazio se ele ainda não existir.
+    """
+    caminho = _caminho_catalogo()
+    if not os.path.exists(caminho):
+        return {'artefatos': {}}
+    with open(caminho, 'r', encoding='UTF-8') as file:
+        return json.load(file)
+
+
+def _gravar_catalogo(catalogo):
+    """
+    Grava o catálogo em um arquivo temporário e o troca atomicamente pelo atual.
+    """
+    def escrever(temporario):
+        with open(temporario, 'w', encoding='UTF-8') as file:
+            json.dump(catalogo, file, ensure_ascii=False, indent=2)
+
+    publicar_arquivo(_caminho_catalogo(), escrever)
+
+
+def calcular_hash(caminho):
+    """
+    Calcula o SHA-256 do conteúdo de um arquivo.
+    """
+    resumo = hashlib.sha256()
+    with open(caminho, 'rb') as file:
+        for bloco in iter(lambda: file.read(1024 * 1024), b''):
+            resumo.update(bloco)
+    return resumo.hexdigest()
+
+
+def registrar_artefato(tipo, caminho, etapa, linhas=None, data=None):
+    """
+    Registra no catálogo um artefato produzido por uma etapa do ETL.
+
+    Args:
+        tipo (str): Tipo do artefato (ex: 'ibrx50', 'historico_acoes').
+        caminho (str): Caminho do arquivo gerado.
+        etapa (str): Etapa do ETL que produziu o artefato.
+        linhas (int): Número de linhas de dados do artefato.
+        data (str): Data de referência dos dados ('YYYY-MM-DD'). None usa a data atual.
+
+    Returns:
+        dict: Registro gravado no catálogo.
+    """
+    registro = {
+        'caminho': os.path.abspath(caminho),
+        'data': data or datetime.now().strftime('%Y-%m-%d'),
+        'linhas': linhas,
+        'hash': calcular_hash(caminho),
+        'etapa': etapa,
+        'registrado_em': datetime.now().isoformat(timespec='seconds'),
+    }
+
+    with _catalogo_lock:
+        catalogo = _ler_catalogo()
+        historico = catalogo['artefatos'].setdefault(tipo, [])
+        historico[:] = [r for r in historico if r['caminho'] != registro['caminho']]
+        historico.append(registro)
+        _gravar_catalogo(catalogo)
+
+    return registro
+
+
+def obter_artefato(tipo):
+    """
+    Retorna o registro mais recente de um tipo de artefato.
+
+    Args:
+        tipo (str): Tipo do artefato (ex: 'ibrx50').
+
+    Returns:
+        dict: Registro do artefato (caminho, data, linhas, hash, etapa), ou None
+              se não houver registro ou se o arquivo tiver sido removido.
+    """
+    with _catalogo_lock:
+        historico = _ler_catalogo()['artefatos'].get(tipo)
+
+    if not historico or not os.path.exists(historico[-1]['caminho']):
+        return None
+    return historico[-1]
+
+
+def listar_artefatos(tipo):
+    """
+    Retorna todos os registros de um tipo de artefato, do mais antigo ao mais recente.
+    """
+    with _catalogo_lock:
+        return list(_ler_catalogo()['artefatos'].get(tipo, []))
+
+
+def aplicar_retencao(tipo, manter):
+    """
+    Mantém apenas os `manter` registros mais recentes de um tipo de artefato,
+    apagando os arquivos dos demais.
+
+    Args:
+        tipo (str): Tipo do artefato.
+        manter (int): Quantidade de versões a preservar.
+
+    Returns:
+        list: Registros removidos.
+    """
+    with _catalogo_lock:
+        catalogo = _ler_catalogo()
+        historico = catalogo['artefatos'].get(tipo, [])
+        if len(historico) <= manter:
+            return []
+
+        removidos = historico[:len(historico) - manter]
+        catalogo['artefatos'][tipo] = historico[len(historico) - manter:]
+        _gravar_catalogo(catalogo)
+
+    for registro in removidos:
+        if os.path.exists(registro['caminho']):
+            os.remove(registro['caminho'])
+
+    return removidos
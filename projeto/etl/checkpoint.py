@@ -0,0 +1,173 @@
+import os
+import json
+import hashlib
+import shutil
+import threading
+from datetime import datetime
+import pandas as pd
+from etl.cache import registrar_respostas
+from etl.publicacao import publicar_arquivo
+
+ARQUIVO_MANIFESTO = 'manifesto.json'
+
+
+def _get_results_dir():
+    """
+    Retorna o diretório de resultados do projeto.
+    """
+    return os.path.abspath(os.environ.get('PUCINVEST_RESULTS_DIR') or os.path.join(os.path.dirname(__file__), '..', '..', 'results'))
+
+
+class Checkpoint:
+    """
+    Checkpoints por símbolo de uma etapa do ETL.
+
+    O checkpoint é um manifesto (results/checkpoints/<nome>/<data>/manifesto.json)
+    das buscas já concluídas, cada uma apontando para a resposta que o cache em
+    disco guardou (ver etl.cache). Se a etapa falhar no meio, a próxima
+    execução do mesmo dia relê essas respostas e busca apenas os símbolos que
+    faltaram ou falharam. Só quando a resposta não passou pelo cache (cache
+    desligado, provedor sem cache) ela é salva no diretório do checkpoint.
+    Resultados vazios não são registrados, para que sejam buscados de novo.
+    Várias chaves podem apontar para a mesma resposta (ex: os tickers de um
+    lote), e cada uma é reaproveitada ou buscada de novo separadamente.
+    Depois que a etapa publica seus arquivos, limpar() apaga os checkpoints.
+    """
+
+    def __init__(self, nome, data=None):
+        """
+        Args:
+            nome (str): Nome da etapa ou do artefato (ex: 'historico_acoes').
+            data (str): Dia de validade dos checkpoints ('YYYY-MM-DD'). None usa hoje.
+        """
+        self.nome = nome
+        self.base = os.path.join(_get_results_dir(), 'checkpoints', nome)
+        self.diretorio = os.path.join(self.base, data or datetime.now().strftime('%Y-%m-%d'))
+        self._lock = threading.Lock()
+        self.reaproveitados = 0
+
+        # Checkpoints de outros dias já estão desatualizados.
+        if os.path.isdir(self.base):
+            for entrada in os.listdir(self.base):
+                caminho = os.path.join(self.base, entrada)
+                if caminho != self.diretorio and os.path.isdir(caminho):
+                    shutil.rmtree(caminho, ignore_errors=True)
+
+        self._manifesto = {}
+        caminho_manifesto = os.path.join(self.diretorio, ARQUIVO_MANIFESTO)
+        if os.path.exists(caminho_manifesto):
+            with open(caminho_manifesto, 'r', encoding='UTF-8') as file:
+                self._manifesto = json.load(file)
+
+    @staticmethod
+    def _chave(chave, inicio):
+        return f"{chave}__{inicio}"
+
+    def _caminho(self, chave, inicio):
+        # O nome do arquivo tem tamanho fixo; a chave legível fica no manifesto.
+        resumo = hashlib.sha256(self._chave(chave, inicio).encode('UTF-8')).hexdigest()
+        return os.path.join(self.diretorio, f"{resumo}.pkl")
+
+    def _registrar(self, chaves, inicio, caminho):
+        """
+        Acrescenta (chave, inicio) -> caminho ao manifesto para cada chave e o regrava.
+        """
+        with self._lock:
+            for chave in chaves:
+                self._manifesto[self._chave(chave, inicio)] = caminho
+            conteudo = json.dumps(self._manifesto, ensure_ascii=False, indent=1)
+
+            def escrever(temporario):
+                with open(temporario, 'w', encoding='UTF-8') as file:
+                    file.write(conteudo)
+
+            publicar_arquivo(os.path.join(self.diretorio, ARQUIVO_MANIFESTO), escrever)
+
+    def localizar(self, chave, inicio):
+        """
+        Retorna o arquivo com o resultado registrado para (chave, inicio), ou
+        None se não houver (ou se a resposta já saiu do cache).
+        """
+        caminho = self._manifesto.get(self._chave(chave, inicio))
+        if caminho is None or not os.path.exists(caminho):
+            return None
+        return caminho
+
+    def ler(self, caminho):
+        """
+        Lê um resultado devolvido por localizar(), ou retorna None se o
+        arquivo não existir mais.
+        """
+        try:
+            df = pd.read_pickle(caminho)
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            self.reaproveitados += 1
+        return df
+
+    def carregar(self, chave, inicio):
+        """
+        Retorna o resultado registrado para (chave, inicio), ou None se não
+        houver (ou se a resposta já saiu do cache).
+        """
+        caminho = self.localizar(chave, inicio)
+        return None if caminho is None else self.ler(caminho)
+
+    @staticmethod
+    def buscar(funcao):
+        """
+        Executa `funcao()` e retorna (resultado, arquivo do cache que o guarda),
+        com None no lugar do arquivo se o resultado não veio de exatamente uma
+        resposta do cache.
+        """
+        with registrar_respostas() as respostas:
+            df = funcao()
+        caminho = respostas[0][0] if len(respostas) == 1 and respostas[0][1] is df else None
+        return df, caminho
+
+    def salvar(self, chave, inicio, df, caminho=None):
+        """
+        Registra o resultado de (chave, inicio). DataFrames vazios são ignorados.
+
+        Args:
+            chave (str | list): Símbolo ou identificador da busca, ou uma lista
+                                deles quando todos compartilham o mesmo resultado.
+            inicio (str): Início do intervalo buscado.
+            df (DataFrame): Resultado da busca.
+            caminho (str): Arquivo do cache que já guarda `df`. None salva uma
+                           única cópia no diretório do checkpoint.
+        """
+        if df is None or df.empty:
+            return
+        chaves = [chave] if isinstance(chave, str) else list(chave)
+        if not chaves:
+            return
+        if caminho is None:
+            caminho = self._caminho('|'.join(chaves), inicio)
+            publicar_arquivo(caminho, lambda temporario: pd.to_pickle(df, temporario))
+        self._registrar(chaves, inicio, caminho)
+
+    def obter(self, chave, inicio, funcao):
+        """
+        Retorna o resultado registrado para (chave, inicio) ou, se não houver,
+        executa `funcao()` e registra o que ela devolver, apontando para a
+        resposta do cache quando `funcao` devolve exatamente uma delas.
+
+        Args:
+            chave (str): Símbolo ou identificador da busca.
+            inicio (str): Início do intervalo buscado.
+            funcao (callable): Função sem argumentos que faz a busca.
+        """
+        df = self.carregar(chave, inicio)
+        if df is None:
+            df, caminho = self.buscar(funcao)
+            self.salvar(chave, inicio, df, caminho)
+        return df
+
+    def limpar(self):
+        """
+        Apaga todos os checkpoints da etapa. As respostas em cache continuam
+        até vencer o TTL (ver etl.cache.remover_expirados).
+        """
+        shutil.rmtree(self.base, ignore_errors=True)
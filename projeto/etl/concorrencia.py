@@ -0,0 +1,128 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
+import contextvars
+import requests
+from requests.adapters import HTTPAdapter
+
+WORKERS_PADRAO = 8
+
+_sessao_http = None
+_sessao_lock = threading.Lock()
+
+
+def criar_sessao_http(tamanho_pool=WORKERS_PADRAO):
+    """
+    Cria uma sessão HTTP com pool de conexões dimensionado para `tamanho_pool`
+    requisições simultâneas.
+
+    Usa uma sessão curl_cffi quando disponível (exigida pelas versões recentes
+    do yfinance) e, caso contrário, uma requests.Session com HTTPAdapter.
+
+    Args:
+        tamanho_pool (int): Número máximo de conexões mantidas por host.
+
+    Returns:
+        Session: Sessão HTTP reutilizável entre threads.
+    """
+    try:
+        from curl_cffi import requests as curl_requests
+        return curl_requests.Session(impersonate="chrome")
+    except ImportError:
+        sessao = requests.Session()
+        adaptador = HTTPAdapter(pool_connections=tamanho_pool, pool_maxsize=tamanho_pool)
+        sessao.mount("https://", adaptador)
+        sessao.mount("http://", adaptador)
+        return sessao
+
+
+def obter_sessao_http():
+    """
+    Retorna a sessão HTTP compartilhada por todos os carregadores do ETL,
+    criando-a na primeira chamada.
+    """
+    global _sessao_http
+    with _sessao_lock:
+        if _sessao_http is None:
+            _sessao_http = criar_sessao_http()
+        return _sessao_http
+
+
+def buscar_em_paralelo(chaves, funcao, workers=WORKERS_PADRAO):
+    """
+    Executa `funcao(chave)` para cada chave em um pool limitado de threads.
+
+    Args:
+        chaves (iterable): Símbolos, lotes ou códigos a buscar.
+        funcao (callable): Função que recebe uma chave e devolve o resultado.
+        workers (int): Número máximo de requisições simultâneas.
+
+    Returns:
+        tuple: (resultados, erros), dicionários chave -> resultado e
+               chave -> exceção, na ordem original das chaves.
+    """
+    chaves = list(chaves)
+    resultados = {}
+    erros = {}
+
+    if not chaves:
+        return resultados, erros
+
+    workers = max(1, min(int(workers), len(chaves)))
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # Cada tarefa herda o contexto de quem chamou (ex: etapa em medição).
+        futuros = {executor.submit(contextvars.copy_context().run, funcao, chave): chave for chave in chaves}
+        for futuro in as_completed(futuros):
+            chave = futuros[futuro]
+            try:
+                resultados[chave] = futuro.result()
+            except Exception as e:
+                erros[chave] = e
+
+    resultados = {chave: resultados[chave] for chave in chaves if chave in resultados}
+    erros = {chave: erros[chave] for chave in chaves if chave in erros}
+    return resultados, erros
+
+
+def iterar_em_paralelo(chaves, funcao, workers=WORKERS_PADRAO):
+    """
+    Executa `funcao(chave)` para cada chave em um pool limitado de threads e
+    devolve cada resultado assim que fica pronto.
+
+    Diferente de buscar_em_paralelo, não acumula os resultados: no máximo
+    2 * `workers` tarefas ficam em andamento ou aguardando consumo, então a
+    memória usada não cresce com o número de chaves.
+
+    Args:
+        chaves (iterable): Símbolos, lotes ou códigos a buscar.
+        funcao (callable): Função que recebe uma chave e devolve o resultado.
+        workers (int): Número máximo de requisições simultâneas.
+
+    Yields:
+        tuple: (chave, resultado, erro), com erro None em caso de sucesso,
+               na ordem em que as tarefas terminam.
+    """
+    chaves = iter(chaves)
+    workers = max(1, int(workers))
+    limite = 2 * workers
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pendentes = {}
+
+        def submeter():
+            for chave in chaves:
+                futuro = executor.submit(contextvars.copy_context().run, funcao, chave)
+                pendentes[futuro] = chave
+                if len(pendentes) >= limite:
+                    return
+
+        submeter()
+        while pendentes:
+            futuro = next(as_completed(pendentes))
+            chave = pendentes.pop(futuro)
+            try:
+                resultado, erro = futuro.result(), None
+            except Exception as e:
+                resultado, erro = None, e
+            submeter()
+            yield chave, resultado, erro
@@ -0,0 +1,240 @@
+import threading
+import numpy as np
+import pandas as pd
+from etl.armazenamento import ler_historico
+from etl.matriz import montar_matriz, CALENDARIO_POR_ARTEFATO
+from etl.variacoes import versao_dados
+
+HISTORICO_CAMBIO = 'historico_cambio'
+
+# Moeda em que cada histórico é armazenado.
+MOEDA_POR_ARTEFATO = {
+    'historico_acoes': 'BRL',
+    'historico_criptomoedas': 'USD',
+    HISTORICO_CAMBIO: 'BRL',
+}
+
+# Moeda de cotação dos pares salvos em historico_cambio (ex: USDBRL=X).
+MOEDA_BASE = 'BRL'
+
+# Moeda dos pares baixados quando as taxas são trianguladas (ex: USDEUR=X).
+MOEDA_PIVO = 'USD'
+
+# Maior distância, em dias, entre uma data do histórico e a última taxa de
+# câmbio anterior a ela. Datas sem taxa nesse intervalo ficam sem conversão.
+TOLERANCIA_CAMBIO_DIAS = 7
+
+# Desvio máximo (em %) aceito entre uma taxa triangulada e a cotada
+# diretamente. Os provedores fecham cada par em horários ligeiramente
+# diferentes, então pequenas diferenças são esperadas.
+TOLERANCIA_CONSISTENCIA = 1.0
+
+_cache = {}
+# Reentrante: a conversão de um histórico consulta o cache das taxas.
+_cache_lock = threading.RLock()
+
+
+def ticker_cambio(moeda, moeda_cotacao=MOEDA_BASE):
+    """
+    Retorna o símbolo do par no formato do Yahoo Finance (ex: 'USDBRL=X'):
+    quantas unidades de `moeda_cotacao` valem uma unidade de `moeda`.
+    """
+    return f"{moeda}{moeda_cotacao}=X"
+
+
+def _em_cache(chave, versao, calcular):
+    """
+    Retorna o valor em cache para `chave` se ele foi calculado sobre a mesma
+    versão dos dados; caso contrário, recalcula e substitui.
+    """
+    with _cache_lock:
+        versao_cache, valor = _cache.get(chave, (None, None))
+        if versao_cache != versao:
+            valor = calcular()
+            _cache[chave] = (versao, valor)
+        return valor
+
+
+def obter_taxas(moeda_origem, moeda_destino):
+    """
+    Retorna a série histórica da taxa que converte `moeda_origem` em
+    `moeda_destino`, lida de historico_cambio. Pares cotados em BRL são usados
+    diretamente (ex: USD -> BRL) ou invertidos (BRL -> USD); os demais são
+    triangulados pelo BRL (ex: EUR -> USD = EURBRL / USDBRL, com as datas
+    alinhadas como em converter_historico).
+
+    Args:
+        moeda_origem (str): Código da moeda de origem (ex: 'USD').
+        moeda_destino (str): Código da moeda de destino (ex: 'BRL').
+
+    Returns:
+        DataFrame: Colunas Data e Taxa (float64), ordenadas por Data.
+    """
+    if moeda_origem == moeda_destino:
+        raise ValueError(f"Moedas de origem e destino iguais: {moeda_origem}")
+
+    if MOEDA_BASE not in (moeda_origem, moeda_destino):
+        def triangular():
+            df_origem = obter_taxas(moeda_origem, MOEDA_BASE)
+            df_destino = obter_taxas(MOEDA_BASE, moeda_destino)
+            df_taxas = converter_historico(df_origem, MOEDA_BASE, moeda_destino, colunas=('Taxa',),
+                                           taxas=df_destino)
+            return df_taxas.dropna(subset=['Taxa'], ignore_index=True)
+
+        return _em_cache(('taxas', moeda_origem, moeda_destino), versao_dados(HISTORICO_CAMBIO), triangular)
+
+    moeda = moeda_origem if moeda_destino == MOEDA_BASE else moeda_destino
+
+    def calcular():
+        df_par = ler_historico(HISTORICO_CAMBIO, simbolos=[ticker_cambio(moeda)], colunas=['Data', 'Preco'])
+        df_par = df_par.dropna(subset=['Preco']).sort_values('Data', ignore_index=True)
+        taxa = df_par['Preco'].astype('float64')
+        if moeda_origem == MOEDA_BASE:
+            taxa = 1 / taxa
+        return pd.DataFrame({'Data': df_par['Data'], 'Taxa': taxa})
+
+    return _em_cache(('taxas', moeda_origem, moeda_destino), versao_dados(HISTORICO_CAMBIO), calcular)
+
+
+def converter_historico(df, moeda_origem, moeda_destino, colunas=('Preco',), taxas=None):
+    """
+    Converte colunas de preço de um histórico para outra moeda usando, em cada
+    data, a última taxa de câmbio igual ou anterior a ela (merge as-of com
+    historico_cambio). Datas sem taxa nos TOLERANCIA_CAMBIO_DIAS anteriores
+    ficam NaN.
+
+    Args:
+        df (DataFrame): Histórico com coluna Data (um ou vários símbolos).
+        moeda_origem (str): Moeda dos preços em `df` (ex: 'USD').
+        moeda_destino (str): Moeda desejada (ex: 'BRL').
+        colunas (tuple): Colunas a converter.
+        taxas (DataFrame): Taxas a usar (colunas Data e Taxa). None usa obter_taxas.
+
+    Returns:
+        DataFrame: Cópia de `df` ordenada por Data, com `colunas` convertidas (float64).
+    """
+    if moeda_origem == moeda_destino:
+        return df.sort_values('Data', ignore_index=True)
+
+    if taxas is None:
+        taxas = obter_taxas(moeda_origem, moeda_destino)
+    df_convertido = pd.merge_asof(
+        df.sort_values('Data', ignore_index=True),
+        taxas.rename(columns={'Taxa': '_Taxa'}),
+        on='Data',
+        direction='backward',
+        tolerance=pd.Timedelta(days=TOLERANCIA_CAMBIO_DIAS),
+    )
+    for coluna in colunas:
+        df_convertido[coluna] = df_convertido[coluna].astype('float64') * df_convertido['_Taxa']
+    return df_convertido.drop(columns='_Taxa')
+
+
+def obter_historico_convertido(nome, simbolo, moeda):
+    """
+    Retorna o histórico de preços de um ativo na moeda pedida, convertido com
+    a taxa de câmbio de cada dia (ex: BTC em BRL pelo USDBRL de cada data).
+
+    O resultado fica em cache por (histórico, símbolo, moeda) até o ETL
+    publicar uma nova versão do histórico ou do câmbio, então trocar de moeda
+    nas páginas não refaz a conversão.
+
+    Args:
+        nome (str): Artefato histórico (ex: 'historico_criptomoedas').
+        simbolo (str): Símbolo do ativo.
+        moeda (str): Moeda desejada (ex: 'BRL', 'USD').
+
+    Returns:
+        DataFrame: Colunas Data e Preco, ordenadas por Data.
+    """
+    moeda_origem = MOEDA_POR_ARTEFATO.get(nome, MOEDA_BASE)
+    versao = (versao_dados(nome), versao_dados(HISTORICO_CAMBIO) if moeda != moeda_origem else None)
+
+    def calcular():
+        df = ler_historico(nome, simbolos=[simbolo], colunas=['Data', 'Preco'])
+        return converter_historico(df, moeda_origem, moeda)
+
+    return _em_cache(('historico', nome, simbolo, moeda), versao, calcular)
+
+
+def calcular_taxas_cruzadas(df_pivo, pares, moeda_pivo=MOEDA_PIVO):
+    """
+    Deriva as taxas de vários pares a partir dos pares cotados na moeda pivô
+    (ex: EURBRL = USDBRL / USDEUR), de forma vetorizada.
+
+    Os pares pivô são alinhados no calendário de historico_cambio (dias
+    úteis, repetindo a última cotação de cada par, ver montar_matriz) antes
+    da divisão, então cada taxa derivada usa as duas pontas da mesma data.
+
+    Args:
+        df_pivo (DataFrame): Histórico longo (Data, Simbolo, Preco) dos pares
+                             `moeda_pivo`/XXX (ex: USDBRL=X, USDEUR=X).
+        pares (list): Tuplas (moeda, moeda_cotacao) a derivar (ex: ('EUR', 'BRL')).
+        moeda_pivo (str): Moeda comum aos pares baixados.
+
+    Returns:
+        DataFrame: Colunas Data, Simbolo (ex: 'EURBRL=X') e Preco, sem datas sem
+                   taxa. Pares sem um dos pivôs são ignorados com aviso.
+    """
+    datas, simbolos, _, precos = montar_matriz(df_pivo, CALENDARIO_POR_ARTEFATO[HISTORICO_CAMBIO])
+
+    # Unidades de cada moeda por unidade da moeda pivô; a própria pivô vale 1.
+    colunas = {simbolo[len(moeda_pivo):-2]: coluna for coluna, simbolo in enumerate(simbolos)}
+    colunas[moeda_pivo] = len(simbolos)
+    precos = np.column_stack([precos, np.ones(len(datas))])
+
+    disponiveis = []
+    for moeda, moeda_cotacao in pares:
+        faltantes = [m for m in (moeda, moeda_cotacao) if m not in colunas]
+        if faltantes:
+            print(f"Par {ticker_cambio(moeda, moeda_cotacao)} ignorado: sem cotação de "
+                  f"{', '.join(ticker_cambio(moeda_pivo, m) for m in faltantes)}")
+        else:
+            disponiveis.append((moeda, moeda_cotacao))
+
+    if not disponiveis:
+        return pd.DataFrame(columns=['Data', 'Simbolo', 'Preco'])
+
+    indices_moeda = [colunas[moeda] for moeda, _ in disponiveis]
+    indices_cotacao = [colunas[moeda_cotacao] for _, moeda_cotacao in disponiveis]
+    taxas = precos[:, indices_cotacao] / precos[:, indices_moeda]
+
+    df_taxas = pd.DataFrame({
+        'Data': np.tile(datas, len(disponiveis)),
+        'Simbolo': np.repeat([ticker_cambio(moeda, cotacao) for moeda, cotacao in disponiveis], len(datas)),
+        'Preco': taxas.T.ravel(),
+    })
+    return df_taxas.dropna(subset=['Preco'], ignore_index=True)
+
+
+def verificar_consistencia(df_derivado, df_direto, tolerancia=TOLERANCIA_CONSISTENCIA):
+    """
+    Compara taxas trianguladas com as mesmas taxas cotadas diretamente, nas
+    datas presentes nos dois históricos.
+
+    Args:
+        df_derivado (DataFrame): Resultado de calcular_taxas_cruzadas.
+        df_direto (DataFrame): Histórico longo (Data, Simbolo, Preco) dos pares cotados.
+        tolerancia (float): Desvio máximo aceito, em %.
+
+    Returns:
+        DataFrame: Uma linha por par com Datas comparadas, Desvio_Mediano e
+                   Desvio_Maximo (em %) e Consistente (desvio máximo dentro da
+                   tolerância).
+    """
+    df_comparacao = df_derivado.merge(
+        df_direto[['Data', 'Simbolo', 'Preco']].astype({'Simbolo': 'str'}),
+        on=['Data', 'Simbolo'],
+        suffixes=('_Derivado', '_Direto'),
+    )
+    df_comparacao['Desvio'] = (
+        df_comparacao['Preco_Derivado'] / df_comparacao['Preco_Direto'].astype('float64') - 1
+    ).abs() * 100
+
+    df_relatorio = df_comparacao.groupby('Simbolo').agg(
+        Datas=('Desvio', 'size'),
+        Desvio_Mediano=('Desvio', 'median'),
+        Desvio_Maximo=('Desvio', 'max'),
+    ).reset_index()
+    df_relatorio['Consistente'] = df_relatorio['Desvio_Maximo'] <= tolerancia
+    return df_relatorio
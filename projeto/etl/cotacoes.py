@@ -0,0 +1,132 @@
+import time
+import threading
+import numpy as np
+import pandas as pd
+from concurrent.futures import Future
+from etl.provedores import obter_provedor_mercado
+
+# Tempo (em segundos) em que uma cotação em memória é considerada atual.
+TTL_COTACOES = 60
+
+TICKER_USDBRL = 'USDBRL=X'
+
+
+class ServicoCotacoes:
+    """
+    Cotações atuais de vários ativos com uma única consulta ao provedor.
+
+    Cada chamada a obter() remove os tickers repetidos, reaproveita as
+    cotações obtidas há menos de `ttl` segundos e busca as demais em um só
+    lote (ProvedorMercado.cotacoes). Se outra thread já está buscando um
+    ticker, a chamada espera por essa mesma consulta em vez de repeti-la.
+    """
+
+    def __init__(self, ttl=TTL_COTACOES):
+        """
+        Args:
+            ttl (float): Tempo de vida das cotações em memória, em segundos.
+        """
+        self.ttl = ttl
+        self._cotacoes = {}
+        self._em_andamento = {}
+        self._lock = threading.Lock()
+
+    def _buscar(self, tickers, consulta):
+        """
+        Faz a consulta em lote de `tickers` e entrega o resultado a todas as
+        chamadas que aguardam `consulta`.
+        """
+        precos = pd.Series(np.nan, index=tickers, dtype='float64')
+        try:
+            precos = obter_provedor_mercado().cotacoes(tickers).reindex(tickers).astype('float64')
+        except Exception as e:
+            print(f"Erro ao buscar cotações de {len(tickers)} ativos: {str(e)}")
+        finally:
+            agora = time.monotonic()
+            with self._lock:
+                for ticker, preco in precos.items():
+                    if not np.isnan(preco):
+                        self._cotacoes[ticker] = (agora, float(preco))
+                    self._em_andamento.pop(ticker, None)
+            consulta.set_result(precos)
+
+    def obter(self, tickers):
+        """
+        Retorna o preço atual de cada ticker.
+
+        Args:
+            tickers (list | Series): Tickers, possivelmente repetidos.
+
+        Returns:
+            Series: Preço (float64) na mesma ordem e com o mesmo índice de
+                    `tickers` quando for uma Series; NaN para tickers sem cotação.
+        """
+        indice = tickers.index if isinstance(tickers, pd.Series) else None
+        tickers = list(tickers)
+        unicos = list(dict.fromkeys(ticker for ticker in tickers if isinstance(ticker, str) and ticker))
+
+        precos = {}
+        aguardar = {}
+        buscar = []
+        agora = time.monotonic()
+        with self._lock:
+            for ticker in unicos:
+                cotacao = self._cotacoes.get(ticker)
+                if cotacao is not None and agora - cotacao[0] < self.ttl:
+                    precos[ticker] = cotacao[1]
+                elif ticker in self._em_andamento:
+                    aguardar[ticker] = self._em_andamento[ticker]
+                else:
+                    buscar.append(ticker)
+
+            consulta = Future()
+            for ticker in buscar:
+                self._em_andamento[ticker] = consulta
+
+        if buscar:
+            self._buscar(buscar, consulta)
+            precos.update(consulta.result().to_dict())
+
+        for ticker, outra_consulta in aguardar.items():
+            precos[ticker] = outra_consulta.result().get(ticker, np.nan)
+
+        resultado = pd.Series([precos.get(ticker, np.nan) for ticker in tickers], dtype='float64')
+        if indice is not None:
+            resultado.index = indice
+        return resultado
+
+    def limpar(self):
+        """
+        Descarta as cotações em memória.
+        """
+        with self._lock:
+            self._cotacoes.clear()
+
+
+_servico = None
+_servico_lock = threading.Lock()
+
+
+def obter_servico_cotacoes():
+    """
+    Retorna o ServicoCotacoes compartilhado pelo processo, criando-o na primeira chamada.
+    """
+    global _servico
+    with _servico_lock:
+        if _servico is None:
+            _servico = ServicoCotacoes()
+        return _servico
+
+
+def obter_cotacoes(tickers):
+    """
+    Retorna o preço atual de cada ticker pelo serviço de cotações compartilhado
+    (uma consulta em lote para os tickers sem cotação recente).
+
+    Args:
+        tickers (list | Series): Tickers, possivelmente repetidos.
+
+    Returns:
+        Series: Preço de cada ticker (ver ServicoCotacoes.obter).
+    """
+    return obter_servico_cotacoes().obter(tickers)
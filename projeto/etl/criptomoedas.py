@@ -1,7 +1,20 @@
-import yfinance as yf
 import pandas as pd
 from datetime import datetime, timedelta
 from etl.cambio import get_usdbrl_rate
+from etl.cotacoes import obter_cotacoes, TICKER_USDBRL
+from etl.historico import (
+    iterar_lotes,
+    calcular_datas_iniciais,
+    ler_ultimas_datas,
+    TAMANHO_LOTE_PADRAO,
+)
+from etl.concorrencia import iterar_em_paralelo, WORKERS_PADRAO
+from etl.armazenamento import EscritorHistorico
+from etl.matriz import gerar_matriz
+from etl.variacoes import obter_maiores_variacoes, formatar_variacoes
+from etl.provedores import obter_provedor_mercado
+from etl.instrumentacao import medir_simbolo
+from etl.checkpoint import Checkpoint
 import time
 import os
 import requests
@@ -10,12 +23,26 @@ def _get_results_dir():
     """
     Retorna o diretório de resultados do projeto.
     """
-    return os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'results'))
+    return os.path.abspath(os.environ.get('PUCINVEST_RESULTS_DIR') or os.path.join(os.path.dirname(__file__), '..', '..', 'results'))
 
-def baixar_historico_cripto():
+def baixar_historico_cripto(tamanho_lote=TAMANHO_LOTE_PADRAO, incremental=False,
+                            workers=WORKERS_PADRAO):
     """
     Baixa o histórico dos últimos 10 anos das principais criptomoedas
-    e salva em um arquivo CSV.
+    e salva em um arquivo CSV (e no Parquet correspondente).
+
+    Cada símbolo é gravado assim que chega (ver EscritorHistorico), então o
+    histórico completo nunca fica em memória.
+
+    Args:
+        tamanho_lote (int): Quantidade de símbolos por requisição ao provedor.
+                            Use 1 (ou None) para baixar um símbolo por vez.
+        incremental (bool): Se True, baixa apenas o trecho ainda não salvo de cada
+                            criptomoeda (com uma janela de sobreposição) e mescla ao CSV.
+        workers (int): Número máximo de downloads simultâneos.
+
+    Returns:
+        int: Número de linhas do histórico salvo (0 se nada foi baixado).
     """
     try:
         criptos = {
@@ -33,147 +60,92 @@ def baixar_historico_cripto():
 
         data_inicial = (datetime.now() - timedelta(days=3650)).strftime("%Y-%m-%d")
 
-        dados_historicos = []
-
-        print("Iniciando download do histórico das criptomoedas...")
-
-        for simbolo, nome in criptos.items():
-            try:
-                cripto = yf.Ticker(simbolo)
-                hist = cripto.history(start=data_inicial)
-
-                if hist.empty:
-                    continue
-
-                hist["Simbolo"] = simbolo.replace("-USD", "")
-                hist["Nome"] = nome
-
-                hist = hist.reset_index()
-                hist["Date"] = hist["Date"].dt.strftime("%Y-%m-%d")
-
-                dados_historicos.append(hist)
-
-                print(f"Dados baixados para {simbolo}")
-
-            except Exception as e:
-                print(f"Erro ao baixar dados de {simbolo}: {str(e)}")
-                continue
+        results_dir = _get_results_dir()
+        nome_arquivo = os.path.join(results_dir, "historico_criptomoedas.csv")
 
-        if dados_historicos:
-            df_historico = pd.concat(dados_historicos, ignore_index=True)
+        if incremental:
+            ultimas_datas = ler_ultimas_datas("historico_criptomoedas")
+            mapa_simbolos = {simbolo: simbolo.replace("-USD", "") for simbolo in criptos}
+            datas_iniciais = calcular_datas_iniciais(mapa_simbolos, data_inicial, ultimas_datas)
+        else:
+            datas_iniciais = {simbolo: data_inicial for simbolo in criptos}
 
-            df_historico = df_historico[["Date", "Simbolo", "Nome", "Close", "Volume"]]
-            df_historico.columns = ["Data", "Simbolo", "Nome_Cripto", "Preco", "Volume"]
+        checkpoint = Checkpoint("historico_criptomoedas")
 
-            df_historico["Variacao"] = (
-                df_historico.groupby("Simbolo")["Preco"].pct_change() * 100
-            )
+        print("Iniciando download do histórico das criptomoedas...")
 
-            results_dir = _get_results_dir()
-            nome_arquivo = os.path.join(
-                results_dir, "historico_criptomoedas.csv"
-            )
-            df_historico.to_csv(nome_arquivo, index=False)
+        def formatar(hist):
+            hist = hist[["Date", "Simbolo", "Nome", "Close", "Volume"]]
+            hist.columns = ["Data", "Simbolo", "Nome_Cripto", "Preco", "Volume"]
+            return hist
+
+        with EscritorHistorico("historico_criptomoedas", nome_arquivo, incremental) as escritor:
+            if tamanho_lote and tamanho_lote > 1:
+                for hist in iterar_lotes(list(criptos), datas_iniciais, tamanho_lote, workers, checkpoint):
+                    if hist.empty:
+                        continue
+                    hist["Simbolo"] = hist["Ticker"].str.replace("-USD", "")
+                    hist["Nome"] = hist["Ticker"].map(criptos)
+                    escritor.escrever(formatar(hist))
+            else:
+                provedor = obter_provedor_mercado()
+
+                def baixar_simbolo(simbolo):
+                    with medir_simbolo(simbolo, inicio=datas_iniciais[simbolo]) as metricas:
+                        hist = checkpoint.obter(
+                            simbolo,
+                            datas_iniciais[simbolo],
+                            lambda: provedor.historico(simbolo, datas_iniciais[simbolo]),
+                        )
+                        metricas["linhas"] = len(hist)
+
+                    if hist.empty:
+                        return hist
+
+                    hist["Simbolo"] = simbolo.replace("-USD", "")
+                    hist["Nome"] = criptos[simbolo]
+
+                    hist = hist.reset_index()
+
+                    print(f"Dados baixados para {simbolo}")
+                    return hist
+
+                for simbolo, hist, erro in iterar_em_paralelo(criptos, baixar_simbolo, workers):
+                    if erro is not None:
+                        print(f"Erro ao baixar dados de {simbolo}: {str(erro)}")
+                    elif not hist.empty:
+                        escritor.escrever(formatar(hist))
+
+        if escritor.simbolos:
+            checkpoint.limpar()
             print(f"\nHistórico salvo com sucesso em '{nome_arquivo}'")
-
-            return df_historico
+            gerar_matriz('historico_criptomoedas')
+            return escritor.linhas
         else:
             print("\nNenhum dado histórico foi baixado")
-            return pd.DataFrame()
+            return 0
 
     except Exception as e:
         print(f"Erro ao processar dados históricos: {str(e)}")
-        return pd.DataFrame()
+        return 0
 
 
 def obter_melhores_e_piores_cripto(periodo="1d"):
     """
-    Obtém as 5 melhores e 5 piores criptomoedas do período especificado.
+    Obtém as 5 melhores e 5 piores criptomoedas do período especificado,
+    com a mesma variação de obter_variacoes (ver obter_maiores_variacoes).
 
     Args:
         periodo (str): Período de análise ('1d' para 30 dias, '1mo' para mensal, '1y' para anual)
     """
     try:
-        results_dir = _get_results_dir()
-        nome_arquivo = os.path.join(results_dir, "historico_criptomoedas.csv")
-        df_historico = pd.read_csv(nome_arquivo)
-        df_historico["Data"] = pd.to_datetime(df_historico["Data"])
-
-        data_mais_recente = df_historico["Data"].max()
-
-        if periodo == "1d":
-            data_inicio = data_mais_recente - pd.Timedelta(days=30)
-            df_periodo = df_historico[df_historico["Data"] >= data_inicio].copy()
-            df_periodo = (
-                df_periodo.groupby("Simbolo")
-                .agg({"Preco": ["first", "last"], "Nome_Cripto": "first"})
-                .reset_index()
-            )
-            df_periodo.columns = [
-                "Simbolo",
-                "Preco_Inicial",
-                "Preco_Final",
-                "Nome_Cripto",
-            ]
-
-        elif periodo == "1mo":
-            df_historico["Mes_Ano"] = df_historico["Data"].dt.to_period("M")
-            df_periodo = (
-                df_historico.groupby(["Simbolo", "Mes_Ano", "Nome_Cripto"])["Preco"]
-                .mean()
-                .reset_index()
-            )
-            df_periodo = df_periodo.sort_values(["Simbolo", "Mes_Ano"])
-            df_periodo = (
-                df_periodo.groupby("Simbolo")
-                .agg({"Preco": ["first", "last"], "Nome_Cripto": "first"})
-                .reset_index()
-            )
-            df_periodo.columns = [
-                "Simbolo",
-                "Preco_Inicial",
-                "Preco_Final",
-                "Nome_Cripto",
-            ]
+        melhores, piores = obter_maiores_variacoes("historico_criptomoedas", periodo)
 
-        else:
-            df_historico["Ano"] = df_historico["Data"].dt.year
-            df_periodo = (
-                df_historico.groupby(["Simbolo", "Ano", "Nome_Cripto"])["Preco"]
-                .mean()
-                .reset_index()
-            )
-            df_periodo = df_periodo.sort_values(["Simbolo", "Ano"])
-            df_periodo = (
-                df_periodo.groupby("Simbolo")
-                .agg({"Preco": ["first", "last"], "Nome_Cripto": "first"})
-                .reset_index()
-            )
-            df_periodo.columns = [
-                "Simbolo",
-                "Preco_Inicial",
-                "Preco_Final",
-                "Nome_Cripto",
-            ]
-
-        df_periodo["Variacao"] = (
-            (df_periodo["Preco_Final"] / df_periodo["Preco_Inicial"]) - 1
-        ) * 100
-
-        if df_periodo.empty:
+        if melhores.empty:
             return pd.DataFrame(), pd.DataFrame()
 
-        df_periodo["Preço"] = df_periodo["Preco_Final"].round(2)
-        df_periodo["Variação (%)"] = df_periodo["Variacao"].round(2)
-        df_periodo["Símbolo"] = df_periodo["Simbolo"]
-        df_periodo["Nome"] = df_periodo["Nome_Cripto"]
-
-        melhores = df_periodo.nlargest(5, "Variacao")[
-            ["Símbolo", "Nome", "Preço", "Variação (%)"]
-        ]
-        piores = df_periodo.nsmallest(5, "Variacao")[
-            ["Símbolo", "Nome", "Preço", "Variação (%)"]
-        ]
+        melhores = formatar_variacoes(melhores)
+        piores = formatar_variacoes(piores)
 
         return melhores, piores
 
@@ -185,6 +157,8 @@ def obter_melhores_e_piores_cripto(periodo="1d"):
 def get_current_prices_cripto(df):
     """
     Obtém os preços atuais das criptomoedas e calcula a variação percentual.
+    Os preços de todas as linhas e a taxa USD/BRL são buscados em uma única
+    consulta (ver obter_cotacoes).
 
     Args:
         df (DataFrame): DataFrame contendo as informações das criptomoedas com as colunas:
@@ -208,29 +182,18 @@ def get_current_prices_cripto(df):
             "Polkadot": "DOT-USD",
         }
 
-        usd_brl_rate = get_usdbrl_rate()
-
-        def get_price_usd(nome_cripto):
-            """Obtém o preço atual de uma criptomoeda em USD.
-
-            Args:
-                nome_cripto (str): O nome da criptomoeda (ex: "Bitcoin").
-
-            Returns:
-                float: O preço de fechamento mais recente em USD, ou 0.0 se não for encontrado.
-            """
-            symbol = symbol_map.get(nome_cripto)
-            if symbol:
-                try:
-                    return yf.Ticker(symbol).history(period="1d")["Close"].iloc[-1]
-                except IndexError:
-                    print(
-                        f"Aviso: Não foi possível obter o preço para {symbol}. Retornando 0."
-                    )
-                    return 0.0
-            return 0.0
-
-        df_cripto["preco_atual_us"] = df_cripto["nome"].apply(get_price_usd)
+        simbolos = df_cripto["nome"].map(symbol_map)
+        precos = obter_cotacoes(list(simbolos) + [TICKER_USDBRL])
+
+        usd_brl_rate = precos.iloc[-1]
+        if pd.isna(usd_brl_rate):
+            usd_brl_rate = get_usdbrl_rate()
+
+        precos_usd = pd.Series(precos.iloc[:-1].to_numpy(), index=df_cripto.index)
+        for symbol in simbolos[precos_usd.isna() & simbolos.notna()].unique():
+            print(f"Aviso: Não foi possível obter o preço para {symbol}. Retornando 0.")
+
+        df_cripto["preco_atual_us"] = precos_usd.fillna(0.0)
 
         df_cripto["preco_atual_br"] = df_cripto["preco_atual_us"] * usd_brl_rate
 
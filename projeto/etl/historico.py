@@ -0,0 +1,211 @@
+import pandas as pd
+import os
+from etl.concorrencia import WORKERS_PADRAO
+from etl.provedores import obter_provedor_mercado
+from etl.instrumentacao import medir_simbolo
+from etl.armazenamento import caminho_artefato, ler_historico
+
+TAMANHO_LOTE_PADRAO = 25
+
+JANELA_SOBREPOSICAO_DIAS = 7
+
+COLUNAS_LONGAS = ['Date', 'Ticker', 'Close', 'Volume']
+
+
+def _largo_para_longo(df_largo, lote):
+    """
+    Converte o resultado largo do yf.download (colunas Preço x Ticker) para o
+    formato longo com uma linha por (Date, Ticker).
+
+    Args:
+        df_largo (DataFrame): Resultado do yf.download com colunas multi-índice.
+        lote (list): Tickers solicitados na chamada.
+
+    Returns:
+        DataFrame: Colunas Date, Ticker, Close e Volume, sem linhas sem cotação.
+    """
+    if df_largo is None or df_largo.empty:
+        return pd.DataFrame(columns=COLUNAS_LONGAS)
+
+    if not isinstance(df_largo.columns, pd.MultiIndex):
+        df_largo = pd.concat({lote[0]: df_largo}, axis=1).swaplevel(0, 1, axis=1)
+
+    campos = [c for c in ('Close', 'Volume') if c in df_largo.columns.get_level_values(0)]
+    df_longo = df_largo[campos].stack(level=1).reset_index()
+    df_longo.columns = ['Date', 'Ticker'] + campos
+
+    if 'Volume' not in df_longo.columns:
+        df_longo['Volume'] = 0
+
+    df_longo = df_longo.dropna(subset=['Close'])
+    return df_longo[COLUNAS_LONGAS]
+
+
+def iterar_lotes(tickers, data_inicial, tamanho_lote=TAMANHO_LOTE_PADRAO,
+                 workers=WORKERS_PADRAO, checkpoint=None):
+    """
+    Baixa o histórico diário de vários tickers por chamada ao provedor de mercado, em
+    lotes de até `tamanho_lote` tickers, devolvendo cada lote em formato longo
+    assim que ele chega. Apenas um lote fica em memória por vez.
+
+    A instrumentação mede cada lote como uma busca só (ver medir_simbolo): a
+    latência e os retries são do lote, não de cada ticker.
+
+    Args:
+        tickers (list): Tickers no formato do Yahoo Finance (ex: "PETR4.SA").
+        data_inicial (str | dict): Data inicial no formato 'YYYY-MM-DD', ou um
+                                   dicionário ticker -> data inicial. Tickers com
+                                   a mesma data inicial são agrupados nos lotes.
+        tamanho_lote (int): Quantidade máxima de tickers por requisição.
+        workers (int): Número de threads usadas pelo provedor em cada lote.
+        checkpoint (Checkpoint): Checkpoints por ticker. Cada ticker recebido
+                                 aponta para a resposta do seu lote; tickers já
+                                 registrados não são baixados de novo e os que
+                                 faltaram voltam para os próximos lotes.
+
+    Yields:
+        DataFrame: Colunas Date, Ticker, Close e Volume de um lote.
+    """
+    tamanho_lote = max(1, int(tamanho_lote))
+
+    if isinstance(data_inicial, dict):
+        datas_iniciais = {ticker: data_inicial[ticker] for ticker in tickers}
+    else:
+        datas_iniciais = {ticker: data_inicial for ticker in tickers}
+
+    if checkpoint is not None:
+        # Tickers de um mesmo lote apontam para a mesma resposta, lida uma vez só.
+        salvos = {}
+        for ticker, inicio_ticker in datas_iniciais.items():
+            caminho = checkpoint.localizar(f"lote_{ticker}", inicio_ticker)
+            if caminho is not None:
+                salvos.setdefault(caminho, []).append(ticker)
+
+        for caminho, reaproveitados in salvos.items():
+            df_largo = checkpoint.ler(caminho)
+            if df_largo is None:
+                continue
+            df_longo = _largo_para_longo(df_largo, reaproveitados)
+            del df_largo
+            for ticker in reaproveitados:
+                del datas_iniciais[ticker]
+            print(f"{len(reaproveitados)} tickers reaproveitados do checkpoint")
+            yield df_longo[df_longo['Ticker'].isin(reaproveitados)].reset_index(drop=True)
+
+    grupos = {}
+    for ticker, inicio_ticker in datas_iniciais.items():
+        grupos.setdefault(inicio_ticker, []).append(ticker)
+
+    lotes = [
+        (inicio_grupo, tuple(grupo[inicio:inicio + tamanho_lote]))
+        for inicio_grupo, grupo in grupos.items()
+        for inicio in range(0, len(grupo), tamanho_lote)
+    ]
+
+    provedor = obter_provedor_mercado()
+
+    for inicio_lote, lote in lotes:
+        try:
+            with medir_simbolo(lote, inicio=inicio_lote) as metricas:
+                caminho = None
+                if checkpoint is not None:
+                    # A resposta do lote fica no cache; o checkpoint só a registra.
+                    df_largo, caminho = checkpoint.buscar(
+                        lambda: provedor.historico_em_lote(lote, inicio_lote, workers)
+                    )
+                else:
+                    df_largo = provedor.historico_em_lote(lote, inicio_lote, workers)
+                df_longo = _largo_para_longo(df_largo, lote)
+                metricas['linhas_por_simbolo'] = df_longo['Ticker'].value_counts().reindex(lote, fill_value=0).to_dict()
+
+            recebidos = set(df_longo['Ticker'])
+            if checkpoint is not None:
+                # Cada ticker recebido aponta para a resposta do lote; os que
+                # faltaram são buscados de novo na próxima execução.
+                checkpoint.salvar(
+                    [f"lote_{ticker}" for ticker in lote if ticker in recebidos],
+                    inicio_lote, df_largo, caminho,
+                )
+            del df_largo
+
+            for ticker in lote:
+                if ticker not in recebidos:
+                    print(f"Nenhum dado retornado para {ticker}")
+
+            print(f"Lote baixado com {len(recebidos)} de {len(lote)} tickers")
+
+        except Exception as e:
+            print(f"Erro ao baixar lote {list(lote)}: {str(e)}")
+            continue
+
+        yield df_longo
+
+
+def baixar_em_lotes(tickers, data_inicial, tamanho_lote=TAMANHO_LOTE_PADRAO,
+                    workers=WORKERS_PADRAO, checkpoint=None):
+    """
+    Baixa o histórico de vários tickers em lotes (ver iterar_lotes) e devolve
+    tudo em um único DataFrame longo.
+
+    Args:
+        tickers (list): Tickers no formato do Yahoo Finance (ex: "PETR4.SA").
+        data_inicial (str | dict): Data inicial comum ou ticker -> data inicial.
+        tamanho_lote (int): Quantidade máxima de tickers por requisição.
+        workers (int): Número de threads usadas pelo provedor em cada lote.
+        checkpoint (Checkpoint): Checkpoints por ticker (opcional).
+
+    Returns:
+        DataFrame: Colunas Date, Ticker, Close e Volume ordenadas por Ticker e Date.
+    """
+    partes = list(iterar_lotes(tickers, data_inicial, tamanho_lote, workers, checkpoint))
+
+    if not partes:
+        return pd.DataFrame(columns=COLUNAS_LONGAS)
+
+    df_historico = pd.concat(partes, ignore_index=True)
+    return df_historico.sort_values(['Ticker', 'Date'], ignore_index=True)
+
+
+def calcular_datas_iniciais(mapa_simbolos, data_inicial, ultimas_datas,
+                            janela_dias=JANELA_SOBREPOSICAO_DIAS):
+    """
+    Define a data inicial de download de cada ticker no modo incremental.
+
+    Símbolos já armazenados recomeçam `janela_dias` antes da última data salva,
+    para capturar correções do provedor; os demais usam `data_inicial`.
+
+    Args:
+        mapa_simbolos (dict): Ticker do Yahoo Finance -> Simbolo armazenado no CSV.
+        data_inicial (str): Data inicial padrão no formato 'YYYY-MM-DD'.
+        ultimas_datas (dict): Simbolo -> última Data armazenada (Timestamp).
+        janela_dias (int): Dias de sobreposição com o histórico já salvo.
+
+    Returns:
+        dict: Ticker do Yahoo Finance -> data inicial no formato 'YYYY-MM-DD'.
+    """
+    datas_iniciais = {}
+    for ticker, simbolo in mapa_simbolos.items():
+        ultima_data = ultimas_datas.get(simbolo)
+        if ultima_data is None:
+            datas_iniciais[ticker] = data_inicial
+        else:
+            inicio = pd.Timestamp(ultima_data) - pd.Timedelta(days=janela_dias)
+            datas_iniciais[ticker] = max(inicio.strftime('%Y-%m-%d'), data_inicial)
+    return datas_iniciais
+
+
+def ler_ultimas_datas(nome):
+    """
+    Lê a última Data armazenada de cada Simbolo em um artefato histórico.
+
+    Args:
+        nome (str): Nome base do artefato (ex: 'historico_acoes').
+
+    Returns:
+        dict: Simbolo -> última Data (Timestamp). Vazio se o artefato não existir.
+    """
+    if not any(os.path.exists(caminho_artefato(nome, extensao)) for extensao in ('parquet', 'csv')):
+        return {}
+
+    df_datas = ler_historico(nome, colunas=['Simbolo', 'Data'])
+    return df_datas.groupby('Simbolo', observed=True)['Data'].max().to_dict()
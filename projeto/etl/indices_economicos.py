@@ -1,46 +1,188 @@
-from bcb import sgs
 from datetime import datetime, timedelta
 import pandas as pd
+import json
 import os
+from etl.concorrencia import buscar_em_paralelo, WORKERS_PADRAO
+from etl.armazenamento import salvar_parquet, ler_historico, caminho_artefato
+from etl.provedores import obter_provedor_mercado
+from etl.instrumentacao import medir_simbolo, registrar_arquivo
+from etl.checkpoint import Checkpoint
+from etl.publicacao import salvar_csv
+
+ANOS_HISTORICO = 10
+
+# Tamanho dos intervalos em que as séries diárias são divididas, buscados em paralelo.
+DIAS_POR_INTERVALO = 365 * 2
+
+# Quantos dias antes da última observação salva a busca incremental recomeça,
+# para capturar revisões recentes do Banco Central.
+JANELA_SOBREPOSICAO_DIAS = {
+    'diaria': 7,
+    'mensal': 62,
+}
 
 def _get_results_dir():
     """
     Retorna o diretório de resultados do projeto.
     """
-    return os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'results'))
+    return os.path.abspath(os.environ.get('PUCINVEST_RESULTS_DIR') or os.path.join(os.path.dirname(__file__), '..', '..', 'results'))
 
-def buscar_dados_economicos():
+def carregar_series_sgs(caminho=None):
     """
-    Busca os dados econômicos do Banco Central do Brasil e salva em um arquivo CSV.
+    Lê a configuração das séries do SGS a buscar.
+
+    Args:
+        caminho (str): Arquivo JSON com nome -> {'codigo', 'periodicidade'}.
+                       None usa PUCINVEST_SERIES_SGS ou etl/series_sgs.json.
+
+    Returns:
+        dict: Nome da série -> {'codigo': int, 'periodicidade': 'diaria' | 'mensal'}.
     """
-    data_final = datetime.now()
-    data_inicial = data_final - timedelta(days=365*10)
-    
-    codigos = {
-        'SELIC': 432,
-        'IPCA': 433,
-        'IGP-M': 189,
-        'INPC': 188,
-        'CDI': 12,
-        'PIB_MENSAL': 4380
+    caminho = caminho or os.environ.get(
+        'PUCINVEST_SERIES_SGS',
+        os.path.join(os.path.dirname(__file__), 'series_sgs.json')
+    )
+    with open(caminho, 'r', encoding='UTF-8') as file:
+        return json.load(file)
+
+def _ler_ultimas_datas():
+    """
+    Lê os dados econômicos já salvos.
+
+    Returns:
+        tuple: (DataFrame indexado por Date, dicionário série -> data da última
+               observação). Ambos vazios se ainda não houver dados.
+    """
+    if not os.path.exists(caminho_artefato('dados_economicos')) and \
+            not os.path.exists(caminho_artefato('dados_economicos', 'csv')):
+        return pd.DataFrame(), {}
+
+    df_existente = ler_historico('dados_economicos').set_index('Date')
+    ultimas_datas = {
+        nome: df_existente[nome].last_valid_index()
+        for nome in df_existente.columns
+        if df_existente[nome].notna().any()
     }
-    
-    dados = {}
-    
-    for nome, codigo in codigos.items():
-        try:
-            df = sgs.get({nome: codigo}, start=data_inicial, end=data_final)
-            dados[nome] = df
-        except Exception as e:
-            print(f"Erro ao buscar dados do {nome}: {str(e)}")
-    
-    df_final = pd.concat(dados.values(), axis=1)
-    
+    return df_existente, ultimas_datas
+
+def dividir_intervalo(inicio, fim, periodicidade, dias_por_intervalo=DIAS_POR_INTERVALO):
+    """
+    Divide o intervalo [inicio, fim] em pedaços de até `dias_por_intervalo`
+    dias para as séries diárias. Séries mensais são buscadas de uma vez.
+
+    Returns:
+        list: Tuplas (inicio, fim) de datas, sem sobreposição.
+    """
+    if periodicidade != 'diaria':
+        return [(inicio, fim)]
+
+    intervalos = []
+    while inicio <= fim:
+        fim_intervalo = min(inicio + timedelta(days=dias_por_intervalo - 1), fim)
+        intervalos.append((inicio, fim_intervalo))
+        inicio = fim_intervalo + timedelta(days=1)
+    return intervalos
+
+def buscar_dados_economicos(workers=WORKERS_PADRAO, incremental=True, series=None):
+    """
+    Busca os dados econômicos do Banco Central do Brasil e salva em um arquivo CSV.
+
+    Todas as séries, e cada intervalo das séries diárias, são buscadas em
+    paralelo. No modo incremental só são pedidas as observações posteriores
+    às já salvas (menos uma pequena janela de sobreposição).
+
+    Uma série com algum intervalo que falhou não é publicada (fica como já
+    estava), pois a próxima busca incremental recomeçaria depois da lacuna.
+    Os checkpoints são mantidos, e a próxima execução busca apenas os
+    intervalos que faltaram.
+
+    Args:
+        workers (int): Número máximo de requisições simultâneas ao SGS.
+        incremental (bool): Se True, busca apenas os dados novos de cada série.
+        series (dict): Séries a buscar (ver carregar_series_sgs). None lê a configuração.
+
+    Returns:
+        DataFrame: Dados econômicos publicados, indexados por Date.
+
+    Raises:
+        RuntimeError: Se alguma série ficou incompleta (as demais são publicadas).
+    """
+    series = series or carregar_series_sgs()
+    data_final = datetime.now().date()
+    data_inicial = data_final - timedelta(days=365 * ANOS_HISTORICO)
+
+    df_existente, ultimas_datas = _ler_ultimas_datas() if incremental else (pd.DataFrame(), {})
+
+    tarefas = []
+    for nome, config in series.items():
+        inicio = data_inicial
+        if nome in ultimas_datas:
+            janela = JANELA_SOBREPOSICAO_DIAS.get(config['periodicidade'], 0)
+            inicio = max(data_inicial, ultimas_datas[nome].date() - timedelta(days=janela))
+        for inicio_intervalo, fim_intervalo in dividir_intervalo(inicio, data_final, config['periodicidade']):
+            tarefas.append((nome, inicio_intervalo, fim_intervalo))
+
+    print(f"Buscando {len(series)} séries do SGS em {len(tarefas)} requisições")
+
+    provedor = obter_provedor_mercado()
+    checkpoint = Checkpoint('dados_economicos')
+
+    def buscar_intervalo(tarefa):
+        nome, inicio, fim = tarefa
+        with medir_simbolo(nome, inicio=inicio, fim=fim) as metricas:
+            df_serie = checkpoint.obter(
+                nome,
+                f"{inicio}_{fim}",
+                lambda: provedor.serie_sgs(nome, series[nome]['codigo'], inicio, fim, series[nome]['periodicidade'])
+            )
+            metricas['linhas'] = len(df_serie)
+        return df_serie
+
+    dados, erros = buscar_em_paralelo(tarefas, buscar_intervalo, workers)
+
+    for (nome, inicio, fim), erro in erros.items():
+        print(f"Erro ao buscar dados do {nome} ({inicio} a {fim}): {str(erro)}")
+
+    incompletas = sorted({nome for nome, _, _ in erros})
+    if incompletas:
+        print(f"Séries incompletas não serão atualizadas: {', '.join(incompletas)}")
+        if len(incompletas) == len(series):
+            raise RuntimeError("Nenhuma série do SGS foi obtida por completo")
+
+    partes_por_serie = {}
+    for (nome, _, _), df_intervalo in dados.items():
+        if nome not in incompletas:
+            partes_por_serie.setdefault(nome, []).append(df_intervalo)
+
+    colunas = []
+    for nome, partes in partes_por_serie.items():
+        serie = pd.concat(partes)[nome]
+        colunas.append(serie[~serie.index.duplicated(keep='last')])
+
+    df_novo = pd.concat(colunas, axis=1, sort=True) if colunas else pd.DataFrame()
+    df_novo.index = pd.to_datetime(df_novo.index)
+
+    if not df_existente.empty:
+        df_final = df_novo.combine_first(df_existente)
+    else:
+        df_final = df_novo
+    df_final = df_final[[nome for nome in series if nome in df_final.columns] +
+                        [nome for nome in df_final.columns if nome not in series]]
+    df_final = df_final.sort_index().rename_axis('Date')
+
     results_dir = _get_results_dir()
     nome_arquivo = os.path.join(results_dir, 'dados_economicos.csv')
-    df_final.to_csv(nome_arquivo)
+    salvar_csv(df_final, nome_arquivo)
+    registrar_arquivo(nome_arquivo)
+    salvar_parquet(df_final.reset_index(), 'dados_economicos')
+
+    if incompletas:
+        raise RuntimeError(f"Intervalos com erro nas séries {', '.join(incompletas)}; "
+                           f"serão buscados na próxima execução")
+
+    checkpoint.limpar()
     
     return df_final
 
 if __name__ == "__main__":
-    buscar_dados_economicos()
\ No newline at end of file
+    buscar_dados_economicos()
@@ -0,0 +1,288 @@
+import os
+import json
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime
+from etl.publicacao import publicar_arquivo
+
+ARQUIVO_EVENTOS = 'etl_metricas.jsonl'
+ARQUIVO_PROMETHEUS = 'etl_metricas.prom'
+
+# Contadores acumulados por etapa e por símbolo.
+METRICAS_CONTADORES = ('linhas', 'bytes_gravados', 'retries', 'cache_hits', 'cache_misses')
+
+_etapa_atual = contextvars.ContextVar('etapa_atual', default=None)
+_simbolo_atual = contextvars.ContextVar('simbolo_atual', default=None)
+
+_lock = threading.Lock()
+_estado = None
+
+
+def iniciar_instrumentacao(diretorio, prometheus=False):
+    """
+    Ativa a instrumentação do ETL. Os eventos passam a ser gravados como JSON
+    lines em `diretorio`/etl_metricas.jsonl. Sem esta chamada (ex: páginas do
+    dashboard) as funções de medição não fazem nada.
+
+    Args:
+        diretorio (str): Diretório dos arquivos de métricas (o mesmo do log do ETL).
+        prometheus (bool): Se True, finalizar_instrumentacao também grava
+                           etl_metricas.prom no formato texto do Prometheus.
+    """
+    global _estado
+    os.makedirs(diretorio, exist_ok=True)
+    with _lock:
+        if _estado is not None:
+            _estado['arquivo'].close()
+        _estado = {
+            'diretorio': diretorio,
+            'prometheus': prometheus,
+            'execucao': datetime.now().isoformat(timespec='seconds'),
+            'arquivo': open(os.path.join(diretorio, ARQUIVO_EVENTOS), 'a', encoding='UTF-8'),
+            'etapas': {},
+            'simbolos': [],
+        }
+
+
+def instrumentacao_ativa():
+    """
+    Indica se a instrumentação foi iniciada.
+    """
+    return _estado is not None
+
+
+def registrar_evento(tipo, **campos):
+    """
+    Grava um evento como uma linha JSON no arquivo de métricas.
+
+    Args:
+        tipo (str): Tipo do evento ('etapa', 'simbolo', 'lote', 'arquivo', ...).
+        **campos: Dados do evento.
+    """
+    if _estado is None:
+        return
+    evento = {
+        'momento': datetime.now().isoformat(timespec='milliseconds'),
+        'execucao': _estado['execucao'],
+        'tipo': tipo,
+    }
+    evento.update(campos)
+    with _lock:
+        if _estado is not None:
+            _estado['arquivo'].write(json.dumps(evento, ensure_ascii=False, default=str) + '\n')
+            _estado['arquivo'].flush()
+
+
+def _metricas_etapa(etapa):
+    """
+    Retorna os contadores da etapa, criando-os se necessário. Chamar com _lock.
+    """
+    return _estado['etapas'].setdefault(etapa, {metrica: 0 for metrica in METRICAS_CONTADORES})
+
+
+def contar(metrica, quantidade=1):
+    """
+    Soma `quantidade` ao contador `metrica` da etapa e do símbolo em execução.
+
+    Args:
+        metrica (str): Um de METRICAS_CONTADORES.
+        quantidade (int): Valor a somar.
+    """
+    if _estado is None:
+        return
+    metricas_simbolo = _simbolo_atual.get()
+    if metricas_simbolo is not None:
+        metricas_simbolo[metrica] = metricas_simbolo.get(metrica, 0) + quantidade
+    with _lock:
+        if _estado is not None:
+            etapa = _metricas_etapa(_etapa_atual.get())
+            etapa[metrica] = etapa.get(metrica, 0) + quantidade
+
+
+def registrar_arquivo(caminho):
+    """
+    Registra um arquivo gravado pela etapa em execução e soma seu tamanho
+    aos bytes gravados.
+    """
+    if _estado is None or not os.path.exists(caminho):
+        return
+    tamanho = os.path.getsize(caminho)
+    contar('bytes_gravados', tamanho)
+    registrar_evento('arquivo', etapa=_etapa_atual.get(), caminho=caminho, bytes=tamanho)
+
+
+@contextmanager
+def medir_etapa(etapa):
+    """
+    Mede uma etapa do ETL. Os contadores registrados dentro do bloco (inclusive
+    em threads criadas por buscar_em_paralelo) são atribuídos a ela.
+    """
+    token = _etapa_atual.set(etapa)
+    inicio = time.perf_counter()
+    status = 'falha'
+    try:
+        yield
+        status = 'sucesso'
+    finally:
+        latencia = time.perf_counter() - inicio
+        _etapa_atual.reset(token)
+        if _estado is not None:
+            with _lock:
+                metricas = dict(_metricas_etapa(etapa))
+                _estado['etapas'][etapa].update(status=status, latencia_s=latencia)
+            registrar_evento('etapa', etapa=etapa, status=status, latencia_s=round(latencia, 4), **metricas)
+
+
+@contextmanager
+def medir_simbolo(simbolo, **campos):
+    """
+    Mede a busca de um símbolo (ou de um lote, quando `simbolo` é uma lista).
+
+    O bloco recebe um dicionário onde pode preencher 'linhas' (ou
+    'linhas_por_simbolo' em lotes); retries e acertos de cache feitos
+    dentro do bloco são contados automaticamente.
+
+    Um lote é baixado em uma única requisição, então a latência e os retries
+    são do lote inteiro: o evento 'lote' traz as linhas de cada símbolo, mas
+    não o tempo de cada um, e o lote aparece entre as buscas mais lentas (e
+    no Prometheus) como "lote de N". Para medir cada símbolo, use
+    tamanho_lote=1 nos carregadores.
+
+    Args:
+        simbolo (str | list): Símbolo ou lista de símbolos do lote.
+        **campos: Dados extras gravados no evento (ex: intervalo de datas).
+    """
+    metricas = {}
+    token = _simbolo_atual.set(metricas)
+    inicio = time.perf_counter()
+    status = 'falha'
+    try:
+        yield metricas
+        status = 'sucesso'
+    finally:
+        latencia = time.perf_counter() - inicio
+        _simbolo_atual.reset(token)
+        if _estado is not None:
+            etapa = _etapa_atual.get()
+            linhas = metricas.get('linhas', sum(metricas.get('linhas_por_simbolo', {}).values()))
+            contar('linhas', linhas)
+            tipo = 'lote' if isinstance(simbolo, (list, tuple)) else 'simbolo'
+            evento = dict(
+                campos,
+                etapa=etapa,
+                simbolo=list(simbolo) if tipo == 'lote' else simbolo,
+                status=status,
+                latencia_s=round(latencia, 4),
+                linhas=linhas,
+                retries=metricas.get('retries', 0),
+                cache_hits=metricas.get('cache_hits', 0),
+            )
+            if 'linhas_por_simbolo' in metricas:
+                evento['linhas_por_simbolo'] = metricas['linhas_por_simbolo']
+            registrar_evento(tipo, **evento)
+            with _lock:
+                _estado['simbolos'].append(
+                    (etapa, evento['simbolo'] if tipo == 'simbolo' else f"lote de {len(simbolo)}", latencia)
+                )
+
+
+def _escapar_rotulo(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+
+
+def gerar_prometheus(etapas, simbolos, execucao):
+    """
+    Gera as métricas da execução no formato texto do Prometheus.
+
+    Args:
+        etapas (dict): Etapa -> contadores, status e latencia_s.
+        simbolos (list): Tuplas (etapa, símbolo, latência).
+        execucao (str): Início da execução (ISO 8601).
+
+    Returns:
+        str: Conteúdo do arquivo .prom.
+    """
+    linhas = []
+
+    def metrica(nome, tipo, ajuda, amostras):
+        linhas.append(f"# HELP {nome} {ajuda}")
+        linhas.append(f"# TYPE {nome} {tipo}")
+        for rotulos, valor in amostras:
+            texto_rotulos = ','.join(f'{chave}="{_escapar_rotulo(v)}"' for chave, v in rotulos.items())
+            linhas.append(f"{nome}{{{texto_rotulos}}} {valor}")
+
+    etapas_medidas = {etapa: m for etapa, m in etapas.items() if etapa is not None and 'latencia_s' in m}
+
+    metrica('pucinvest_etl_etapa_duracao_segundos', 'gauge', 'Duração da etapa na última execução',
+            [({'etapa': e}, round(m['latencia_s'], 4)) for e, m in etapas_medidas.items()])
+    metrica('pucinvest_etl_etapa_sucesso', 'gauge', '1 se a etapa terminou com sucesso na última execução',
+            [({'etapa': e}, int(m['status'] == 'sucesso')) for e, m in etapas_medidas.items()])
+    for contador in METRICAS_CONTADORES:
+        metrica(f'pucinvest_etl_etapa_{contador}', 'gauge', f'{contador} da etapa na última execução',
+                [({'etapa': e}, m.get(contador, 0)) for e, m in etapas_medidas.items()])
+    # Um símbolo pode ser buscado em várias requisições (intervalos das séries
+    # do SGS, lotes do mesmo tamanho); cada série do arquivo precisa de um
+    # conjunto único de rótulos, então as buscas são somadas por (etapa, símbolo).
+    buscas = {}
+    for e, s, latencia in simbolos:
+        total, quantidade = buscas.get((e, s), (0.0, 0))
+        buscas[(e, s)] = (total + latencia, quantidade + 1)
+
+    metrica('pucinvest_etl_simbolo_duracao_segundos', 'gauge',
+            'Duração somada das buscas de cada símbolo ou tamanho de lote',
+            [({'etapa': e, 'simbolo': s}, round(total, 4)) for (e, s), (total, _) in buscas.items()])
+    metrica('pucinvest_etl_simbolo_buscas', 'gauge', 'Quantidade de buscas de cada símbolo ou tamanho de lote',
+            [({'etapa': e, 'simbolo': s}, quantidade) for (e, s), (_, quantidade) in buscas.items()])
+    metrica('pucinvest_etl_ultima_execucao_timestamp_segundos', 'gauge', 'Início da última execução do ETL',
+            [({}, int(datetime.fromisoformat(execucao).timestamp()))])
+
+    return '\n'.join(linhas) + '\n'
+
+
+def finalizar_instrumentacao(mais_lentos=5):
+    """
+    Encerra a instrumentação, grava o resumo da execução e, se configurado,
+    o arquivo do Prometheus.
+
+    Args:
+        mais_lentos (int): Quantidade de símbolos mais lentos incluídos no resumo.
+
+    Returns:
+        dict: Resumo com as métricas por etapa e os símbolos mais lentos, ou
+              None se a instrumentação não estava ativa.
+    """
+    global _estado
+    with _lock:
+        estado, _estado = _estado, None
+    if estado is None:
+        return None
+
+    simbolos_lentos = sorted(estado['simbolos'], key=lambda item: item[2], reverse=True)[:mais_lentos]
+    resumo = {
+        'etapas': {etapa: m for etapa, m in estado['etapas'].items() if etapa is not None},
+        'simbolos_mais_lentos': [
+            {'etapa': etapa, 'simbolo': simbolo, 'latencia_s': round(latencia, 4)}
+            for etapa, simbolo, latencia in simbolos_lentos
+        ],
+    }
+
+    linha = {
+        'momento': datetime.now().isoformat(timespec='milliseconds'),
+        'execucao': estado['execucao'],
+        'tipo': 'resumo',
+    }
+    linha.update(resumo)
+    estado['arquivo'].write(json.dumps(linha, ensure_ascii=False, default=str) + '\n')
+    estado['arquivo'].close()
+
+    if estado['prometheus']:
+        conteudo = gerar_prometheus(estado['etapas'], estado['simbolos'], estado['execucao'])
+        def escrever(temporario):
+            with open(temporario, 'w', encoding='UTF-8') as file:
+                file.write(conteudo)
+
+        publicar_arquivo(os.path.join(estado['diretorio'], ARQUIVO_PROMETHEUS), escrever)
+
+    return resumo
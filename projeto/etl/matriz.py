@@ -0,0 +1,480 @@
+import os
+import json
+import time
+import threading
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from etl.armazenamento import (
+    caminho_artefato,
+    ler_historico,
+    TIPOS_HISTORICO,
+    TIPOS_POR_ARTEFATO,
+)
+from etl.publicacao import publicar_arquivo
+from etl.catalogo import registrar_artefato
+from etl.instrumentacao import registrar_arquivo
+
+# Calendário das linhas da matriz de cada histórico:
+#   b3         - pregões da B3, isto é, as datas com cotação no histórico das
+#                ações (feriados da bolsa não aparecem);
+#   continuo   - todos os dias corridos, para ativos negociados 24/7;
+#   dias_uteis - segunda a sexta, como as cotações de câmbio. Feriados
+#                repetem a última cotação.
+CALENDARIOS = ('b3', 'continuo', 'dias_uteis')
+CALENDARIO_POR_ARTEFATO = {
+    'historico_acoes': 'b3',
+    'historico_criptomoedas': 'continuo',
+    'historico_cambio': 'dias_uteis',
+}
+
+# Arquivos de uma matriz, todos em results/:
+#   <historico>_matriz_precos.npy   - datas x símbolos, no tipo do Preco do histórico;
+#   <historico>_matriz_retornos.npy - datas x símbolos, retorno simples (float32);
+#   <historico>_matriz_datas.npy    - índice das linhas (datetime64[ns]);
+#   <historico>_matriz.json         - índice das colunas (símbolos e nomes) e calendário.
+ARQUIVOS_MATRIZ = ('precos', 'retornos', 'datas')
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def nome_matriz(nome):
+    """
+    Retorna o nome base dos arquivos da matriz de um histórico (ex: 'historico_acoes_matriz').
+    """
+    return f"{nome}_matriz"
+
+
+def _caminhos(nome):
+    """
+    Retorna o caminho de cada arquivo da matriz, incluindo o índice 'simbolos'.
+    """
+    base = nome_matriz(nome)
+    caminhos = {arquivo: caminho_artefato(f"{base}_{arquivo}", 'npy') for arquivo in ARQUIVOS_MATRIZ}
+    caminhos['simbolos'] = caminho_artefato(base, 'json')
+    return caminhos
+
+
+def montar_calendario(calendario, datas):
+    """
+    Monta as datas das linhas da matriz a partir das datas com cotação.
+
+    Args:
+        calendario (str): Um de CALENDARIOS.
+        datas (ndarray): Datas observadas no histórico (datetime64[ns]).
+
+    Returns:
+        ndarray: Datas do calendário (datetime64[ns]) em ordem crescente.
+    """
+    if calendario not in CALENDARIOS:
+        raise ValueError(f"Calendário desconhecido: {calendario}. Use um de {CALENDARIOS}")
+
+    if calendario == 'b3':
+        return np.unique(datas)
+    if calendario == 'continuo':
+        return pd.date_range(datas.min(), datas.max(), freq='D').to_numpy('datetime64[ns]')
+    return pd.bdate_range(datas.min(), datas.max()).to_numpy('datetime64[ns]')
+
+
+def _preencher_intervalo(precos):
+    """
+    Repete a última cotação de cada coluna nas datas sem pregão, apenas entre
+    a primeira e a última cotação do símbolo.
+    """
+    validos = ~np.isnan(precos)
+    linhas = np.arange(len(precos))[:, None]
+    indices = np.maximum.accumulate(np.where(validos, linhas, 0), axis=0)
+    preenchidos = precos[indices, np.arange(precos.shape[1])]
+
+    ultima = len(precos) - 1 - np.argmax(validos[::-1], axis=0)
+    preenchidos[linhas > ultima] = np.nan
+    return preenchidos
+
+
+def calcular_retornos(precos):
+    """
+    Calcula o retorno simples de cada linha contra a anterior (0.01 = 1%).
+    A primeira linha e as datas sem preço em uma das pontas ficam NaN.
+
+    Args:
+        precos (ndarray): Matriz datas x símbolos.
+
+    Returns:
+        ndarray: Matriz de retornos em float32, com o mesmo formato.
+    """
+    precos = np.asarray(precos, dtype='float64')
+    retornos = np.full(precos.shape, np.nan, dtype='float32')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        retornos[1:] = precos[1:] / precos[:-1] - 1
+    return retornos
+
+
+def _coluna_nome(nome):
+    """
+    Retorna a coluna com o nome dos ativos de um histórico (Nome_*), ou None.
+    """
+    caminho = caminho_artefato(nome)
+    if os.path.exists(caminho):
+        colunas = pq.read_schema(caminho).names
+    else:
+        colunas = pd.read_csv(caminho_artefato(nome, 'csv'), nrows=0).columns
+    return next((coluna for coluna in colunas if coluna.startswith('Nome_')), None)
+
+
+def montar_matriz(df, calendario):
+    """
+    Converte um histórico longo na matriz larga de preços alinhada ao calendário.
+
+    Cada data do calendário recebe a última cotação do símbolo igual ou
+    anterior a ela (ex: em 'dias_uteis', uma cotação de sábado só aparece na
+    segunda-feira, e apenas se não houver cotação na própria segunda). O
+    símbolo não é estendido antes da primeira nem depois da última cotação.
+
+    Args:
+        df (DataFrame): Colunas Data, Simbolo e Preco, ordenadas por Simbolo e
+                        Data, e opcionalmente o nome do ativo (coluna Nome_*).
+        calendario (str): Um de CALENDARIOS.
+
+    Returns:
+        tuple: (datas, simbolos, nomes, precos), com precos em float64 de
+               formato (len(datas), len(simbolos)).
+    """
+    df = df.dropna(subset=['Preco'])
+    codigos, simbolos = pd.factorize(df['Simbolo'], sort=True)
+    simbolos = [str(simbolo) for simbolo in simbolos]
+
+    coluna_nome = next((coluna for coluna in df.columns if coluna.startswith('Nome_')), 'Simbolo')
+    df_nomes = df.drop_duplicates('Simbolo')
+    mapa_nomes = dict(zip(df_nomes['Simbolo'].astype(str), df_nomes[coluna_nome].astype(str)))
+    nomes = [mapa_nomes[simbolo] for simbolo in simbolos]
+
+    datas_observadas = df['Data'].to_numpy('datetime64[ns]')
+    datas = montar_calendario(calendario, datas_observadas)
+
+    # Preenche sobre a união das datas do calendário e das cotações e só
+    # depois recorta as datas do calendário.
+    grade = np.union1d(datas, datas_observadas)
+    precos = np.full((len(grade), len(simbolos)), np.nan)
+    precos[np.searchsorted(grade, datas_observadas), codigos] = df['Preco'].to_numpy('float64')
+    precos = _preencher_intervalo(precos)
+    return datas, simbolos, nomes, precos[np.searchsorted(grade, datas)]
+
+
+def _salvar_npy(caminho, array):
+    def escrever(temporario):
+        with open(temporario, 'wb') as file:
+            np.save(file, array)
+
+    publicar_arquivo(caminho, escrever)
+
+
+def _tipo_preco(nome):
+    return TIPOS_POR_ARTEFATO.get(nome, {}).get('Preco', TIPOS_HISTORICO['Preco'])
+
+
+def _ler_precos(nome):
+    """
+    Lê do histórico apenas as colunas usadas na matriz.
+    """
+    coluna_nome = _coluna_nome(nome)
+    colunas = ['Data', 'Simbolo', 'Preco'] + ([coluna_nome] if coluna_nome else [])
+    return ler_historico(nome, colunas=colunas)
+
+
+def gerar_matriz(nome, calendario=None, etapa=None):
+    """
+    Gera a matriz larga de preços e de retornos de um histórico já publicado
+    e a grava em .npy, com os índices de datas e de símbolos ao lado.
+
+    Os arquivos são lidos pelas páginas com carregar_matriz via memory map:
+    todos os processos do Streamlit compartilham as mesmas páginas do cache
+    do sistema operacional, em vez de cada um pivotar o histórico de novo.
+    O índice de símbolos é publicado por último, depois das matrizes.
+
+    Args:
+        nome (str): Artefato histórico (ex: 'historico_acoes').
+        calendario (str): Um de CALENDARIOS. None usa CALENDARIO_POR_ARTEFATO
+                          (ou 'b3' para outros históricos).
+        etapa (str): Etapa do ETL registrada no catálogo. None usa o próprio nome.
+
+    Returns:
+        str: Caminho da matriz de preços, ou None se o histórico estiver vazio.
+    """
+    calendario = calendario or CALENDARIO_POR_ARTEFATO.get(nome, 'b3')
+    df = _ler_precos(nome)
+    if df.empty:
+        print(f"Histórico '{nome}' vazio, matriz não gerada")
+        return None
+
+    datas, simbolos, nomes, precos = montar_matriz(df, calendario)
+    del df
+
+    caminhos = _caminhos(nome)
+    _salvar_npy(caminhos['precos'], precos.astype(_tipo_preco(nome)))
+    _salvar_npy(caminhos['retornos'], calcular_retornos(precos))
+    _salvar_npy(caminhos['datas'], datas)
+
+    indice = {
+        'historico': nome,
+        'calendario': calendario,
+        'linhas': len(datas),
+        'simbolos': simbolos,
+        'nomes': nomes,
+    }
+
+    def escrever(temporario):
+        with open(temporario, 'w', encoding='UTF-8') as file:
+            json.dump(indice, file, ensure_ascii=False, indent=2)
+
+    publicar_arquivo(caminhos['simbolos'], escrever)
+
+    for caminho in caminhos.values():
+        registrar_arquivo(caminho)
+    registrar_artefato(nome_matriz(nome), caminhos['precos'], etapa or nome,
+                       linhas=len(datas), data=pd.Timestamp(datas[-1]).strftime('%Y-%m-%d'))
+
+    print(f"Matriz de {len(datas)} datas x {len(simbolos)} símbolos salva em '{caminhos['precos']}'")
+    return caminhos['precos']
+
+
+class MatrizPrecos:
+    """
+    Matriz larga de preços e retornos (datas x símbolos) de um ou mais
+    históricos. As matrizes carregadas por carregar_matriz são memory maps
+    somente leitura; não altere seus valores.
+
+    Atributos:
+        nome (str): Histórico de origem.
+        calendario (str): Calendário das linhas (ver CALENDARIOS).
+        datas (ndarray): Datas das linhas (datetime64[ns]).
+        simbolos (list): Símbolos das colunas.
+        nomes (list): Nome de cada símbolo (o próprio símbolo se o histórico não tiver nomes).
+        precos (ndarray): Preços, NaN antes da primeira e depois da última cotação.
+        retornos (ndarray): Retorno simples de cada data contra a anterior.
+    """
+
+    def __init__(self, nome, calendario, datas, simbolos, precos, retornos, nomes=None):
+        self.nome = nome
+        self.calendario = calendario
+        self.datas = datas
+        self.simbolos = list(simbolos)
+        self.nomes = list(nomes) if nomes is not None else list(self.simbolos)
+        self.precos = precos
+        self.retornos = retornos
+        self._colunas = {simbolo: coluna for coluna, simbolo in enumerate(self.simbolos)}
+        self._limites = None
+
+    def coluna(self, simbolo):
+        """
+        Retorna o índice da coluna de `simbolo`, levantando KeyError se ele não existir.
+        """
+        return self._colunas[simbolo]
+
+    def limites(self):
+        """
+        Retorna a linha da primeira e da última cotação de cada coluna (-1 em
+        colunas sem cotação). Calculado uma única vez por matriz.
+
+        Returns:
+            tuple: (primeira, ultima), arrays com uma posição por símbolo.
+        """
+        if self._limites is None:
+            validos = ~np.isnan(self.precos)
+            possui = validos.any(axis=0)
+            primeira = np.where(possui, np.argmax(validos, axis=0), -1)
+            ultima = np.where(possui, len(self.datas) - 1 - np.argmax(validos[::-1], axis=0), -1)
+            self._limites = (primeira, ultima)
+        return self._limites
+
+    def para_dataframe(self, retornos=False, simbolos=None):
+        """
+        Retorna a matriz como DataFrame indexado por data, sem copiar os dados
+        quando todas as colunas são pedidas.
+
+        Args:
+            retornos (bool): Se True, usa a matriz de retornos em vez da de preços.
+            simbolos (list): Colunas desejadas. None usa todas.
+
+        Returns:
+            DataFrame: Datas x símbolos.
+        """
+        valores = self.retornos if retornos else self.precos
+        colunas = self.simbolos
+        if simbolos is not None:
+            colunas = list(simbolos)
+            valores = valores[:, [self.coluna(simbolo) for simbolo in colunas]]
+        return pd.DataFrame(valores, index=pd.DatetimeIndex(self.datas, name='Data'),
+                            columns=colunas, copy=False)
+
+    def alinhar(self, datas, calendario=None):
+        """
+        Reamostra a matriz em outro calendário: cada data recebe o último preço
+        igual ou anterior a ela (ex: criptomoedas nos pregões da B3, onde o
+        retorno de segunda-feira acumula o fim de semana). Datas posteriores à
+        última cotação de um símbolo ficam NaN, para que ativos que deixaram de
+        ser cotados não ganhem preços repetidos. Os retornos são recalculados
+        sobre as novas datas.
+
+        Args:
+            datas (ndarray): Datas do calendário de destino, em ordem crescente.
+            calendario (str): Nome do calendário de destino, apenas informativo.
+
+        Returns:
+            MatrizPrecos: Nova matriz em memória.
+        """
+        datas = np.asarray(datas, dtype='datetime64[ns]')
+        linhas = np.searchsorted(self.datas, datas, side='right') - 1
+        precos = np.asarray(self.precos, dtype='float64')[np.maximum(linhas, 0)]
+        precos[linhas < 0] = np.nan
+
+        _, ultima = self.limites()
+        ultima_data = np.where(ultima >= 0, self.datas[np.maximum(ultima, 0)], np.datetime64('NaT'))
+        precos[~(datas[:, None] <= ultima_data[None, :])] = np.nan
+        return MatrizPrecos(self.nome, calendario or self.calendario, datas, self.simbolos,
+                            precos.astype(self.precos.dtype), calcular_retornos(precos), self.nomes)
+
+
+def selecionar_extremos(valores, k):
+    """
+    Seleciona os k maiores e os k menores valores, ignorando NaN.
+
+    Usa np.argpartition, linear no número de valores, e ordena apenas os k
+    escolhidos.
+
+    Args:
+        valores (ndarray): Valores de cada símbolo (ex: variação no período).
+        k (int): Quantidade de símbolos em cada ponta.
+
+    Returns:
+        tuple: (maiores, menores), índices em `valores` do maior para o menor
+               e do menor para o maior.
+    """
+    validos = np.flatnonzero(~np.isnan(valores))
+    k = min(int(k), len(validos))
+    if k <= 0:
+        vazio = np.array([], dtype=np.intp)
+        return vazio, vazio
+
+    valores_validos = valores[validos]
+    maiores = np.argpartition(valores_validos, len(validos) - k)[-k:]
+    maiores = maiores[np.argsort(-valores_validos[maiores], kind='stable')]
+    menores = np.argpartition(valores_validos, k - 1)[:k]
+    menores = menores[np.argsort(valores_validos[menores], kind='stable')]
+    return validos[maiores], validos[menores]
+
+
+def _versao(caminhos):
+    versao = []
+    for caminho in caminhos.values():
+        if not os.path.exists(caminho):
+            return None
+        info = os.stat(caminho)
+        versao.append((info.st_ino, info.st_size, info.st_mtime_ns))
+    return tuple(versao)
+
+
+def _versao_historico(nome):
+    for extensao in ('parquet', 'csv'):
+        versao = _versao({extensao: caminho_artefato(nome, extensao)})
+        if versao is not None:
+            return versao
+    return None
+
+
+def _abrir(nome, caminhos):
+    """
+    Abre os arquivos da matriz via memory map, verificando se o índice de
+    símbolos corresponde às matrizes (que são publicadas antes dele).
+    """
+    for tentativa in range(3):
+        with open(caminhos['simbolos'], 'r', encoding='UTF-8') as file:
+            indice = json.load(file)
+        datas = np.load(caminhos['datas'], mmap_mode='r')
+        precos = np.load(caminhos['precos'], mmap_mode='r')
+        retornos = np.load(caminhos['retornos'], mmap_mode='r')
+
+        formato = (indice['linhas'], len(indice['simbolos']))
+        if precos.shape == formato and retornos.shape == formato and len(datas) == formato[0]:
+            return MatrizPrecos(nome, indice['calendario'], datas, indice['simbolos'],
+                                precos, retornos, indice.get('nomes'))
+        time.sleep(0.1)
+
+    raise RuntimeError(f"Arquivos da matriz de '{nome}' inconsistentes entre si")
+
+
+def _montar_em_memoria(nome):
+    """
+    Monta a matriz a partir do histórico, para históricos gravados antes de o
+    ETL gerar os arquivos da matriz.
+    """
+    calendario = CALENDARIO_POR_ARTEFATO.get(nome, 'b3')
+    df = _ler_precos(nome)
+    if df.empty:
+        return None
+    datas, simbolos, nomes, precos = montar_matriz(df, calendario)
+    return MatrizPrecos(nome, calendario, datas, simbolos, precos.astype(_tipo_preco(nome)),
+                        calcular_retornos(precos), nomes)
+
+
+def carregar_matriz(nome):
+    """
+    Carrega a matriz de preços e retornos de um histórico sem copiar os dados
+    (memory map somente leitura). A mesma MatrizPrecos é reaproveitada até o
+    ETL publicar uma nova versão. Se o ETL ainda não gerou a matriz, ela é
+    montada em memória a partir do histórico.
+
+    Args:
+        nome (str): Artefato histórico (ex: 'historico_acoes').
+
+    Returns:
+        MatrizPrecos: Matriz do histórico, ou None se não houver histórico.
+    """
+    caminhos = _caminhos(nome)
+    versao = _versao(caminhos)
+    gerada = versao is not None
+    if not gerada:
+        versao = _versao_historico(nome)
+        if versao is None:
+            return None
+
+    with _cache_lock:
+        versao_cache, matriz = _cache.get(nome, (None, None))
+        if versao_cache != versao:
+            matriz = _abrir(nome, caminhos) if gerada else _montar_em_memoria(nome)
+            _cache[nome] = (versao, matriz)
+    return matriz
+
+
+def combinar_matrizes(nomes, calendario_base=None):
+    """
+    Junta as matrizes de vários históricos lado a lado em um único calendário,
+    para análises entre classes de ativos.
+
+    Args:
+        nomes (list): Artefatos históricos (ex: ['historico_acoes', 'historico_criptomoedas']).
+        calendario_base (str): Histórico cujas datas são usadas como linhas. None
+                               usa o primeiro de `nomes`. Os demais são
+                               alinhados a ele com MatrizPrecos.alinhar.
+
+    Returns:
+        MatrizPrecos: Matriz combinada em memória, ou None se algum histórico não existir.
+    """
+    matrizes = {nome: carregar_matriz(nome) for nome in nomes}
+    if any(matriz is None for matriz in matrizes.values()):
+        return None
+
+    base = matrizes[calendario_base or nomes[0]]
+    alinhadas = [
+        matriz if matriz is base else matriz.alinhar(base.datas, base.calendario)
+        for matriz in matrizes.values()
+    ]
+    return MatrizPrecos(
+        '+'.join(nomes),
+        base.calendario,
+        base.datas,
+        [simbolo for matriz in alinhadas for simbolo in matriz.simbolos],
+        np.hstack([np.asarray(matriz.precos, dtype='float64') for matriz in alinhadas]),
+        np.hstack([matriz.retornos for matriz in alinhadas]),
+        [nome_ativo for matriz in alinhadas for nome_ativo in matriz.nomes],
+    )
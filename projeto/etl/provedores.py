@@ -0,0 +1,338 @@
+import os
+import math
+import time
+import zlib
+import threading
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from bcb import sgs
+from etl.concorrencia import obter_sessao_http, WORKERS_PADRAO
+from etl.cache import consultar
+from etl.resiliencia import chamar, ErroTransitorio
+
+class ProvedorMercado:
+    """
+    Interface dos provedores de dados de mercado usados pelos carregadores.
+
+    Os históricos seguem o formato do yfinance: índice 'Date' e colunas
+    Open, High, Low, Close e Volume. As séries econômicas do SGS também passam
+    pelo provedor, para que um provedor local substitua todas as fontes da rede.
+    """
+
+    nome = None
+
+    def historico(self, ticker, inicio):
+        """
+        Retorna o histórico diário de um ticker a partir de `inicio` ('YYYY-MM-DD').
+        """
+        raise NotImplementedError
+
+    def historico_em_lote(self, tickers, inicio, workers=WORKERS_PADRAO):
+        """
+        Retorna o histórico diário de vários tickers em um único DataFrame
+        largo, com colunas multi-índice (Preço, Ticker) como o yf.download.
+        """
+        raise NotImplementedError
+
+    def cotacao(self, ticker, periodo='1d', intervalo='1d'):
+        """
+        Retorna as cotações mais recentes de um ticker (última linha = preço atual).
+        """
+        raise NotImplementedError
+
+    def cotacoes(self, tickers):
+        """
+        Retorna o preço mais recente de vários tickers. Por padrão consulta um
+        ticker por vez; provedores com consulta em lote sobrescrevem este método.
+
+        Args:
+            tickers (list): Tickers sem repetição.
+
+        Returns:
+            Series: Ticker -> preço (float64), NaN para tickers sem cotação.
+        """
+        precos = {}
+        for ticker in tickers:
+            hist = self.cotacao(ticker)
+            precos[ticker] = hist['Close'].iloc[-1] if not hist.empty else np.nan
+        return pd.Series(precos, index=list(tickers), dtype='float64')
+
+    def serie_sgs(self, nome, codigo, inicio, fim, periodicidade='diaria'):
+        """
+        Retorna a série `codigo` do SGS entre `inicio` e `fim`, com índice
+        'Date' e uma coluna `nome`. Por padrão consulta o Banco Central.
+        """
+        return consultar(
+            'sgs',
+            {'nome': nome, 'codigo': codigo, 'start': inicio, 'end': fim},
+            lambda: chamar('bcb', lambda timeout: sgs.get({nome: codigo}, start=inicio, end=fim, timeout=timeout)),
+        )
+
+
+class ProvedorYFinance(ProvedorMercado):
+    """
+    Provedor padrão, sobre o Yahoo Finance. Todas as chamadas passam pelo
+    cache em disco e pela camada de resiliência do provedor 'yahoo'.
+    """
+
+    nome = 'yfinance'
+
+    # O yf.download guarda o resultado em estado global do módulo; chamadas
+    # simultâneas vindas de carregadores diferentes precisam ser serializadas.
+    # O lock cobre apenas o yf.download: o cache, o limitador de taxa e as
+    # esperas entre tentativas ficam fora dele, para que uma repetição lenta
+    # não bloqueie os downloads das outras etapas.
+    _download_lock = threading.Lock()
+
+    def historico(self, ticker, inicio):
+        ativo = yf.Ticker(ticker, session=obter_sessao_http())
+        return consultar(
+            'yf_history',
+            {'ticker': ticker, 'start': inicio},
+            lambda: chamar('yahoo', lambda timeout: ativo.history(start=inicio, timeout=timeout)),
+        )
+
+    def historico_em_lote(self, tickers, inicio, workers=WORKERS_PADRAO):
+        return consultar(
+            'yf_download',
+            {'tickers': list(tickers), 'start': inicio},
+            lambda: chamar('yahoo', lambda timeout: self._baixar_lote(tickers, inicio, workers, timeout)),
+        )
+
+    def _baixar_lote(self, tickers, inicio, workers, timeout):
+        """
+        Faz uma chamada ao yf.download para o lote. O yfinance registra as falhas
+        por ticker sem levantar exceção; um lote inteiro vazio é tratado como
+        falha passageira para que a camada de resiliência repita a chamada.
+        """
+        with self._download_lock:
+            df_largo = yf.download(
+                list(tickers),
+                start=inicio,
+                group_by='column',
+                auto_adjust=True,
+                progress=False,
+                threads=max(1, int(workers)),
+                timeout=timeout,
+                session=obter_sessao_http(),
+            )
+        if df_largo is None or df_largo.empty:
+            raise ErroTransitorio(f"Nenhum dado retornado para o lote {list(tickers)}")
+        return df_largo
+
+    def cotacao(self, ticker, periodo='1d', intervalo='1d'):
+        ativo = yf.Ticker(ticker, session=obter_sessao_http())
+        return consultar(
+            'yf_cotacao',
+            {'ticker': ticker, 'period': periodo, 'interval': intervalo},
+            lambda: chamar('yahoo', lambda timeout: ativo.history(period=periodo, interval=intervalo, timeout=timeout)),
+        )
+
+    def cotacoes(self, tickers):
+        tickers = list(tickers)
+        return consultar(
+            'yf_cotacoes',
+            {'tickers': sorted(tickers)},
+            lambda: chamar('yahoo', lambda timeout: self._baixar_cotacoes(tickers, timeout)),
+        )
+
+    def _baixar_cotacoes(self, tickers, timeout):
+        """
+        Busca o último fechamento de todos os tickers em uma única chamada ao
+        yf.download. Alguns dias de histórico garantem um preço para ativos
+        sem pregão hoje.
+        """
+        with self._download_lock:
+            df_largo = yf.download(
+                tickers,
+                period='5d',
+                interval='1d',
+                group_by='column',
+                auto_adjust=True,
+                progress=False,
+                timeout=timeout,
+                session=obter_sessao_http(),
+            )
+        if df_largo is None or df_largo.empty:
+            raise ErroTransitorio(f"Nenhuma cotação retornada para {tickers}")
+
+        fechamento = df_largo['Close']
+        if isinstance(fechamento, pd.Series):
+            fechamento = fechamento.to_frame(tickers[0])
+        return fechamento.ffill().iloc[-1].reindex(tickers).astype('float64')
+
+
+class ProvedorSintetico(ProvedorMercado):
+    """
+    Provedor local e determinístico, sem acesso à rede, para testes de carga.
+
+    Cada ticker recebe uma série OHLCV gerada por um passeio aleatório
+    geométrico com semente derivada do próprio ticker, sempre a partir de
+    ORIGEM. Assim o mesmo ticker devolve os mesmos preços em qualquer execução
+    e em qualquer data inicial, o que mantém as cargas incrementais coerentes.
+    Criptomoedas ('-USD') e câmbio ('=X') têm pregão todos os dias; os demais
+    ativos, apenas em dias úteis. As séries do SGS são geradas da mesma forma,
+    como taxas percentuais diárias ou mensais.
+
+    Uma latência simulada por requisição permite medir o efeito da
+    concorrência nos benchmarks. Nos lotes, os tickers são "baixados" por
+    `workers` threads, como no yf.download.
+    """
+
+    nome = 'sintetico'
+
+    ORIGEM = '2010-01-01'
+
+    # Volatilidade anual e volume médio diário por classe de ativo.
+    PARAMETROS_CLASSE = {
+        'acao': (0.35, 5e6),
+        'cripto': (0.80, 2e8),
+        'cambio': (0.12, 0.0),
+    }
+
+    def __init__(self, semente=0, data_final=None, anos_historico=None, latencia=0.0):
+        """
+        Args:
+            semente (int): Semente global; altera todas as séries geradas.
+            data_final (str): Último dia gerado ('YYYY-MM-DD'). None usa a data atual.
+            anos_historico (float): Limita os históricos devolvidos aos últimos
+                                    N anos. None devolve tudo desde a data pedida.
+            latencia (float): Tempo simulado de cada requisição, em segundos.
+        """
+        self.semente = int(semente)
+        self.latencia = float(latencia)
+        self.data_final = pd.Timestamp(data_final).normalize() if data_final else pd.Timestamp.now().normalize()
+        self.data_minima = None
+        if anos_historico:
+            self.data_minima = self.data_final - pd.Timedelta(days=int(365 * anos_historico))
+
+    @staticmethod
+    def universo(quantidade, prefixo='SIN'):
+        """
+        Gera `quantidade` códigos fictícios de ações (ex: 'SIN0001'), no mesmo
+        formato dos códigos da carteira do IBrX-50.
+        """
+        return [f"{prefixo}{i:04d}" for i in range(1, quantidade + 1)]
+
+    @staticmethod
+    def _classe(ticker):
+        if ticker.endswith('-USD'):
+            return 'cripto'
+        if ticker.endswith('=X'):
+            return 'cambio'
+        return 'acao'
+
+    def _gerar(self, ticker):
+        """
+        Gera a série OHLCV completa do ticker, de ORIGEM até data_final.
+        """
+        classe = self._classe(ticker)
+        volatilidade, volume_medio = self.PARAMETROS_CLASSE[classe]
+        frequencia = 'B' if classe == 'acao' else 'D'
+        datas = pd.date_range(self.ORIGEM, self.data_final, freq=frequencia, name='Date')
+
+        rng = np.random.default_rng([self.semente, zlib.crc32(ticker.encode('utf-8'))])
+        dias_ano = 252 if classe == 'acao' else 365
+        sigma = volatilidade / np.sqrt(dias_ano)
+        preco_inicial = np.exp(rng.uniform(np.log(1), np.log(200)))
+        deriva = rng.normal(0.05, 0.10) / dias_ano - sigma ** 2 / 2
+
+        retornos = rng.normal(deriva, sigma, len(datas))
+        fechamento = preco_inicial * np.exp(np.cumsum(retornos))
+        abertura = np.concatenate([[preco_inicial], fechamento[:-1]]) * np.exp(rng.normal(0, sigma / 4, len(datas)))
+        amplitude = np.abs(rng.normal(0, sigma / 2, len(datas)))
+        maxima = np.maximum(abertura, fechamento) * np.exp(amplitude)
+        minima = np.minimum(abertura, fechamento) * np.exp(-amplitude)
+        volume = np.round(volume_medio * rng.lognormal(0, 0.5, len(datas)))
+
+        return pd.DataFrame(
+            {'Open': abertura, 'High': maxima, 'Low': minima, 'Close': fechamento, 'Volume': volume},
+            index=datas,
+        )
+
+    def _esperar(self, requisicoes=1):
+        """
+        Simula o tempo de `requisicoes` requisições feitas em sequência.
+        """
+        if self.latencia > 0:
+            time.sleep(self.latencia * requisicoes)
+
+    def _inicio_efetivo(self, inicio):
+        inicio = pd.Timestamp(inicio)
+        return max(inicio, self.data_minima) if self.data_minima is not None else inicio
+
+    def _historico(self, ticker, inicio):
+        df = self._gerar(ticker)
+        return df.loc[df.index >= self._inicio_efetivo(inicio)]
+
+    def historico(self, ticker, inicio):
+        self._esperar()
+        return self._historico(ticker, inicio)
+
+    def historico_em_lote(self, tickers, inicio, workers=WORKERS_PADRAO):
+        tickers = list(tickers)
+        self._esperar(math.ceil(len(tickers) / max(1, int(workers))))
+        partes = {ticker: self._historico(ticker, inicio) for ticker in tickers}
+        return pd.concat(partes, axis=1, names=['Ticker', 'Price']).swaplevel(0, 1, axis=1)
+
+    def cotacao(self, ticker, periodo='1d', intervalo='1d'):
+        self._esperar()
+        return self._gerar(ticker).iloc[-1:]
+
+    def serie_sgs(self, nome, codigo, inicio, fim, periodicidade='diaria'):
+        self._esperar()
+        frequencia = 'B' if periodicidade == 'diaria' else 'MS'
+        datas = pd.date_range(self.ORIGEM, self.data_final, freq=frequencia, name='Date')
+
+        rng = np.random.default_rng([self.semente, int(codigo)])
+        nivel = rng.uniform(0.01, 1.0) / (21 if periodicidade == 'diaria' else 1)
+        valores = np.abs(nivel + np.cumsum(rng.normal(0, nivel / 50, len(datas))))
+
+        df = pd.DataFrame({nome: np.round(valores, 6)}, index=datas)
+        mascara = (df.index >= self._inicio_efetivo(inicio)) & (df.index <= pd.Timestamp(fim))
+        return df.loc[mascara]
+
+
+PROVEDORES_MERCADO = {
+    ProvedorYFinance.nome: ProvedorYFinance,
+    ProvedorSintetico.nome: ProvedorSintetico,
+}
+
+_provedor_mercado = None
+_provedor_lock = threading.Lock()
+
+
+def criar_provedor_mercado(nome):
+    """
+    Cria o provedor de dados de mercado `nome` ('yfinance' ou 'sintetico').
+    """
+    if nome not in PROVEDORES_MERCADO:
+        raise ValueError(f"Provedor desconhecido: {nome}. Use um de {tuple(PROVEDORES_MERCADO)}")
+    return PROVEDORES_MERCADO[nome]()
+
+
+def obter_provedor_mercado():
+    """
+    Retorna o provedor de dados de mercado em uso, criado na primeira chamada
+    a partir de PUCINVEST_PROVEDOR ('yfinance' por padrão).
+    """
+    global _provedor_mercado
+    with _provedor_lock:
+        if _provedor_mercado is None:
+            _provedor_mercado = criar_provedor_mercado(os.environ.get('PUCINVEST_PROVEDOR', 'yfinance'))
+        return _provedor_mercado
+
+
+def definir_provedor_mercado(provedor):
+    """
+    Substitui o provedor de dados de mercado usado por todos os carregadores.
+
+    Args:
+        provedor (ProvedorMercado | str): Instância ou nome do provedor.
+    """
+    global _provedor_mercado
+    if isinstance(provedor, str):
+        provedor = criar_provedor_mercado(provedor)
+    with _provedor_lock:
+        _provedor_mercado = provedor
@@ -0,0 +1,71 @@
+import os
+import tempfile
+
+
+def criar_temporario(caminho):
+    """
+    Cria um arquivo temporário oculto no mesmo diretório de `caminho`, onde o
+    conteúdo pode ser gravado antes da publicação com substituir_arquivo.
+
+    Returns:
+        str: Caminho do arquivo temporário.
+    """
+    diretorio = os.path.dirname(os.path.abspath(caminho))
+    os.makedirs(diretorio, exist_ok=True)
+    descritor, temporario = tempfile.mkstemp(
+        dir=diretorio, prefix=f".{os.path.basename(caminho)}.", suffix='.tmp'
+    )
+    os.close(descritor)
+    return temporario
+
+
+def substituir_arquivo(temporario, caminho):
+    """
+    Publica o arquivo temporário no lugar de `caminho` em uma única operação.
+    """
+    os.chmod(temporario, 0o644)
+    os.replace(temporario, caminho)
+
+
+def descartar_temporario(temporario):
+    """
+    Remove um arquivo temporário que não será publicado.
+    """
+    if os.path.exists(temporario):
+        os.remove(temporario)
+
+
+def publicar_arquivo(caminho, escrever):
+    """
+    Grava um arquivo de forma atômica: o conteúdo é escrito em um arquivo
+    temporário no mesmo diretório e só então trocado pelo definitivo com
+    os.replace. Quem lê o arquivo (ex: as páginas do Streamlit) vê a versão
+    anterior ou a nova completa, nunca um arquivo pela metade.
+
+    Args:
+        caminho (str): Caminho final do arquivo.
+        escrever (callable): Função que recebe o caminho temporário e grava nele.
+
+    Returns:
+        str: Caminho final do arquivo.
+    """
+    temporario = criar_temporario(caminho)
+    try:
+        escrever(temporario)
+        substituir_arquivo(temporario, caminho)
+    except BaseException:
+        descartar_temporario(temporario)
+        raise
+    return caminho
+
+
+def salvar_csv(df, caminho, **kwargs):
+    """
+    Salva um DataFrame em CSV de forma atômica (ver publicar_arquivo).
+
+    Args:
+        df (DataFrame): Dados a salvar.
+        caminho (str): Caminho do arquivo CSV.
+        **kwargs: Argumentos repassados ao DataFrame.to_csv.
+    """
+    return publicar_arquivo(caminho, lambda temporario: df.to_csv(temporario, **kwargs))
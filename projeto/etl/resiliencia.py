@@ -0,0 +1,231 @@
+import time
+import random
+import threading
+from etl.instrumentacao import contar
+
+# Configuração de cada provedor de dados externo:
+#   taxa               - requisições por segundo liberadas pelo limitador;
+#   capacidade         - rajada máxima de requisições acima da taxa;
+#   timeout            - tempo máximo de cada chamada, em segundos;
+#   tentativas         - número total de tentativas por chamada;
+#   espera_base        - espera inicial entre tentativas (dobra a cada falha);
+#   espera_maxima      - teto da espera entre tentativas;
+#   limite_falhas      - falhas seguidas que abrem o circuito;
+#   tempo_recuperacao  - segundos com o circuito aberto antes de testar de novo.
+CONFIG_PROVEDORES = {
+    'yahoo': {
+        'taxa': 4, 'capacidade': 8, 'timeout': 30, 'tentativas': 4,
+        'espera_base': 1.0, 'espera_maxima': 30.0,
+        'limite_falhas': 8, 'tempo_recuperacao': 60,
+    },
+    'bcb': {
+        'taxa': 5, 'capacidade': 10, 'timeout': 30, 'tentativas': 4,
+        'espera_base': 1.0, 'espera_maxima': 20.0,
+        'limite_falhas': 6, 'tempo_recuperacao': 60,
+    },
+    'b3': {
+        'taxa': 2, 'capacidade': 4, 'timeout': 15, 'tentativas': 3,
+        'espera_base': 1.0, 'espera_maxima': 10.0,
+        'limite_falhas': 3, 'tempo_recuperacao': 120,
+    },
+}
+
+# Erros causados pela própria requisição (parâmetros inválidos, série
+# inexistente): repetir não adianta e não indicam que o provedor caiu.
+ERROS_NAO_REPETIVEIS = (ValueError, KeyError, TypeError)
+
+
+class CircuitoAberto(RuntimeError):
+    """
+    Indica que o provedor foi desativado temporariamente após falhas seguidas.
+    """
+
+
+class ErroTransitorio(RuntimeError):
+    """
+    Resposta inválida do provedor que deve ser tratada como falha passageira
+    (ex: lote inteiro retornado vazio).
+    """
+
+
+class LimitadorTaxa:
+    """
+    Token bucket: libera até `taxa` requisições por segundo, com rajadas de
+    até `capacidade` requisições.
+    """
+
+    def __init__(self, taxa, capacidade):
+        self.taxa = float(taxa)
+        self.capacidade = float(capacidade)
+        self._tokens = float(capacidade)
+        self._atualizado_em = time.monotonic()
+        self._lock = threading.Lock()
+
+    def adquirir(self):
+        """
+        Bloqueia até haver um token disponível e o consome.
+        """
+        while True:
+            with self._lock:
+                agora = time.monotonic()
+                self._tokens = min(
+                    self.capacidade,
+                    self._tokens + (agora - self._atualizado_em) * self.taxa
+                )
+                self._atualizado_em = agora
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                espera = (1 - self._tokens) / self.taxa
+
+            time.sleep(espera)
+
+
+class Disjuntor:
+    """
+    Circuit breaker: após `limite_falhas` falhas seguidas o circuito abre e as
+    chamadas falham imediatamente por `tempo_recuperacao` segundos. Depois
+    disso uma única chamada de teste é liberada; se ela funcionar o circuito
+    fecha, senão volta a abrir.
+    """
+
+    def __init__(self, nome, limite_falhas, tempo_recuperacao):
+        self.nome = nome
+        self.limite_falhas = limite_falhas
+        self.tempo_recuperacao = tempo_recuperacao
+        self.falhas = 0
+        self.aberto_em = None
+        self._teste_em_andamento = False
+        self._lock = threading.Lock()
+
+    @property
+    def estado(self):
+        """
+        Retorna 'fechado', 'aberto' ou 'semiaberto'.
+        """
+        with self._lock:
+            return self._estado()
+
+    def _estado(self):
+        if self.aberto_em is None:
+            return 'fechado'
+        if time.monotonic() - self.aberto_em >= self.tempo_recuperacao:
+            return 'semiaberto'
+        return 'aberto'
+
+    def liberar(self):
+        """
+        Verifica se uma chamada pode ser feita, levantando CircuitoAberto se não puder.
+        """
+        with self._lock:
+            estado = self._estado()
+            if estado == 'fechado':
+                return
+            if estado == 'semiaberto' and not self._teste_em_andamento:
+                self._teste_em_andamento = True
+                return
+
+        raise CircuitoAberto(f"Provedor '{self.nome}' indisponível (circuito aberto)")
+
+    def registrar_sucesso(self):
+        with self._lock:
+            self.falhas = 0
+            self.aberto_em = None
+            self._teste_em_andamento = False
+
+    def registrar_falha(self):
+        with self._lock:
+            self.falhas += 1
+            if self._teste_em_andamento or self.falhas >= self.limite_falhas:
+                if self.aberto_em is None:
+                    print(f"Circuito do provedor '{self.nome}' aberto após {self.falhas} falhas seguidas")
+                self.aberto_em = time.monotonic()
+            self._teste_em_andamento = False
+
+
+class Provedor:
+    """
+    Agrupa o limitador de taxa, o disjuntor e a política de repetição de um
+    provedor de dados.
+    """
+
+    def __init__(self, nome, taxa, capacidade, timeout, tentativas, espera_base,
+                 espera_maxima, limite_falhas, tempo_recuperacao):
+        self.nome = nome
+        self.timeout = timeout
+        self.tentativas = max(1, int(tentativas))
+        self.espera_base = espera_base
+        self.espera_maxima = espera_maxima
+        self.limitador = LimitadorTaxa(taxa, capacidade)
+        self.disjuntor = Disjuntor(nome, limite_falhas, tempo_recuperacao)
+
+    def _espera(self, tentativa):
+        """
+        Espera antes da próxima tentativa: exponencial com jitter completo.
+        """
+        return random.uniform(0, min(self.espera_maxima, self.espera_base * 2 ** tentativa))
+
+    def executar(self, funcao):
+        """
+        Executa `funcao(timeout)` respeitando o limite de taxa, repetindo as
+        falhas passageiras e registrando o resultado no disjuntor.
+
+        Args:
+            funcao (callable): Função que recebe o timeout em segundos e faz a requisição.
+
+        Returns:
+            object: Retorno de `funcao`.
+        """
+        for tentativa in range(self.tentativas):
+            self.disjuntor.liberar()
+            self.limitador.adquirir()
+
+            try:
+                resultado = funcao(self.timeout)
+            except ERROS_NAO_REPETIVEIS:
+                self.disjuntor.registrar_sucesso()
+                raise
+            except Exception as e:
+                self.disjuntor.registrar_falha()
+                if tentativa == self.tentativas - 1:
+                    raise
+                espera = self._espera(tentativa)
+                contar('retries')
+                print(f"Falha no provedor '{self.nome}' ({str(e)}). "
+                      f"Nova tentativa em {espera:.1f}s ({tentativa + 2}/{self.tentativas})")
+                time.sleep(espera)
+                continue
+
+            self.disjuntor.registrar_sucesso()
+            return resultado
+
+
+_provedores = {}
+_provedores_lock = threading.Lock()
+
+
+def obter_provedor(nome):
+    """
+    Retorna o Provedor compartilhado de `nome`, criando-o na primeira chamada
+    a partir de CONFIG_PROVEDORES.
+    """
+    with _provedores_lock:
+        if nome not in _provedores:
+            _provedores[nome] = Provedor(nome, **CONFIG_PROVEDORES[nome])
+        return _provedores[nome]
+
+
+def chamar(nome_provedor, funcao):
+    """
+    Executa uma requisição a um provedor externo com limite de taxa, timeout,
+    repetição com backoff exponencial e circuit breaker.
+
+    Args:
+        nome_provedor (str): Chave de CONFIG_PROVEDORES ('yahoo', 'bcb' ou 'b3').
+        funcao (callable): Função que recebe o timeout em segundos e faz a requisição.
+
+    Returns:
+        object: Retorno de `funcao`.
+    """
+    return obter_provedor(nome_provedor).executar(funcao)
@@ -5,15 +5,127 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import Select
 from webdriver_manager.chrome import ChromeDriverManager
-import time
 import os
+from etl.catalogo import registrar_artefato
 
-def download_ibrx50_data():
+# Outras etapas do ETL gravam em results/ ao mesmo tempo; só interessam aqui
+# os arquivos da carteira do dia e os downloads parciais do Chrome.
+PREFIXO_ARQUIVO = 'IBXLDia'
+EXTENSAO_PARCIAL = '.crdownload'
+
+
+def _arquivos_concluidos(download_dir):
+    """
+    Retorna os arquivos da carteira do dia já completos no diretório de download.
+    """
+    return {
+        f for f in os.listdir(download_dir)
+        if f.startswith(PREFIXO_ARQUIVO) and f.endswith('.csv')
+    }
+
+
+def _aguardar_download(driver, download_dir, arquivos_antes, timeout=60):
+    """
+    Aguarda até surgir no diretório um arquivo novo e completo, isto é, sem
+    extensão de download parcial e com tamanho estável entre duas verificações.
+
+    Returns:
+        str: Caminho do arquivo baixado.
+    """
+    tamanhos = {}
+
+    def download_concluido(_):
+        parciais = [f for f in os.listdir(download_dir) if f.endswith(EXTENSAO_PARCIAL)]
+        novos = _arquivos_concluidos(download_dir) - arquivos_antes
+        if parciais or not novos:
+            return False
+        for nome in novos:
+            caminho = os.path.join(download_dir, nome)
+            tamanho = os.path.getsize(caminho)
+            if tamanho > 0 and tamanhos.get(nome) == tamanho:
+                return caminho
+            tamanhos[nome] = tamanho
+        return False
+
+    return WebDriverWait(driver, timeout, poll_frequency=0.25).until(download_concluido)
+
+
+def _selecionar_120_itens(driver):
+    """
+    Seleciona 120 itens por página e aguarda a tabela ser renderizada novamente.
+    """
+    print('Procurando o dropdown...')
+    dropdown = WebDriverWait(driver, 20).until(
+        EC.element_to_be_clickable((By.ID, 'selectPage'))
+    )
+
+    linhas_antes = driver.find_elements(By.CSS_SELECTOR, 'table tbody tr')
+
+    print('Selecionando 120 itens por página...')
+    select = Select(dropdown)
+    try:
+        select.select_by_visible_text('120')
+    except:
+        try:
+            driver.execute_script("arguments[0].value = '120'; arguments[0].dispatchEvent(new Event('change'))", dropdown)
+        except:
+            print('Não foi possível selecionar o valor usando métodos convencionais')
+            options = driver.find_elements(By.TAG_NAME, 'option')
+            for option in options:
+                if option.get_attribute('value') == '120':
+                    option.click()
+                    break
+    print('Valor selecionado com sucesso!')
+
+    if linhas_antes:
+        try:
+            WebDriverWait(driver, 10).until(EC.staleness_of(linhas_antes[0]))
+        except Exception:
+            print('A tabela não foi recarregada após a troca de página; seguindo com a tabela atual')
+    WebDriverWait(driver, 10).until(
+        EC.presence_of_element_located((By.CSS_SELECTOR, 'table tbody tr'))
+    )
+
+
+def _localizar_botao_download(driver):
+    """
+    Localiza o botão de download da carteira do dia.
+    """
+    print('Procurando botão de download...')
+    localizadores = [
+        (By.CLASS_NAME, 'btn-download'),
+        (By.XPATH, "//button[contains(text(), 'Download')]"),
+        (By.LINK_TEXT, "Download"),
+    ]
+    erro = None
+    for localizador in localizadores:
+        try:
+            return WebDriverWait(driver, 10).until(EC.element_to_be_clickable(localizador))
+        except Exception as e:
+            erro = e
+    print(f'Não foi possível encontrar o botão de download: {str(erro)}')
+    print('\nHTML da página:')
+    print(driver.page_source)
+    raise erro
+
+
+def download_ibrx50_data(tentativas=3):
     """
     Realiza o download dos dados do IBrX-50 do site da B3.
+
+    As esperas são baseadas em eventos da página (tabela recarregada, botão
+    clicável) e o download só é considerado concluído quando um arquivo novo e
+    completo aparece no diretório. A mesma sessão do navegador é reaproveitada
+    entre as tentativas.
+
+    Args:
+        tentativas (int): Número máximo de tentativas de download.
+
+    Returns:
+        str: Caminho do arquivo baixado, ou None se todas as tentativas falharem.
     """
     chrome_options = webdriver.ChromeOptions()
-    download_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'results'))
+    download_dir = os.path.abspath(os.environ.get('PUCINVEST_RESULTS_DIR') or os.path.join(os.path.dirname(__file__), '..', '..', 'results'))
     chrome_options.add_experimental_option('prefs', {
         'download.default_directory': download_dir,
         'download.prompt_for_download': False,
@@ -33,74 +145,39 @@ def download_ibrx50_data():
     
     try:
         url = 'https://sistemaswebb3-listados.b3.com.br/indexPage/day/IBXL?language=pt-br'
-        driver.get(url)
-        
-        try:
-            accept_cookies = WebDriverWait(driver, 10).until(
-                EC.element_to_be_clickable((By.ID, 'onetrust-accept-btn-handler'))
-            )
-            accept_cookies.click()
-            print('Cookies aceitos com sucesso!')
-        except Exception as e:
-            print('Não foi possível encontrar o botão de cookies ou já foi aceito anteriormente')
-        
-        print('Procurando o dropdown...')
-        dropdown = WebDriverWait(driver, 20).until(
-            EC.presence_of_element_located((By.ID, 'selectPage'))
-        )
-        WebDriverWait(driver, 20).until(
-            EC.element_to_be_clickable((By.ID, 'selectPage'))
-        )
-        
-        print('Selecionando 120 itens por página...')
-        select = Select(dropdown)
-        try:
-            select.select_by_visible_text('120')
-        except:
-            try:
-                driver.execute_script("arguments[0].value = '120'; arguments[0].dispatchEvent(new Event('change'))", dropdown)
-            except:
-                print('Não foi possível selecionar o valor usando métodos convencionais')
-                options = driver.find_elements(By.TAG_NAME, 'option')
-                for option in options:
-                    if option.get_attribute('value') == '120':
-                        option.click()
-                        break
-        print('Valor selecionado com sucesso!')
-        time.sleep(3)
-        
-        time.sleep(2)
-        
-        print('Procurando botão de download...')
-        try:
-            download_button = WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.CLASS_NAME, 'btn-download'))
-            )
-        except:
+        cookies_aceitos = False
+
+        for tentativa in range(1, tentativas + 1):
             try:
-                download_button = WebDriverWait(driver, 10).until(
-                    EC.presence_of_element_located((By.XPATH, "//button[contains(text(), 'Download')]" ))
-                )
-            except:
-                try:
-                    download_button = WebDriverWait(driver, 10).until(
-                        EC.presence_of_element_located((By.LINK_TEXT, "Download"))
-                    )
-                except Exception as e:
-                    print(f'Não foi possível encontrar o botão de download: {str(e)}')
-                    print('\nHTML da página:')
-                    print(driver.page_source)
-                    raise e
-        
-        print('Botão de download encontrado, tentando clicar...')
-        driver.execute_script("arguments[0].click();", download_button)
-        
-        time.sleep(5)
-        
-        print('Download concluído com sucesso!')
-        
-    except Exception as e:
-        print(f'Erro durante o processo: {str(e)}')
+                driver.get(url)
+
+                if not cookies_aceitos:
+                    try:
+                        accept_cookies = WebDriverWait(driver, 10).until(
+                            EC.element_to_be_clickable((By.ID, 'onetrust-accept-btn-handler'))
+                        )
+                        accept_cookies.click()
+                        print('Cookies aceitos com sucesso!')
+                    except Exception as e:
+                        print('Não foi possível encontrar o botão de cookies ou já foi aceito anteriormente')
+                    cookies_aceitos = True
+
+                _selecionar_120_itens(driver)
+                download_button = _localizar_botao_download(driver)
+
+                arquivos_antes = _arquivos_concluidos(download_dir)
+                print('Botão de download encontrado, tentando clicar...')
+                driver.execute_script("arguments[0].click();", download_button)
+
+                caminho_arquivo = _aguardar_download(driver, download_dir, arquivos_antes)
+                print(f'Download concluído com sucesso: {os.path.basename(caminho_arquivo)}')
+                registrar_artefato('ibrx50_bruto', caminho_arquivo, 'ibrx50_download')
+                return caminho_arquivo
+
+            except Exception as e:
+                print(f'Erro durante o processo (tentativa {tentativa}/{tentativas}): {str(e)}')
+
+        return None
         
     finally:
-        driver.quit()
\ No newline at end of file
+        driver.quit()
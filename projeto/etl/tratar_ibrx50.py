@@ -2,60 +2,78 @@ import pandas as pd
 from datetime import datetime
 import os
 import chardet
-import re
+from etl.catalogo import registrar_artefato, obter_artefato, listar_artefatos, aplicar_retencao
+from etl.instrumentacao import registrar_arquivo
+from etl.publicacao import publicar_arquivo, salvar_csv
 
-def processar_ibrx50():
+SNAPSHOTS_MANTIDOS = 7
+
+def _ler_csv_b3(nome_arquivo):
     """
-    Processa o arquivo CSV do IBrX-50, limpando e formatando os dados.
+    Lê o CSV da carteira do dia baixado do site da B3, detectando o encoding
+    e descartando o cabeçalho e o rodapé do arquivo.
     """
-    data_atual = datetime.now().strftime("%d-%m-%y")
+    with open(nome_arquivo, "rb") as file:
+        raw_data = file.read()
+        result = chardet.detect(raw_data)
+        encoding = result["encoding"]
 
-    results_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'results'))
-    arquivos_na_pasta = [os.path.join(results_dir, f) for f in os.listdir(results_dir) if f.endswith(".csv")]
+    print(f"Encoding detectado: {encoding}")
 
-    if not arquivos_na_pasta:
-        print("Nenhum arquivo .csv encontrado na pasta.")
-    else:
-        caminho_arquivo_recente = max(arquivos_na_pasta, key=os.path.getmtime)
-        nome_arquivo_recente = os.path.basename(caminho_arquivo_recente)
-        print(f"O arquivo baixado mais recentemente é: {nome_arquivo_recente}")
-        
-        padrao_data = r"(\d{2}-\d{2}-\d{2})"
-        match = re.search(padrao_data, nome_arquivo_recente)
-        
-        if match:
-            data_arquivo = match.group(1)
-            print(f"Data do arquivo: {data_arquivo}")
-
-    nome_arquivo = os.path.join(results_dir, f"IBXLDia_{data_arquivo}.csv")
-    #nome_arquivo = os.path.join(results_dir, f"IBXLDia_{data_atual}.csv")
-
-    if not os.path.exists(nome_arquivo):
-        raise FileNotFoundError(f"Arquivo {nome_arquivo} não encontrado!")
+    with open(nome_arquivo, "r", encoding=encoding) as file:
+        linhas = file.readlines()
 
-    try:
-        with open(nome_arquivo, "rb") as file:
-            raw_data = file.read()
-            result = chardet.detect(raw_data)
-            encoding = result["encoding"]
+    linhas_limpas = [linha.strip().rstrip(";") + "\n" for linha in linhas]
+
+    dados_acoes = [linha for linha in linhas_limpas[2:] if linha.strip()]
+
+    df = pd.DataFrame([linha.strip().split(";") for linha in dados_acoes])
 
-        print(f"Encoding detectado: {encoding}")
+    df.columns = ["Código", "Ação", "Tipo", "Qtde. Teórica", "Part. (%)"]
 
-        with open(nome_arquivo, "r", encoding=encoding) as file:
-            linhas = file.readlines()
+    return df.iloc[:-2]
 
-        linhas_limpas = [linha.strip().rstrip(";") + "\n" for linha in linhas]
+def processar_ibrx50(df_composicao=None):
+    """
+    Processa o arquivo CSV do IBrX-50, limpando e formatando os dados.
 
-        dados_acoes = [linha for linha in linhas_limpas[2:] if linha.strip()]
+    Sem `df_composicao`, o CSV baixado pelo navegador é localizado apenas
+    pelo catálogo (artefato 'ibrx50_bruto', registrado por download_ibrx50_data).
 
-        df = pd.DataFrame([linha.strip().split(";") for linha in dados_acoes])
+    Args:
+        df_composicao (DataFrame): Composição já obtida pela API da B3. Quando
+                                   informada, o CSV baixado pelo navegador não é lido.
 
-        df.columns = ["Código", "Ação", "Tipo", "Qtde. Teórica", "Part. (%)"]
+    Raises:
+        FileNotFoundError: Se não houver composição nem CSV registrado no catálogo.
+    """
+    data_atual = datetime.now().strftime("%d-%m-%y")
 
-        df = df.iloc[:-2]
+    results_dir = os.path.abspath(os.environ.get('PUCINVEST_RESULTS_DIR') or os.path.join(os.path.dirname(__file__), '..', '..', 'results'))
+
+    data_referencia = datetime.now().strftime("%Y-%m-%d")
+    registro_bruto = obter_artefato('ibrx50_bruto') if df_composicao is None else None
+
+    if df_composicao is not None:
+        nome_arquivo = os.path.join(results_dir, f"IBXLDia_{data_atual}.csv")
+    elif registro_bruto is not None:
+        nome_arquivo = registro_bruto['caminho']
+        data_referencia = registro_bruto['data']
+        print(f"Arquivo do IBrX-50 obtido do catálogo: {os.path.basename(nome_arquivo)}")
+
+        if not os.path.exists(nome_arquivo):
+            raise FileNotFoundError(f"Arquivo {nome_arquivo} não encontrado!")
+    else:
+        raise FileNotFoundError("Nenhum arquivo do IBrX-50 registrado no catálogo (etapa ibrx50_download)")
+
+    try:
+        if df_composicao is not None:
+            df = df_composicao[["Código", "Ação", "Tipo", "Qtde. Teórica", "Part. (%)"]].copy()
+        else:
+            df = _ler_csv_b3(nome_arquivo)
 
         try:
-            df["Part. (%)"] = df["Part. (%)"].str.replace(",", ".").astype(float)
+            df["Part. (%)"] = df["Part. (%)"].astype(str).str.replace(",", ".").astype(float)
         except Exception as e:
             print("\nErro ao converter porcentagem:")
             print(f"Colunas disponíveis: {df.columns.tolist()}")
@@ -72,8 +90,8 @@ def processar_ibrx50():
 
         df_codigo = df[["Código"]]
 
-        try:
-            with open(nome_arquivo, "w", encoding="UTF-8") as file:
+        def escrever(temporario):
+            with open(temporario, "w", encoding="UTF-8") as file:
                 file.write(f"IBXL - Carteira do Dia {data_atual}\n")
 
                 file.write("Código\n")
@@ -81,13 +99,19 @@ def processar_ibrx50():
                 for codigo in df_codigo["Código"]:
                     file.write(f"{codigo}\n")
 
-                print(
-                    f"Arquivo salvo com sucesso apenas com os códigos: {nome_arquivo}"
-                )
+        try:
+            publicar_arquivo(nome_arquivo, escrever)
+            print(
+                f"Arquivo salvo com sucesso apenas com os códigos: {nome_arquivo}"
+            )
         except Exception as e:
             print(f"Erro ao salvar o arquivo: {str(e)}")
             raise e
 
+        registrar_artefato('ibrx50', nome_arquivo, 'ibrx50_tratamento', linhas=len(df), data=data_referencia)
+        registrar_arquivo(nome_arquivo)
+        compactar_snapshots_ibrx50()
+
         print(f"\nInformações do arquivo {nome_arquivo}:")
         print(f"Número de linhas: {len(df)}")
         print("\nPrimeiras 5 linhas do DataFrame:")
@@ -98,3 +122,40 @@ def processar_ibrx50():
     except Exception as e:
         print(f"Erro ao processar o arquivo: {str(e)}")
         return None
+
+
+def compactar_snapshots_ibrx50(manter=SNAPSHOTS_MANTIDOS):
+    """
+    Move as carteiras do IBrX-50 mais antigas que as `manter` mais recentes
+    para um único arquivo compactado (ibrx50_composicoes.csv, com as colunas
+    Data e Código) e remove os arquivos IBXLDia_*.csv correspondentes.
+
+    Args:
+        manter (int): Quantidade de carteiras diárias mantidas como arquivo próprio.
+
+    Returns:
+        int: Quantidade de carteiras compactadas.
+    """
+    antigos = listar_artefatos('ibrx50')[:-manter] if manter > 0 else listar_artefatos('ibrx50')
+    antigos = [registro for registro in antigos if os.path.exists(registro['caminho'])]
+
+    if antigos:
+        results_dir = os.path.abspath(os.environ.get('PUCINVEST_RESULTS_DIR') or os.path.join(os.path.dirname(__file__), '..', '..', 'results'))
+        nome_compactado = os.path.join(results_dir, 'ibrx50_composicoes.csv')
+
+        partes = []
+        for registro in antigos:
+            df_codigos = pd.read_csv(registro['caminho'], skiprows=1)
+            df_codigos.columns = ['Código']
+            df_codigos.insert(0, 'Data', registro['data'])
+            partes.append(df_codigos)
+
+        df_compactado = pd.concat(partes, ignore_index=True)
+        if os.path.exists(nome_compactado):
+            df_compactado = pd.concat([pd.read_csv(nome_compactado), df_compactado], ignore_index=True)
+        df_compactado = df_compactado.drop_duplicates(subset=['Data', 'Código'])
+        salvar_csv(df_compactado, nome_compactado, index=False)
+        registrar_arquivo(nome_compactado)
+
+    aplicar_retencao('ibrx50', manter)
+    return len(antigos)
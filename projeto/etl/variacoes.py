@@ -0,0 +1,246 @@
+import os
+import threading
+import pandas as pd
+from etl.armazenamento import caminho_artefato, ler_historico
+from etl.matriz import selecionar_extremos
+from etl.agregados import (
+    AgregadorHistorico,
+    AGREGACOES,
+    SUFIXO_RECENTE,
+    DIAS_JANELA_RECENTE,
+    nome_agregado,
+)
+
+PERIODOS = ('1d', '1mo', '1y')
+
+# Agregado usado por cada período e quantos dos seus períodos mais recentes
+# entram nas métricas das páginas (últimos 30 dias, 12 meses e 3 anos).
+AGREGADO_POR_PERIODO = {
+    '1d': (SUFIXO_RECENTE, 1),
+    '1mo': ('mensal', 12),
+    '1y': ('anual', 3),
+}
+
+COLUNAS_VARIACOES = ['Simbolo', 'Nome', 'Preco_Inicial', 'Preco_Final', 'Variacao']
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def versao_dados(nome):
+    """
+    Identifica a versão atual de um artefato pelo arquivo publicado. Como a
+    publicação troca o arquivo inteiro (ver publicar_arquivo), qualquer nova
+    carga do ETL muda a versão.
+
+    Args:
+        nome (str): Nome base do artefato (ex: 'historico_acoes').
+
+    Returns:
+        tuple: Caminho, inode, tamanho e data de modificação do arquivo, ou
+               None se o artefato não existir.
+    """
+    for extensao in ('parquet', 'csv'):
+        caminho = caminho_artefato(nome, extensao)
+        if os.path.exists(caminho):
+            info = os.stat(caminho)
+            return caminho, info.st_ino, info.st_size, info.st_mtime_ns
+    return None
+
+
+def _sufixos():
+    return list(AGREGACOES) + [SUFIXO_RECENTE]
+
+
+def _calcular_agregados(nome):
+    """
+    Calcula os agregados a partir do histórico diário, para históricos
+    gravados antes de o ETL materializá-los.
+    """
+    agregador = AgregadorHistorico()
+    for _, df_simbolo in ler_historico(nome).groupby('Simbolo', observed=True, sort=False):
+        agregador.adicionar(df_simbolo)
+    return agregador.resultados()
+
+
+def _primeiro_e_ultimo(df_agregado, coluna):
+    """
+    Compara o primeiro e o último valor de `coluna` de cada símbolo.
+    """
+    df_agregado = df_agregado.sort_values(['Simbolo', 'Data'])
+    df_periodo = df_agregado.groupby('Simbolo', observed=True).agg(
+        Nome=('Nome', 'first'),
+        Preco_Inicial=(coluna, 'first'),
+        Preco_Final=(coluna, 'last'),
+    ).reset_index()
+    return df_periodo
+
+
+def calcular_variacoes(agregados):
+    """
+    Calcula a variação de cada ativo nos três períodos a partir dos agregados.
+
+    - '1d': último preço contra o primeiro dos últimos DIAS_JANELA_RECENTE
+      dias (ativos sem pregão nesse intervalo ficam de fora);
+    - '1mo': média do último mês contra a média do primeiro mês do histórico;
+    - '1y': média do último ano contra a média do primeiro ano do histórico.
+
+    Args:
+        agregados (dict): Sufixo -> DataFrame, como em AgregadorHistorico.resultados.
+
+    Returns:
+        dict: Período -> DataFrame com COLUNAS_VARIACOES, ordenado pela
+              variação decrescente.
+    """
+    if not agregados:
+        return {periodo: pd.DataFrame(columns=COLUNAS_VARIACOES) for periodo in PERIODOS}
+
+    df_recente = agregados[SUFIXO_RECENTE]
+    limite = df_recente['Data_Final'].max() - pd.Timedelta(days=DIAS_JANELA_RECENTE)
+    df_recente = df_recente.loc[df_recente['Data_Final'] >= limite]
+
+    variacoes = {
+        '1d': df_recente[['Simbolo', 'Nome']].assign(
+            Preco_Inicial=df_recente['Primeiro'],
+            Preco_Final=df_recente['Ultimo'],
+        ),
+        '1mo': _primeiro_e_ultimo(agregados['mensal'], 'Media'),
+        '1y': _primeiro_e_ultimo(agregados['anual'], 'Media'),
+    }
+
+    for periodo, df_periodo in variacoes.items():
+        df_periodo = df_periodo.assign(
+            Variacao=(df_periodo['Preco_Final'] / df_periodo['Preco_Inicial'] - 1) * 100
+        )
+        variacoes[periodo] = df_periodo.sort_values('Variacao', ascending=False, ignore_index=True)
+    return variacoes
+
+
+def _obter_cache(nome):
+    """
+    Retorna (agregados, variações) de um histórico, recalculados apenas
+    quando o ETL publica uma nova versão do histórico ou dos agregados.
+    """
+    versao = tuple(versao_dados(nome_agregado(nome, sufixo)) for sufixo in _sufixos())
+    versao += (versao_dados(nome),)
+
+    with _cache_lock:
+        versao_cache, agregados, variacoes = _cache.get(nome, (None, None, None))
+        if versao_cache != versao:
+            if all(versao[:-1]):
+                agregados = {
+                    sufixo: ler_historico(nome_agregado(nome, sufixo)) for sufixo in _sufixos()
+                }
+            elif versao[-1] is not None:
+                agregados = _calcular_agregados(nome)
+            else:
+                agregados = {}
+            variacoes = calcular_variacoes(agregados)
+            _cache[nome] = (versao, agregados, variacoes)
+
+    return agregados, variacoes
+
+
+def obter_variacoes(nome, periodo):
+    """
+    Retorna a variação dos ativos de um histórico no período, calculada uma
+    vez por versão dos dados. Enquanto o ETL não publicar uma nova versão,
+    trocar de período é apenas uma consulta ao cache.
+
+    Args:
+        nome (str): Artefato histórico (ex: 'historico_acoes').
+        periodo (str): '1d' para 30 dias, '1mo' para mensal, '1y' para anual.
+
+    Returns:
+        DataFrame: COLUNAS_VARIACOES ordenado pela variação decrescente.
+    """
+    if periodo not in PERIODOS:
+        raise ValueError(f"Período desconhecido: {periodo}. Use um de {PERIODOS}")
+
+    _, variacoes = _obter_cache(nome)
+    return variacoes[periodo]
+
+
+def obter_maiores_variacoes(nome, periodo, k=5):
+    """
+    Retorna as k maiores altas e as k maiores quedas do período, com a mesma
+    variação de obter_variacoes. Os extremos são escolhidos por
+    np.argpartition sobre as variações já calculadas para a versão dos dados;
+    ativos sem variação (NaN) ficam de fora.
+
+    Args:
+        nome (str): Artefato histórico (ex: 'historico_acoes').
+        periodo (str): '1d', '1mo' ou '1y'.
+        k (int): Quantidade de ativos em cada lista.
+
+    Returns:
+        tuple: (melhores, piores), DataFrames com COLUNAS_VARIACOES, vazios se
+               não houver dados.
+    """
+    df_variacoes = obter_variacoes(nome, periodo)
+    maiores, menores = selecionar_extremos(df_variacoes['Variacao'].to_numpy('float64'), k)
+    return (
+        df_variacoes.iloc[maiores].reset_index(drop=True),
+        df_variacoes.iloc[menores].reset_index(drop=True),
+    )
+
+
+def obter_metricas_periodo(nome, simbolo, periodo):
+    """
+    Retorna as métricas exibidas nas páginas para um ativo, lidas dos
+    agregados: preço atual e última variação diária, e preço máximo e mínimo
+    dos últimos 30 dias, 12 meses ou 3 anos, conforme o período.
+
+    Args:
+        nome (str): Artefato histórico (ex: 'historico_acoes').
+        simbolo (str): Símbolo do ativo.
+        periodo (str): '1d', '1mo' ou '1y'.
+
+    Returns:
+        dict: data_inicio, data_final, preco_atual, variacao_atual,
+              preco_maximo e preco_minimo; None se não houver dados do ativo.
+    """
+    if periodo not in PERIODOS:
+        raise ValueError(f"Período desconhecido: {periodo}. Use um de {PERIODOS}")
+
+    agregados, _ = _obter_cache(nome)
+    if not agregados:
+        return None
+
+    df_recente = agregados[SUFIXO_RECENTE]
+    df_recente = df_recente.loc[df_recente['Simbolo'] == simbolo]
+    if df_recente.empty:
+        return None
+
+    sufixo, quantidade = AGREGADO_POR_PERIODO[periodo]
+    df_periodo = agregados[sufixo]
+    df_periodo = df_periodo.loc[df_periodo['Simbolo'] == simbolo].sort_values('Data').tail(quantidade)
+
+    return {
+        'data_inicio': df_periodo['Data'].iloc[0],
+        'data_final': df_recente['Data_Final'].iloc[0],
+        'preco_atual': float(df_recente['Ultimo'].iloc[0]),
+        'variacao_atual': float(df_recente['Ultima_Variacao'].iloc[0]),
+        'preco_maximo': float(df_periodo['Maximo'].max()),
+        'preco_minimo': float(df_periodo['Minimo'].min()),
+    }
+
+
+def formatar_variacoes(df_variacoes, rotulo_nome='Nome', casas_preco=2):
+    """
+    Prepara as variações para exibição nas páginas.
+
+    Args:
+        df_variacoes (DataFrame): Resultado de obter_variacoes.
+        rotulo_nome (str): Rótulo da coluna de nome (ex: 'Empresa').
+        casas_preco (int): Casas decimais do preço.
+
+    Returns:
+        DataFrame: Colunas Símbolo, `rotulo_nome`, Preço e Variação (%).
+    """
+    return pd.DataFrame({
+        'Símbolo': df_variacoes['Simbolo'],
+        rotulo_nome: df_variacoes['Nome'],
+        'Preço': df_variacoes['Preco_Final'].astype('float64').round(casas_preco),
+        'Variação (%)': df_variacoes['Variacao'].astype('float64').round(2),
+    })
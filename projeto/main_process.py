@@ -1,12 +1,29 @@
 import os
+import argparse
 import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime
-from etl.scraping_ibrx50 import download_ibrx50_data as baixar_dados_ibrx50
+import pandas as pd
+from etl.api_ibrx50 import obter_composicao_ibrx50 as baixar_dados_ibrx50
 from etl.tratar_ibrx50 import processar_ibrx50 as tratar_dados_ibrx50
 from etl.acoes import baixar_historico_acoes
 from etl.criptomoedas import baixar_historico_cripto
 from etl.cambio import baixar_historico_cambio
 from etl.indices_economicos import buscar_dados_economicos
+from etl.concorrencia import WORKERS_PADRAO
+from etl.cache import remover_expirados
+from etl.instrumentacao import (
+    iniciar_instrumentacao,
+    finalizar_instrumentacao,
+    medir_etapa,
+    registrar_evento,
+)
+from etl.provedores import (
+    PROVEDORES_MERCADO,
+    ProvedorSintetico,
+    definir_provedor_mercado,
+    obter_provedor_mercado,
+)
 
 if not os.path.exists('results'):
     os.makedirs('results')
@@ -20,41 +37,287 @@ logging.basicConfig(
     ]
 )
 
-def main():
+# Grafo de dependências das etapas do ETL: nome -> (descrição, dependências).
+# Apenas o histórico das ações depende do IBrX-50; as demais etapas são independentes.
+ETAPAS = {
+    'ibrx50_download': ("download dos dados do IBrX-50", []),
+    'ibrx50_tratamento': ("tratamento dos dados do IBrX-50", ['ibrx50_download']),
+    'acoes': ("download do histórico das ações", ['ibrx50_tratamento']),
+    'cripto': ("download do histórico das criptomoedas", []),
+    'cambio': ("download do histórico do câmbio", []),
+    'indices': ("download dos índices econômicos", []),
+}
+
+
+def _exigir_dados(etapa, resultado):
+    """
+    Os carregadores tratam as próprias exceções e sinalizam a falha pelo
+    retorno: None, 0 linhas ou um DataFrame vazio. Converte esse retorno em
+    exceção para que executar_etapas marque a etapa como 'falha' e ignore as
+    etapas que dependem dela.
+
+    Args:
+        etapa (str): Nome da etapa.
+        resultado (object): Retorno do carregador.
+
+    Returns:
+        object: O próprio `resultado`, quando a etapa produziu dados.
+    """
+    if resultado is None:
+        vazio = True
+    elif isinstance(resultado, pd.DataFrame):
+        vazio = resultado.empty
+    else:
+        vazio = not resultado
+    if vazio:
+        raise RuntimeError(f"Etapa '{etapa}' não produziu dados")
+    return resultado
+
+
+def _funcoes_etapas(workers, tickers=None, cambio_triangulado=False):
+    """
+    Associa cada etapa do ETL à função que a executa.
+
+    Args:
+        workers (int): Número máximo de requisições simultâneas por provedor.
+        tickers (list): Códigos das ações a baixar. None usa a carteira do IBrX-50.
+        cambio_triangulado (bool): Se True, deriva o câmbio dos pares em dólar.
+
+    Returns:
+        dict: Nome da etapa -> função sem argumentos. Cada função levanta uma
+              exceção quando o carregador não produziu dados (ver _exigir_dados).
+    """
+    # Composição do IBrX-50 obtida pela API, repassada direto ao tratamento.
+    # Fica vazia quando o download caiu no fallback por navegador (que
+    # levanta exceção se também falhar).
+    composicao = {}
+
+    def baixar_ibrx50():
+        composicao['df'] = baixar_dados_ibrx50()
+
+    def tratar_ibrx50():
+        _exigir_dados('ibrx50_tratamento', tratar_dados_ibrx50(composicao.get('df')))
+
+    return {
+        'ibrx50_download': baixar_ibrx50,
+        'ibrx50_tratamento': tratar_ibrx50,
+        'acoes': lambda: _exigir_dados('acoes', baixar_historico_acoes(
+            incremental=True, workers=workers, tickers=tickers)),
+        'cripto': lambda: _exigir_dados('cripto', baixar_historico_cripto(incremental=True, workers=workers)),
+        'cambio': lambda: _exigir_dados('cambio', baixar_historico_cambio(
+            incremental=True, workers=workers, triangular=cambio_triangulado)),
+        'indices': lambda: _exigir_dados('indices', buscar_dados_economicos(workers=workers)),
+    }
+
+
+def resolver_etapas(selecionadas=None):
+    """
+    Retorna as etapas selecionadas acrescidas de todas as suas dependências.
+
+    Args:
+        selecionadas (list): Nomes das etapas desejadas. None executa todas.
+
+    Returns:
+        list: Nomes das etapas a executar, na ordem de declaração em ETAPAS.
+    """
+    if not selecionadas:
+        return list(ETAPAS)
+
+    necessarias = set()
+    pendentes = list(selecionadas)
+    while pendentes:
+        etapa = pendentes.pop()
+        if etapa not in ETAPAS:
+            raise ValueError(f"Etapa desconhecida: {etapa}")
+        if etapa not in necessarias:
+            necessarias.add(etapa)
+            pendentes.extend(ETAPAS[etapa][1])
+
+    return [etapa for etapa in ETAPAS if etapa in necessarias]
+
+
+def executar_etapas(etapas, funcoes):
+    """
+    Executa as etapas respeitando o grafo de dependências, rodando em paralelo
+    as que já têm todas as dependências concluídas. A falha de uma etapa
+    cancela apenas as etapas que dependem dela.
+
+    Args:
+        etapas (list): Nomes das etapas a executar.
+        funcoes (dict): Nome da etapa -> função sem argumentos.
+
+    Returns:
+        dict: Nome da etapa -> {'status', 'duracao', 'erro'}, onde status é
+              'sucesso', 'falha' ou 'ignorada'.
+    """
+    resultados = {}
+    pendentes = list(etapas)
+    em_execucao = {}
+
+    def executar(etapa):
+        inicio = datetime.now()
+        with medir_etapa(etapa):
+            funcoes[etapa]()
+        return datetime.now() - inicio
+
+    with ThreadPoolExecutor(max_workers=max(1, len(etapas))) as executor:
+        while pendentes or em_execucao:
+            for etapa in list(pendentes):
+                dependencias = [d for d in ETAPAS[etapa][1] if d in etapas]
+                if any(resultados.get(d, {}).get('status') in ('falha', 'ignorada') for d in dependencias):
+                    logging.warning(f"Etapa '{etapa}' ignorada: dependência não concluída")
+                    resultados[etapa] = {'status': 'ignorada', 'duracao': None, 'erro': None}
+                    registrar_evento('etapa', etapa=etapa, status='ignorada')
+                    pendentes.remove(etapa)
+                elif all(resultados.get(d, {}).get('status') == 'sucesso' for d in dependencias):
+                    logging.info(f"Iniciando {ETAPAS[etapa][0]} ({etapa})")
+                    em_execucao[executor.submit(executar, etapa)] = etapa
+                    pendentes.remove(etapa)
+
+            if not em_execucao:
+                continue
+
+            concluidos, _ = wait(em_execucao, return_when=FIRST_COMPLETED)
+            for futuro in concluidos:
+                etapa = em_execucao.pop(futuro)
+                try:
+                    duracao = futuro.result()
+                    resultados[etapa] = {'status': 'sucesso', 'duracao': duracao, 'erro': None}
+                    logging.info(f"Etapa '{etapa}' concluída em {duracao}")
+                except Exception as e:
+                    resultados[etapa] = {'status': 'falha', 'duracao': None, 'erro': str(e)}
+                    logging.error(f"Erro na etapa '{etapa}': {str(e)}")
+
+    return resultados
+
+
+def main(workers=WORKERS_PADRAO, etapas=None, provedor=None, universo=None, prometheus=False,
+         cambio_triangulado=False):
     """
     Função principal que orquestra o processo de ETL dos dados financeiros.
-    A ordem de execução é importante devido às dependências entre os processos.
+    As etapas são executadas conforme o grafo de dependências em ETAPAS,
+    com as etapas independentes rodando em paralelo.
+
+    Args:
+        workers (int): Número máximo de requisições simultâneas por provedor.
+        etapas (list): Etapas a executar (com suas dependências). None executa todas.
+        provedor (str): Provedor de dados de mercado ('yfinance' ou 'sintetico').
+                        None usa PUCINVEST_PROVEDOR.
+        universo (int): Quantidade de ações fictícias a carregar no lugar da
+                        carteira do IBrX-50 (apenas com o provedor sintético).
+        prometheus (bool): Se True, grava também results/etl_metricas.prom.
+        cambio_triangulado (bool): Se True, baixa apenas os pares em dólar e
+                                   deriva deles o câmbio em Real.
+
+    Returns:
+        dict: Resultado de cada etapa executada (ver executar_etapas).
     """
     try:
         if os.path.exists('results'):
             logging.info("Diretório 'results' existe e está pronto para uso")
         start_time = datetime.now()
         logging.info("Iniciando processo de ETL")
+        iniciar_instrumentacao('results', prometheus=prometheus)
 
-        logging.info("1. Iniciando download dos dados do IBrX-50")
-        baixar_dados_ibrx50()
-        logging.info("2. Iniciando tratamento dos dados do IBrX-50")
-        tratar_dados_ibrx50()
+        expirados = remover_expirados()
+        if expirados:
+            logging.info(f"{expirados} respostas expiradas removidas do cache")
 
-        logging.info("3. Iniciando download do histórico das ações")
-        baixar_historico_acoes()
+        if provedor:
+            definir_provedor_mercado(provedor)
+            logging.info(f"Provedor de dados de mercado: {provedor}")
 
-        logging.info("4. Iniciando download do histórico das criptomoedas")
-        baixar_historico_cripto()
+        etapas_execucao = resolver_etapas(etapas)
+        tickers = None
+        if universo:
+            if obter_provedor_mercado().nome != ProvedorSintetico.nome:
+                raise ValueError("O universo fictício só pode ser usado com o provedor sintético")
+            # A carteira do IBrX-50 é substituída pelo universo fictício.
+            tickers = ProvedorSintetico.universo(universo)
+            etapas_execucao = [etapa for etapa in etapas_execucao if not etapa.startswith('ibrx50')]
+            logging.info(f"Universo fictício com {universo} ações")
 
-        logging.info("5. Iniciando download do histórico do câmbio")
-        baixar_historico_cambio()
+        logging.info(f"Etapas a executar: {', '.join(etapas_execucao)}")
 
-        logging.info("6. Iniciando download dos índices econômicos")
-        buscar_dados_economicos()
+        resultados = executar_etapas(etapas_execucao, _funcoes_etapas(workers, tickers, cambio_triangulado))
 
         end_time = datetime.now()
         duration = end_time - start_time
+
+        resumo = finalizar_instrumentacao()
+
+        for etapa, resultado in resultados.items():
+            metricas = resumo['etapas'].get(etapa, {})
+            logging.info(
+                f"  {etapa}: {resultado['status']} (duração: {resultado['duracao']}, "
+                f"linhas: {metricas.get('linhas', 0)}, bytes: {metricas.get('bytes_gravados', 0)}, "
+                f"retries: {metricas.get('retries', 0)}, cache hits: {metricas.get('cache_hits', 0)})"
+            )
+
+        if resumo['simbolos_mais_lentos']:
+            logging.info("Buscas mais lentas: " + ", ".join(
+                f"{item['simbolo']} ({item['etapa']}, {item['latencia_s']:.2f}s)"
+                for item in resumo['simbolos_mais_lentos']
+            ))
+
+        falhas = [etapa for etapa, resultado in resultados.items() if resultado['status'] != 'sucesso']
+        if falhas:
+            raise RuntimeError(f"Etapas não concluídas: {', '.join(falhas)}")
+
         logging.info(f"Processo de ETL concluído com sucesso! Duração total: {duration}")
+        return resultados
 
     except Exception as e:
+        finalizar_instrumentacao()
         logging.error(f"Erro durante o processo de ETL: {str(e)}")
         raise
 
+def _parse_args():
+    """
+    Lê os argumentos de linha de comando do ETL.
+    """
+    parser = argparse.ArgumentParser(description="Processo de ETL do PUC Invest")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=WORKERS_PADRAO,
+        help=f"Número máximo de requisições simultâneas por provedor (padrão: {WORKERS_PADRAO})",
+    )
+    parser.add_argument(
+        "--etapas",
+        nargs="+",
+        choices=list(ETAPAS),
+        help="Executa apenas as etapas informadas e suas dependências (padrão: todas)",
+    )
+    parser.add_argument(
+        "--provedor",
+        choices=list(PROVEDORES_MERCADO),
+        help="Provedor de dados de mercado (padrão: PUCINVEST_PROVEDOR ou yfinance)",
+    )
+    parser.add_argument(
+        "--universo",
+        type=int,
+        help="Carrega N ações fictícias no lugar do IBrX-50 (requer --provedor sintetico)",
+    )
+    parser.add_argument(
+        "--prometheus",
+        action="store_true",
+        help="Grava as métricas da execução em results/etl_metricas.prom (formato texto do Prometheus)",
+    )
+    parser.add_argument(
+        "--cambio-triangulado",
+        action="store_true",
+        help="Baixa apenas os pares em dólar e deriva deles o câmbio em Real",
+    )
+    return parser.parse_args()
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    args = _parse_args()
+    main(
+        workers=args.workers,
+        etapas=args.etapas,
+        provedor=args.provedor,
+        universo=args.universo,
+        prometheus=args.prometheus,
+        cambio_triangulado=args.cambio_triangulado,
+    )
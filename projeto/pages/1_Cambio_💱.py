@@ -10,6 +10,9 @@ project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..
 sys.path.insert(0, project_root)
 
 from projeto.etl.cambio import obter_variacao_cambio, baixar_historico_cambio
+from projeto.etl.armazenamento import ler_historico
+from projeto.etl.variacoes import obter_metricas_periodo
+from projeto.etl.conversao import obter_taxas, MOEDA_BASE
 from projeto.style.style_config import apply_custom_style, COLORS, add_footer
 
 # Aplicar estilo customizado
@@ -22,18 +25,13 @@ st.title("Câmbio em relação ao real(R$) 💱")
 #     st.warning('Baixando histórico do câmbio... Isso pode levar alguns minutos.')
 #     baixar_historico_cambio()
 
-# Obter caminho absoluto para o arquivo
-historico_path = os.path.join(project_root, "results", "historico_cambio.csv")
-
-# Carregar dados históricos
-df_cambio = pd.read_csv(historico_path)
-
 # Variável para armazenar o período selecionado
 if "periodo_analise" not in st.session_state:
     st.session_state.periodo_analise = "1y"
 
 # Criar dicionário de moedas (Nome -> Símbolo)
-moedas_dict = df_cambio.groupby('Nome_Moeda')['Simbolo'].first().to_dict()
+df_moedas = ler_historico("historico_cambio", colunas=["Simbolo", "Nome_Moeda"])
+moedas_dict = df_moedas.groupby('Nome_Moeda', observed=True)['Simbolo'].first().to_dict()
 
 # Campo de seleção da moeda usando o nome
 nome_moeda_selecionada = st.selectbox("Selecione uma moeda:", list(moedas_dict.keys()))
@@ -53,31 +51,29 @@ with col3:
     if st.button("Anual"):
         st.session_state.periodo_analise = "1y"
 
-# Filtrar dados da moeda selecionada
-dados_moeda = df_cambio[df_cambio["Simbolo"] == moeda_selecionada].copy()
-dados_moeda["Data"] = pd.to_datetime(dados_moeda["Data"])
-dados_moeda = dados_moeda.sort_values("Data")
-
-# Filtrar por período e criar gráfico
-data_atual = pd.to_datetime(dados_moeda["Data"].max())
+# Métricas do período (lidas dos agregados materializados pelo ETL)
+metricas = obter_metricas_periodo("historico_cambio", moeda_selecionada, st.session_state.periodo_analise)
 if st.session_state.periodo_analise == "1d":
-    data_inicio = data_atual - timedelta(days=30)
     titulo_periodo = "Últimos 30 dias"
 elif st.session_state.periodo_analise == "1mo":
-    data_inicio = data_atual - timedelta(days=30 * 12)
     titulo_periodo = "Variação Mensal"
 else:
-    data_inicio = data_atual - timedelta(days=365 * 3)
     titulo_periodo = "Variação Anual"
 
-dados_moeda = dados_moeda[dados_moeda["Data"] >= data_inicio]
-dados_moeda = dados_moeda.set_index("Data")
+# Filtrar dados da moeda selecionada no período
+if metricas is not None:
+    dados_moeda = ler_historico(
+        "historico_cambio",
+        simbolos=[moeda_selecionada],
+        data_inicio=metricas["data_inicio"],
+        colunas=["Data", "Preco"],
+    )
+    dados_moeda = dados_moeda.sort_values("Data").set_index("Data")
+else:
+    dados_moeda = pd.DataFrame()
 
 # Plotar gráfico de linha
-nome_moeda = (
-    dados_moeda["Nome_Moeda"].iloc[0] if not dados_moeda.empty else moeda_selecionada
-)
-st.subheader(f"Evolução do Preço - {nome_moeda} ({titulo_periodo})")
+st.subheader(f"Evolução do Preço - {nome_moeda_selecionada} ({titulo_periodo})")
 
 if not dados_moeda.empty:
     fig = go.Figure()
@@ -107,13 +103,13 @@ if not dados_moeda.empty:
     with col1:
         st.metric(
             label="Preço Atual",
-            value=f"R$ {dados_moeda['Preco'].iloc[-1]:.2f}",
-            delta=f"{dados_moeda['Variacao'].iloc[-1]:.2f}%",
+            value=f"R$ {metricas['preco_atual']:.2f}",
+            delta=f"{metricas['variacao_atual']:.2f}%",
         )
     with col2:
-        st.metric(label="Preço Máximo", value=f"R$ {dados_moeda['Preco'].max():.2f}")
+        st.metric(label="Preço Máximo", value=f"R$ {metricas['preco_maximo']:.2f}")
     with col3:
-        st.metric(label="Preço Mínimo", value=f"R$ {dados_moeda['Preco'].min():.2f}")
+        st.metric(label="Preço Mínimo", value=f"R$ {metricas['preco_minimo']:.2f}")
 
     st.info(
         f"Período: {dados_moeda.index[0].strftime('%d/%m/%Y')} até {dados_moeda.index[-1].strftime('%d/%m/%Y')}"
@@ -127,8 +123,11 @@ variacoes = obter_variacao_cambio(st.session_state.periodo_analise)
 if not variacoes.empty:
     st.subheader(f"Variação das Moedas ({titulo_periodo})")
 
-    # Definir a ordem desejada para a primeira coluna
-    primeira_coluna = ["Dólar Americano", "Euro", "Libra Esterlina"]
+    # Definir a ordem desejada para a primeira coluna (apenas as moedas configuradas)
+    primeira_coluna = [
+        nome for nome in ["Dólar Americano", "Euro", "Libra Esterlina"]
+        if nome in set(variacoes["Nome"])
+    ]
 
     # Separar as moedas da primeira coluna
     moedas_primeira_coluna = variacoes[variacoes["Nome"].isin(primeira_coluna)]
@@ -175,5 +174,58 @@ if not variacoes.empty:
 else:
     st.warning("Não há dados disponíveis.")
 
+# Pares cruzados entre quaisquer duas moedas, triangulados pelo Real
+st.subheader(f"Pares Cruzados ({titulo_periodo})")
+
+codigos_moedas = {nome: simbolo[:3] for nome, simbolo in moedas_dict.items()}
+codigos_moedas["Real"] = MOEDA_BASE
+nomes_moedas = list(codigos_moedas)
+
+col1, col2 = st.columns(2)
+with col1:
+    nome_moeda_cruzada = st.selectbox("Moeda:", nomes_moedas, index=nomes_moedas.index(nome_moeda_selecionada))
+with col2:
+    outras = [nome for nome in nomes_moedas if nome != nome_moeda_cruzada]
+    nome_moeda_cotacao = st.selectbox("Cotada em:", outras, index=0)
+
+moeda_cruzada = codigos_moedas[nome_moeda_cruzada]
+moeda_cotacao = codigos_moedas[nome_moeda_cotacao]
+dados_par = obter_taxas(moeda_cruzada, moeda_cotacao)
+if metricas is not None:
+    dados_par = dados_par[dados_par["Data"] >= metricas["data_inicio"]]
+
+if not dados_par.empty:
+    fig = go.Figure()
+    fig.add_trace(
+        go.Scatter(
+            x=dados_par["Data"],
+            y=dados_par["Taxa"],
+            mode="lines",
+            name=f"{moeda_cruzada}/{moeda_cotacao}",
+            line=dict(color=COLORS["primary"]),
+        )
+    )
+    fig.update_layout(
+        xaxis_title="Data",
+        yaxis_title=f"{moeda_cotacao} por {moeda_cruzada}",
+        showlegend=True,
+        plot_bgcolor=COLORS["background_graph"],
+        paper_bgcolor=COLORS["background_graph"],
+        font=dict(color=COLORS["text"]),
+        xaxis=dict(gridcolor=COLORS["dark_blue"], zerolinecolor=COLORS["dark_blue"]),
+        yaxis=dict(gridcolor=COLORS["dark_blue"], zerolinecolor=COLORS["dark_blue"]),
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+    taxa_inicial = dados_par["Taxa"].iloc[0]
+    taxa_atual = dados_par["Taxa"].iloc[-1]
+    st.metric(
+        label=f"{nome_moeda_cruzada} em {nome_moeda_cotacao}",
+        value=f"{taxa_atual:.4f}",
+        delta=f"{(taxa_atual / taxa_inicial - 1) * 100:.2f}%",
+    )
+else:
+    st.warning("Não há dados disponíveis para este par no período selecionado.")
+
 # Adicionar footer padronizado
 add_footer()
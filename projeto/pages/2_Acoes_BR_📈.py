@@ -11,6 +11,8 @@ project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..
 sys.path.insert(0, project_root)
 
 from projeto.etl.acoes import obter_melhores_e_piores_acoes, baixar_historico_acoes
+from projeto.etl.armazenamento import ler_historico
+from projeto.etl.variacoes import obter_metricas_periodo
 from projeto.style.style_config import apply_custom_style, COLORS, add_footer
 
 # Aplicar estilo customizado
@@ -18,18 +20,12 @@ apply_custom_style()
 
 st.title("Ações Brasileiras 📈")
 
-# Obter caminho absoluto para o arquivo
-historico_path = os.path.join(project_root, 'results', 'historico_acoes.csv')
-
-# Carregar dados históricos
-df_acoes = pd.read_csv(historico_path)
-
 # Variável para armazenar o período selecionado
 if 'periodo_analise' not in st.session_state:
     st.session_state.periodo_analise = '1y'
 
 # Carregar lista de ações únicas
-acoes = df_acoes['Simbolo'].unique().tolist()
+acoes = ler_historico('historico_acoes', colunas=['Simbolo'])['Simbolo'].unique().tolist()
 
 # Campo de seleção da ação
 acao_selecionada = st.selectbox('Selecione uma ação:', acoes)
@@ -46,25 +42,26 @@ with col3:
     if st.button('Anual'):
         st.session_state.periodo_analise = '1y'
 
-# Filtrar dados da ação selecionada
-dados_acao = df_acoes[df_acoes['Simbolo'] == acao_selecionada].copy()
-dados_acao['Data'] = pd.to_datetime(dados_acao['Data'])
-dados_acao = dados_acao.sort_values('Data')
-
-# Filtrar por período e criar gráfico
-data_atual = pd.to_datetime(dados_acao['Data'].max())
+# Métricas do período (lidas dos agregados materializados pelo ETL)
+metricas = obter_metricas_periodo('historico_acoes', acao_selecionada, st.session_state.periodo_analise)
 if st.session_state.periodo_analise == '1d':
-    data_inicio = data_atual - timedelta(days=30)
     titulo_periodo = 'Últimos 30 dias'
 elif st.session_state.periodo_analise == '1mo':
-    data_inicio = data_atual - timedelta(days=30 * 12)
     titulo_periodo = 'Variação Mensal'
 else:
-    data_inicio = data_atual - timedelta(days=365 * 3)
     titulo_periodo = 'Variação Anual'
 
-dados_acao = dados_acao[dados_acao['Data'] >= data_inicio]
-dados_acao = dados_acao.set_index('Data')
+# Filtrar dados da ação selecionada no período
+if metricas is not None:
+    dados_acao = ler_historico(
+        'historico_acoes',
+        simbolos=[acao_selecionada],
+        data_inicio=metricas['data_inicio'],
+        colunas=['Data', 'Preco']
+    )
+    dados_acao = dados_acao.sort_values('Data').set_index('Data')
+else:
+    dados_acao = pd.DataFrame()
 
 # Plotar gráfico de linha
 st.subheader(f'Evolução do Preço - {acao_selecionada} ({titulo_periodo})')
@@ -100,18 +97,18 @@ if not dados_acao.empty:
     with col1:
         st.metric(
             label="Preço Atual",
-            value=f"R$ {dados_acao['Preco'].iloc[-1]:.2f}",
-            delta=f"{dados_acao['Variacao'].iloc[-1]:.2f}%"
+            value=f"R$ {metricas['preco_atual']:.2f}",
+            delta=f"{metricas['variacao_atual']:.2f}%"
         )
     with col2:
         st.metric(
             label="Preço Máximo",
-            value=f"R$ {dados_acao['Preco'].max():.2f}"
+            value=f"R$ {metricas['preco_maximo']:.2f}"
         )
     with col3:
         st.metric(
             label="Preço Mínimo",
-            value=f"R$ {dados_acao['Preco'].min():.2f}"
+            value=f"R$ {metricas['preco_minimo']:.2f}"
         )
     
     st.info(f'Período: {dados_acao.index[0].strftime("%d/%m/%Y")} até {dados_acao.index[-1].strftime("%d/%m/%Y")}')
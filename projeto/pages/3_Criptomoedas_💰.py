@@ -10,6 +10,9 @@ project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..
 sys.path.insert(0, project_root)
 
 from projeto.etl.criptomoedas import obter_melhores_e_piores_cripto, baixar_historico_cripto, get_usdbrl_rate
+from projeto.etl.armazenamento import ler_historico
+from projeto.etl.variacoes import obter_metricas_periodo
+from projeto.etl.conversao import obter_historico_convertido
 from projeto.style.style_config import apply_custom_style, COLORS, add_footer
 
 # Aplicar estilo customizado
@@ -22,18 +25,12 @@ st.title("Criptomoedas 💰")
 #     st.warning('Baixando histórico das criptomoedas... Isso pode levar alguns minutos.')
 #     baixar_historico_cripto()
 
-# Obter caminho absoluto para o arquivo
-historico_path = os.path.join(project_root, 'results', 'historico_criptomoedas.csv')
-
-# Carregar dados históricos
-df_cripto = pd.read_csv(historico_path)
-
 # Variável para armazenar o período selecionado
 if 'periodo_analise' not in st.session_state:
     st.session_state.periodo_analise = '1y'
 
 # Carregar lista de criptomoedas únicas
-criptos = df_cripto['Simbolo'].unique().tolist()
+criptos = ler_historico('historico_criptomoedas', colunas=['Simbolo'])['Simbolo'].unique().tolist()
 
 # Campo de seleção da criptomoeda
 cripto_selecionada = st.selectbox('Selecione uma criptomoeda:', criptos)
@@ -50,25 +47,31 @@ with col3:
     if st.button('Anual'):
         st.session_state.periodo_analise = '1y'
 
-# Filtrar dados da criptomoeda selecionada
-dados_cripto = df_cripto[df_cripto['Simbolo'] == cripto_selecionada].copy()
-dados_cripto['Data'] = pd.to_datetime(dados_cripto['Data'])
-dados_cripto = dados_cripto.sort_values('Data')
+# Moeda do gráfico (BRL convertido pela cotação do dólar de cada dia)
+moeda = st.radio('Moeda:', ['USD', 'BRL'], horizontal=True)
+
+# Obter taxa de câmbio atual
+taxa_usdbrl = get_usdbrl_rate()
 
-# Filtrar por período e criar gráfico
-data_atual = pd.to_datetime(dados_cripto['Data'].max())
+# Métricas do período (lidas dos agregados materializados pelo ETL)
+metricas = obter_metricas_periodo('historico_criptomoedas', cripto_selecionada, st.session_state.periodo_analise)
 if st.session_state.periodo_analise == '1d':
-    data_inicio = data_atual - timedelta(days=30)
     titulo_periodo = 'Últimos 30 dias'
 elif st.session_state.periodo_analise == '1mo':
-    data_inicio = data_atual - timedelta(days=30 * 12)  # Último ano por mês
-    titulo_periodo = 'Variação Mensal'
+    titulo_periodo = 'Variação Mensal'  # Último ano por mês
 else:  # '1y'
-    data_inicio = data_atual - timedelta(days=365 * 3)  # Últimos 3 anos
-    titulo_periodo = 'Variação Anual'
+    titulo_periodo = 'Variação Anual'  # Últimos 3 anos
 
-dados_cripto = dados_cripto[dados_cripto['Data'] >= data_inicio]
-dados_cripto = dados_cripto.set_index('Data')
+# Filtrar dados da criptomoeda selecionada no período, em USD e em BRL
+def historico_no_periodo(moeda_historico):
+    historico = obter_historico_convertido('historico_criptomoedas', cripto_selecionada, moeda_historico)
+    return historico.loc[historico['Data'] >= metricas['data_inicio']].set_index('Data')
+
+if metricas is not None:
+    dados_cripto = historico_no_periodo(moeda)
+    dados_cripto_brl = historico_no_periodo('BRL')
+else:
+    dados_cripto = pd.DataFrame()
 
 # Plotar gráfico de linha
 st.subheader(f'Evolução do Preço - {cripto_selecionada} ({titulo_periodo})')
@@ -83,7 +86,7 @@ if not dados_cripto.empty:
     ))
     fig.update_layout(
         xaxis_title='Data',
-        yaxis_title='Preço (USD)',
+        yaxis_title=f'Preço ({moeda})',
         showlegend=True,
         plot_bgcolor=COLORS['background_graph'],
         paper_bgcolor=COLORS['background_graph'],
@@ -101,25 +104,23 @@ if not dados_cripto.empty:
     
     # Exibir informações adicionais
     col1, col2, col3 = st.columns(3)
-    # Obter taxa de câmbio atual
-    taxa_usdbrl = get_usdbrl_rate()
     
     with col1:
-        preco_usd = dados_cripto['Preco'].iloc[-1]
+        preco_usd = metricas['preco_atual']
         preco_brl = preco_usd * taxa_usdbrl
         
         # Mostrar valor em USD e BRL com o mesmo estilo
         st.metric(
             label="Preço Atual",
             value=f"USD {preco_usd:.2f}",
-            delta=f"{dados_cripto['Variacao'].iloc[-1]:.2f}%"
+            delta=f"{metricas['variacao_atual']:.2f}%"
         )
         
         # Mostrar valor em BRL com estilo semelhante ao USD
         st.markdown(f"<div style='font-size: 1.5rem; font-weight: 600; margin-top: -15px;'>BRL {preco_brl:.2f}</div>", unsafe_allow_html=True)
     with col2:
-        preco_max_usd = dados_cripto['Preco'].max()
-        preco_max_brl = preco_max_usd * taxa_usdbrl
+        preco_max_usd = metricas['preco_maximo']
+        preco_max_brl = dados_cripto_brl['Preco'].max()
         
         st.metric(
             label="Preço Máximo",
@@ -129,8 +130,8 @@ if not dados_cripto.empty:
         # Mostrar valor em BRL com estilo semelhante ao USD
         st.markdown(f"<div style='font-size: 1.5rem; font-weight: 600; margin-top: -15px;'>BRL {preco_max_brl:.2f}</div>", unsafe_allow_html=True)
     with col3:
-        preco_min_usd = dados_cripto['Preco'].min()
-        preco_min_brl = preco_min_usd * taxa_usdbrl
+        preco_min_usd = metricas['preco_minimo']
+        preco_min_brl = dados_cripto_brl['Preco'].min()
         
         st.metric(
             label="Preço Mínimo",
@@ -15,6 +15,7 @@ project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..
 sys.path.insert(0, project_root)
 
 from projeto.style.style_config import apply_custom_style, COLORS, add_footer
+from projeto.etl.armazenamento import ler_historico
 
 # Aplicar estilo customizado
 apply_custom_style()
@@ -88,17 +89,13 @@ def formatar_valor(valor, tipo):
 
 @st.cache_data
 def carregar_dados():
-    """Carrega e pré-processa os dados econômicos do arquivo CSV.
+    """Carrega e pré-processa os dados econômicos salvos pelo ETL.
 
     Returns:
         dict: Um dicionário onde as chaves são os nomes dos indicadores
               e os valores são os DataFrames correspondentes.
     """
-    dados_path = os.path.join(project_root, "results", "dados_economicos.csv")
-
-    df = pd.read_csv(dados_path)
-    df.rename(columns={"Unnamed: 0": "Date"}, inplace=True)
-    df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
+    df = ler_historico("dados_economicos")
 
     # Criar DataFrames individuais para cada indicador
     selic_df = df[["Date", "SELIC"]].copy()
@@ -520,8 +517,6 @@ with tab1:
 
         # Preparando os dados de acordo com a frequência
         if info["tipo_variacao"] == "mensal":
-            # Convertendo para datetime
-            df_indicador["Date"] = pd.to_datetime(df_indicador["Date"])
             # Agrupando por mês e pegando o último valor de cada mês
             dados_agrupados = (
                 df_indicador.set_index("Date")
@@ -531,8 +526,6 @@ with tab1:
             )
             dados_agrupados = dados_agrupados.dropna()
         elif info["tipo_variacao"] == "anual":
-            # Convertendo para datetime
-            df_indicador["Date"] = pd.to_datetime(df_indicador["Date"])
             # Agrupando por ano e pegando o último valor de cada ano
             dados_agrupados = (
                 df_indicador.set_index("Date")
@@ -597,8 +590,6 @@ with tab2:
 
         # Tratamento para frequência mensal
         if info["tipo_variacao"] == "mensal":
-            # Convertendo para datetime
-            df_indicador["Date"] = pd.to_datetime(df_indicador["Date"])
             # Agrupando por mês e pegando o último valor de cada mês
             df_indicador = (
                 df_indicador.set_index("Date")
@@ -0,0 +1,17 @@
+import os
+import sys
+import pytest
+
+# Os módulos do ETL são importados como 'etl.*' a partir de projeto/.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+@pytest.fixture(autouse=True)
+def diretorio_resultados(tmp_path, monkeypatch):
+    """
+    Isola os arquivos gerados por cada teste em um diretório temporário, sem
+    cache de respostas nem acesso à rede.
+    """
+    monkeypatch.setenv('PUCINVEST_RESULTS_DIR', str(tmp_path))
+    monkeypatch.setenv('PUCINVEST_CACHE', 'desligado')
+    return tmp_path
@@ -0,0 +1,29 @@
+import pytest
+from etl import acoes
+from etl.armazenamento import ler_historico
+from etl.catalogo import registrar_artefato
+from etl.provedores import ProvedorSintetico, definir_provedor_mercado, obter_provedor_mercado
+
+
+@pytest.fixture(autouse=True)
+def provedor():
+    anterior = obter_provedor_mercado()
+    definir_provedor_mercado(ProvedorSintetico(data_final='2024-12-31', anos_historico=1))
+    yield
+    definir_provedor_mercado(anterior)
+
+
+def test_sem_carteira_no_catalogo():
+    assert acoes.baixar_historico_acoes() == 0
+
+
+def test_carteira_do_catalogo(diretorio_resultados):
+    caminho = diretorio_resultados / 'IBXLDia_18-10-26.csv'
+    caminho.write_text('IBXL - Carteira do Dia 18-10-26\nCódigo\nSIN0001\nSIN0002\nSIN0003\n', encoding='UTF-8')
+    registrar_artefato('ibrx50', str(caminho), 'ibrx50')
+
+    linhas = acoes.baixar_historico_acoes(workers=2)
+
+    df = ler_historico('historico_acoes', colunas=['Simbolo'])
+    assert linhas == len(df) > 0
+    assert set(df['Simbolo'].astype(str)) == {'SIN0001', 'SIN0002', 'SIN0003'}
@@ -0,0 +1,90 @@
+import json
+import base64
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from etl import api_ibrx50, resiliencia, scraping_ibrx50
+
+ATIVOS = [
+    {"cod": f"ATV{i}", "asset": f"ATIVO {i}", "type": "ON", "theoricalQty": "1.000", "part": "2,000"}
+    for i in range(1, 6)
+]
+
+
+class ServidorB3(BaseHTTPRequestHandler):
+    """
+    Responde como o GetPortfolioDay da B3, paginando ATIVOS, ou com `status` de erro.
+    """
+
+    status = 200
+    requisicoes = []
+
+    def do_GET(self):
+        parametros = json.loads(base64.b64decode(self.path.rsplit('/', 1)[-1]))
+        self.requisicoes.append(parametros)
+        if self.status != 200:
+            self.send_error(self.status)
+            return
+
+        pagina, tamanho = parametros['pageNumber'], parametros['pageSize']
+        corpo = json.dumps({
+            "page": {"pageNumber": pagina, "totalPages": -(-len(ATIVOS) // tamanho)},
+            "results": ATIVOS[(pagina - 1) * tamanho:pagina * tamanho],
+        }).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def servidor(monkeypatch):
+    # Sem espera entre as tentativas e com o disjuntor da B3 zerado.
+    config = dict(resiliencia.CONFIG_PROVEDORES['b3'], espera_base=0.0, espera_maxima=0.0, taxa=100)
+    monkeypatch.setitem(resiliencia._provedores, 'b3', resiliencia.Provedor('b3', **config))
+
+    ServidorB3.status = 200
+    ServidorB3.requisicoes = []
+    http = ThreadingHTTPServer(('127.0.0.1', 0), ServidorB3)
+    thread = threading.Thread(target=http.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv('PUCINVEST_B3_URL', f"http://127.0.0.1:{http.server_port}/GetPortfolioDay")
+    yield ServidorB3
+    http.shutdown()
+    http.server_close()
+
+
+def test_composicao_paginada(servidor):
+    df = api_ibrx50.buscar_composicao_ibrx50(tamanho_pagina=2)
+
+    assert list(df.columns) == api_ibrx50.COLUNAS_COMPOSICAO
+    assert df['Código'].tolist() == [ativo['cod'] for ativo in ATIVOS]
+    assert [requisicao['pageNumber'] for requisicao in servidor.requisicoes] == [1, 2, 3]
+    assert servidor.requisicoes[0]['index'] == 'IBXL'
+
+
+def test_status_de_erro(servidor):
+    servidor.status = 503
+    with pytest.raises(Exception, match='503'):
+        api_ibrx50.buscar_composicao_ibrx50()
+    assert len(servidor.requisicoes) == resiliencia.CONFIG_PROVEDORES['b3']['tentativas']
+
+
+def test_erro_na_api_usa_o_navegador(servidor, monkeypatch):
+    chamadas = []
+    monkeypatch.setattr(scraping_ibrx50, 'download_ibrx50_data', lambda: chamadas.append(1) or 'IBXLDia.csv')
+
+    assert api_ibrx50.obter_composicao_ibrx50() is not None
+    assert chamadas == []
+
+    servidor.status = 500
+    assert api_ibrx50.obter_composicao_ibrx50() is None
+    assert chamadas == [1]
+
+    monkeypatch.setattr(scraping_ibrx50, 'download_ibrx50_data', lambda: None)
+    with pytest.raises(RuntimeError):
+        api_ibrx50.obter_composicao_ibrx50()
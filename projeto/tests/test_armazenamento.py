@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+from etl.armazenamento import EscritorHistorico, ler_historico
+
+
+def _historico(datas, precos):
+    return pd.DataFrame({
+        'Data': pd.to_datetime(datas),
+        'Simbolo': 'ATIVO',
+        'Nome_Empresa': 'ATIVO',
+        'Preco': precos,
+        'Volume': 1000,
+    })
+
+
+def test_incremental_recalcula_variacao_apenas_na_sobreposicao():
+    datas = pd.bdate_range('2024-01-01', periods=10)
+    with EscritorHistorico('historico_acoes') as escritor:
+        escritor.escrever(_historico(datas, np.arange(10.0, 20.0)))
+    anterior = ler_historico('historico_acoes')
+
+    # Nova carga a partir da 8ª data, com o preço dela corrigido e uma data nova.
+    novas = datas[7:].append(pd.DatetimeIndex([datas[-1] + pd.offsets.BDay()]))
+    with EscritorHistorico('historico_acoes', incremental=True) as escritor:
+        escritor.escrever(_historico(novas, [17.5, 18.0, 19.0, 21.0]))
+    df = ler_historico('historico_acoes')
+
+    assert len(df) == 11
+    pd.testing.assert_series_equal(df['Variacao'].iloc[:7], anterior['Variacao'].iloc[:7])
+    esperada = (df['Preco'].astype('float64').pct_change() * 100).iloc[7:]
+    np.testing.assert_allclose(df['Variacao'].iloc[7:], esperada, rtol=1e-5)
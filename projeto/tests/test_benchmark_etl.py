@@ -0,0 +1,30 @@
+import os
+import sys
+import json
+import subprocess
+
+BENCHMARK = os.path.join(os.path.dirname(__file__), '..', 'benchmark_etl.py')
+
+
+def _executar(tmp_path, *argumentos):
+    saida = tmp_path / 'benchmark.json'
+    processo = subprocess.run(
+        [sys.executable, BENCHMARK, '--anos', '0.1', '--workers', '2', '--tamanhos-lote', '25',
+         '--latencia', '0', '--saida', str(saida), *argumentos],
+        capture_output=True, text=True,
+    )
+    with open(saida, 'r', encoding='UTF-8') as file:
+        return processo, json.load(file)['resultados']
+
+
+def test_benchmark_com_poucos_simbolos(tmp_path):
+    processo, resultados = _executar(tmp_path, '--cenarios', 'etl', 'acoes', 'cambio', '--simbolos', '5')
+    assert processo.returncode == 0, processo.stdout
+    assert [r['cenario'] for r in resultados] == ['etl', 'acoes', 'cambio']
+    assert all('erro' not in r and r['linhas'] > 0 for r in resultados)
+
+
+def test_benchmark_falha_sem_linhas(tmp_path):
+    processo, resultados = _executar(tmp_path, '--cenarios', 'acoes', '--simbolos', '0')
+    assert processo.returncode != 0
+    assert resultados[0]['erro'] == 'nenhuma linha produzida'
@@ -0,0 +1,44 @@
+import os
+import time
+import pandas as pd
+from etl import cache
+
+
+def test_chave_com_datas_relativas_a_hoje():
+    chave = {'ticker': 'PETR4.SA', 'start': '2016-10-20'}
+    normalizada = cache._normalizar_chave(chave, hoje='2026-10-18')
+
+    assert normalizada == {'ticker': 'PETR4.SA', 'start': 'hoje-3650d'}
+    # A mesma janela pedida no dia seguinte cai na mesma entrada.
+    assert cache._normalizar_chave({'ticker': 'PETR4.SA', 'start': '2016-10-21'}, hoje='2026-10-19') == normalizada
+
+
+def test_reproduz_resposta_gravada_em_outro_dia(monkeypatch):
+    inicio = (pd.Timestamp.now() - pd.Timedelta(days=3650)).strftime('%Y-%m-%d')
+    resposta = pd.DataFrame({'Close': [1.0, 2.0]})
+
+    monkeypatch.setenv('PUCINVEST_CACHE', 'gravar')
+    cache.consultar('yf_history', {'ticker': 'PETR4.SA', 'start': inicio}, lambda: resposta)
+
+    # No dia seguinte o carregador pede a janela deslocada em um dia.
+    amanha = pd.Timestamp.now() + pd.Timedelta(days=1)
+    monkeypatch.setattr(cache.pd.Timestamp, 'now', staticmethod(lambda: amanha))
+    inicio_amanha = (amanha - pd.Timedelta(days=3650)).strftime('%Y-%m-%d')
+
+    monkeypatch.setenv('PUCINVEST_CACHE', 'reproduzir')
+    reproduzida = cache.consultar('yf_history', {'ticker': 'PETR4.SA', 'start': inicio_amanha}, lambda: None)
+    pd.testing.assert_frame_equal(reproduzida, resposta)
+
+
+def test_remover_expirados(monkeypatch):
+    monkeypatch.setenv('PUCINVEST_CACHE', 'normal')
+    cache.consultar('yf_cotacao', {'ticker': 'A'}, lambda: pd.DataFrame({'Close': [1.0]}))
+    cache.consultar('yf_history', {'ticker': 'A', 'start': '2020-01-01'}, lambda: pd.DataFrame({'Close': [1.0]}))
+
+    antigo = time.time() - 120
+    caminho_cotacao = cache._caminho_resposta('yf_cotacao', {'ticker': 'A'})
+    os.utime(caminho_cotacao, (antigo, antigo))
+
+    assert cache.remover_expirados() == 1
+    assert not os.path.exists(caminho_cotacao)
+    assert os.path.exists(cache._caminho_resposta('yf_history', {'ticker': 'A', 'start': '2020-01-01'}))
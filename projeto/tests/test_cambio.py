@@ -0,0 +1,34 @@
+import json
+import pytest
+from etl import cambio
+from etl.armazenamento import ler_historico
+from etl.provedores import ProvedorSintetico, definir_provedor_mercado, obter_provedor_mercado
+
+CODIGOS = ['USD', 'EUR', 'GBP', 'JPY', 'CHF', 'CNY', 'AUD', 'CAD', 'ARS', 'CLP', 'MXN', 'COP',
+           'PEN', 'UYU', 'SEK', 'NOK', 'DKK', 'PLN', 'CZK', 'HUF', 'ZAR', 'INR', 'KRW', 'SGD']
+
+
+@pytest.fixture
+def moedas(tmp_path, monkeypatch):
+    anterior = obter_provedor_mercado()
+    definir_provedor_mercado(ProvedorSintetico(data_final='2024-12-31', anos_historico=1))
+    caminho = tmp_path / 'moedas.json'
+    caminho.write_text(json.dumps({codigo: f"Moeda {codigo}" for codigo in CODIGOS}), encoding='UTF-8')
+    monkeypatch.setenv('PUCINVEST_MOEDAS', str(caminho))
+    yield {f"{codigo}BRL=X" for codigo in CODIGOS}
+    definir_provedor_mercado(anterior)
+
+
+@pytest.mark.parametrize('triangular', [False, True])
+def test_moedas_configuradas(moedas, triangular):
+    assert cambio.baixar_historico_cambio(workers=2, triangular=triangular) > 0
+
+    df = ler_historico('historico_cambio', colunas=['Simbolo', 'Nome_Moeda'])
+    assert set(df['Simbolo'].astype(str)) == moedas
+    assert set(df['Nome_Moeda'].astype(str)) == {f"Moeda {codigo}" for codigo in CODIGOS}
+
+
+def test_moedas_padrao():
+    moedas = cambio.carregar_moedas()
+    assert moedas['USD'] == 'Dólar Americano'
+    assert len(moedas) == 8
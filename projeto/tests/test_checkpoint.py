@@ -0,0 +1,122 @@
+import os
+import time
+import pandas as pd
+import pytest
+from etl import acoes
+from etl.cache import consultar, remover_expirados, _caminho_resposta, TTL_ENDPOINTS
+from etl.checkpoint import Checkpoint
+from etl.historico import iterar_lotes
+from etl.provedores import ProvedorSintetico, definir_provedor_mercado, obter_provedor_mercado
+
+
+def _arquivos(diretorio):
+    return sorted(
+        os.path.relpath(os.path.join(raiz, arquivo), diretorio)
+        for raiz, _, arquivos in os.walk(diretorio) for arquivo in arquivos
+    )
+
+
+def test_checkpoint_aponta_para_o_cache(diretorio_resultados, monkeypatch):
+    monkeypatch.setenv('PUCINVEST_CACHE', 'normal')
+    resposta = pd.DataFrame({'Close': [1.0, 2.0]})
+    chamadas = []
+
+    def buscar():
+        chamadas.append(1)
+        return consultar('yf_history', {'ticker': 'PETR4.SA', 'start': '2020-01-01'}, lambda: resposta)
+
+    Checkpoint('historico_acoes').obter('PETR4.SA', '2020-01-01', buscar)
+
+    # Nenhuma cópia do resultado no checkpoint, apenas o manifesto.
+    assert _arquivos(os.path.join(diretorio_resultados, 'checkpoints')) == [
+        os.path.join('historico_acoes', pd.Timestamp.now().strftime('%Y-%m-%d'), 'manifesto.json')
+    ]
+
+    # Uma nova execução reaproveita a resposta do cache sem buscar de novo.
+    checkpoint = Checkpoint('historico_acoes')
+    df = checkpoint.obter('PETR4.SA', '2020-01-01', buscar)
+    pd.testing.assert_frame_equal(df, resposta)
+    assert len(chamadas) == 1
+    assert checkpoint.reaproveitados == 1
+
+
+def test_resposta_removida_do_cache_e_buscada_de_novo(monkeypatch):
+    monkeypatch.setenv('PUCINVEST_CACHE', 'normal')
+    chave = {'ticker': 'PETR4.SA', 'start': '2020-01-01'}
+    chamadas = []
+
+    def buscar():
+        chamadas.append(1)
+        return consultar('yf_history', chave, lambda: pd.DataFrame({'Close': [float(len(chamadas))]}))
+
+    Checkpoint('historico_acoes').obter('PETR4.SA', '2020-01-01', buscar)
+
+    # A resposta vence o TTL e sai do cache; o manifesto ainda aponta para ela.
+    antigo = time.time() - TTL_ENDPOINTS['yf_history'] - 1
+    os.utime(_caminho_resposta('yf_history', chave), (antigo, antigo))
+    assert remover_expirados() == 1
+
+    checkpoint = Checkpoint('historico_acoes')
+    assert checkpoint.carregar('PETR4.SA', '2020-01-01') is None
+    df = checkpoint.obter('PETR4.SA', '2020-01-01', buscar)
+    assert df['Close'].tolist() == [2.0]
+    assert len(chamadas) == 2 and checkpoint.reaproveitados == 0
+
+
+def test_checkpoint_sem_cache_salva_o_resultado(diretorio_resultados):
+    resposta = pd.DataFrame({'Close': [1.0]})
+    Checkpoint('historico_acoes').obter('PETR4.SA', '2020-01-01', lambda: resposta)
+
+    df = Checkpoint('historico_acoes').carregar('PETR4.SA', '2020-01-01')
+    pd.testing.assert_frame_equal(df, resposta)
+
+
+class ProvedorContado(ProvedorSintetico):
+    """
+    Provedor sintético que registra os lotes pedidos e omite os tickers de `faltando`.
+    """
+
+    def __init__(self, faltando=()):
+        super().__init__(data_final='2024-12-31', anos_historico=1)
+        self.faltando = set(faltando)
+        self.lotes = []
+
+    def historico_em_lote(self, tickers, inicio, workers=4):
+        self.lotes.append(list(tickers))
+        df = super().historico_em_lote(tickers, inicio, workers)
+        return df.drop(columns=list(self.faltando), level=1)
+
+
+@pytest.fixture
+def provedor_contado():
+    anterior = obter_provedor_mercado()
+    yield lambda provedor: definir_provedor_mercado(provedor)
+    definir_provedor_mercado(anterior)
+
+
+def test_lote_sem_cache_registra_cada_ticker(diretorio_resultados, provedor_contado):
+    tickers = [f"{codigo}.SA" for codigo in ProvedorSintetico.universo(25)]
+    provedor = ProvedorContado(faltando={tickers[3]})
+    provedor_contado(provedor)
+
+    partes = list(iterar_lotes(tickers, '2024-01-01', 25, 4, Checkpoint('historico_acoes')))
+    assert set(pd.concat(partes)['Ticker']) == set(tickers) - {tickers[3]}
+
+    # Uma única cópia do lote, com nome curto, e uma entrada por ticker recebido.
+    arquivos = _arquivos(os.path.join(diretorio_resultados, 'checkpoints'))
+    copias = [arquivo for arquivo in arquivos if arquivo.endswith('.pkl')]
+    assert len(arquivos) == 2 and len(copias) == 1
+    assert len(os.path.basename(copias[0])) < 100
+
+    # A próxima execução relê o lote e só baixa o ticker que faltou.
+    checkpoint = Checkpoint('historico_acoes')
+    partes = list(iterar_lotes(tickers, '2024-01-01', 25, 4, checkpoint))
+    assert provedor.lotes[1:] == [[tickers[3]]]
+    assert set(pd.concat(partes)['Ticker']) == set(tickers) - {tickers[3]}
+    assert checkpoint.reaproveitados == 1
+
+
+def test_acoes_em_lote_sem_cache(provedor_contado):
+    provedor_contado(ProvedorSintetico(data_final='2024-12-31', anos_historico=1))
+    linhas = acoes.baixar_historico_acoes(tickers=ProvedorSintetico.universo(20), workers=4)
+    assert linhas > 0
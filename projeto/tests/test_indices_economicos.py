@@ -0,0 +1,58 @@
+from datetime import date
+import pandas as pd
+import pytest
+from etl import indices_economicos
+from etl.provedores import ProvedorSintetico, definir_provedor_mercado, obter_provedor_mercado
+
+SERIES = {
+    'SELIC': {'codigo': 11, 'periodicidade': 'diaria'},
+    'IPCA': {'codigo': 433, 'periodicidade': 'mensal'},
+}
+
+
+class ProvedorComFalha(ProvedorSintetico):
+    """
+    Provedor sintético em que um intervalo da SELIC falha enquanto `falhar` for True.
+    """
+
+    falhar = True
+
+    def serie_sgs(self, nome, codigo, inicio, fim, periodicidade='diaria'):
+        if self.falhar and nome == 'SELIC' and inicio <= date(2022, 1, 1) <= fim:
+            self.chamadas.append((nome, inicio, fim, False))
+            raise ConnectionError("timeout")
+        df = super().serie_sgs(nome, codigo, inicio, fim, periodicidade)
+        self.chamadas.append((nome, inicio, fim, not df.empty))
+        return df
+
+
+@pytest.fixture
+def provedor():
+    anterior = obter_provedor_mercado()
+    provedor = ProvedorComFalha(data_final=date.today())
+    provedor.chamadas = []
+    definir_provedor_mercado(provedor)
+    yield provedor
+    definir_provedor_mercado(anterior)
+
+
+def test_serie_com_intervalo_falho_nao_e_publicada(provedor):
+    with pytest.raises(RuntimeError, match='SELIC'):
+        indices_economicos.buscar_dados_economicos(workers=2, series=SERIES)
+
+    df = pd.read_csv(indices_economicos.caminho_artefato('dados_economicos', 'csv'), index_col='Date')
+    assert 'IPCA' in df.columns
+    assert 'SELIC' not in df.columns
+
+    chamadas_anteriores = len(provedor.chamadas)
+    provedor.falhar = False
+    df_final = indices_economicos.buscar_dados_economicos(workers=2, series=SERIES)
+
+    # A próxima execução busca de novo apenas os intervalos da SELIC sem
+    # checkpoint: o que falhou (e algum que tenha vindo vazio).
+    salvos = {(inicio, fim) for nome, inicio, fim, com_dados in provedor.chamadas[:chamadas_anteriores]
+              if nome == 'SELIC' and com_dados}
+    novas = [(inicio, fim) for nome, inicio, fim, _ in provedor.chamadas[chamadas_anteriores:] if nome == 'SELIC']
+    assert not salvos & set(novas)
+    assert any(inicio <= date(2022, 1, 1) <= fim for inicio, fim in novas)
+    assert df_final['SELIC'].notna().any()
@@ -0,0 +1,34 @@
+import re
+from etl import instrumentacao
+
+LINHA_AMOSTRA = re.compile(r'^(?P<nome>[a-z_]+)(?P<rotulos>\{.*\})? (?P<valor>\S+)$')
+
+
+def _amostras(conteudo):
+    amostras = []
+    for linha in conteudo.splitlines():
+        if linha and not linha.startswith('#'):
+            encontrada = LINHA_AMOSTRA.match(linha)
+            assert encontrada, linha
+            amostras.append((encontrada['nome'], encontrada['rotulos'] or '', float(encontrada['valor'])))
+    return amostras
+
+
+def test_prometheus_sem_series_duplicadas():
+    etapas = {
+        'indices': {'status': 'sucesso', 'latencia_s': 3.0},
+        'acoes': {'status': 'sucesso', 'latencia_s': 5.0},
+    }
+    # Séries do SGS divididas em intervalos e dois lotes de 25 ações.
+    simbolos = [('indices', 'SELIC', 0.5)] * 6 + [('indices', 'CDI', 0.25)] * 6
+    simbolos += [('acoes', 'lote de 25', 1.0), ('acoes', 'lote de 25', 2.0), ('acoes', 'PETR4.SA', 0.1)]
+
+    amostras = _amostras(instrumentacao.gerar_prometheus(etapas, simbolos, '2026-10-18T10:00:00'))
+
+    series = [(nome, rotulos) for nome, rotulos, _ in amostras]
+    assert len(series) == len(set(series))
+
+    valores = {(nome, rotulos): valor for nome, rotulos, valor in amostras}
+    assert valores[('pucinvest_etl_simbolo_duracao_segundos', '{etapa="indices",simbolo="SELIC"}')] == 3.0
+    assert valores[('pucinvest_etl_simbolo_buscas', '{etapa="indices",simbolo="SELIC"}')] == 6
+    assert valores[('pucinvest_etl_simbolo_duracao_segundos', '{etapa="acoes",simbolo="lote de 25"}')] == 3.0
@@ -0,0 +1,48 @@
+import importlib
+import pytest
+
+
+@pytest.fixture
+def main_process(tmp_path, monkeypatch):
+    # O módulo cria results/ e o log do ETL no diretório atual ao ser importado.
+    monkeypatch.chdir(tmp_path)
+    return importlib.import_module('main_process')
+
+
+def test_falha_de_etapa_ignora_dependentes(main_process):
+    executadas = []
+
+    def falhar():
+        raise RuntimeError("download indisponível")
+
+    def executar(etapa):
+        return lambda: executadas.append(etapa)
+
+    funcoes = {etapa: executar(etapa) for etapa in main_process.ETAPAS}
+    funcoes['ibrx50_download'] = falhar
+
+    resultados = main_process.executar_etapas(list(main_process.ETAPAS), funcoes)
+
+    assert resultados['ibrx50_download']['status'] == 'falha'
+    assert resultados['ibrx50_tratamento']['status'] == 'ignorada'
+    assert resultados['acoes']['status'] == 'ignorada'
+    for etapa in ('cripto', 'cambio', 'indices'):
+        assert resultados[etapa]['status'] == 'sucesso'
+    assert sorted(executadas) == ['cambio', 'cripto', 'indices']
+
+
+def test_carregador_sem_dados_marca_falha(main_process, monkeypatch):
+    monkeypatch.setattr(main_process, 'baixar_dados_ibrx50', lambda: None)
+    monkeypatch.setattr(main_process, 'tratar_dados_ibrx50', lambda df: None)
+    monkeypatch.setattr(main_process, 'baixar_historico_acoes', lambda **kwargs: 100)
+    monkeypatch.setattr(main_process, 'baixar_historico_cripto', lambda **kwargs: 0)
+    monkeypatch.setattr(main_process, 'baixar_historico_cambio', lambda **kwargs: 10)
+
+    etapas = ['ibrx50_download', 'ibrx50_tratamento', 'acoes', 'cripto', 'cambio']
+    resultados = main_process.executar_etapas(etapas, main_process._funcoes_etapas(workers=1))
+
+    assert resultados['ibrx50_download']['status'] == 'sucesso'
+    assert resultados['ibrx50_tratamento']['status'] == 'falha'
+    assert resultados['acoes']['status'] == 'ignorada'
+    assert resultados['cripto']['status'] == 'falha'
+    assert resultados['cambio']['status'] == 'sucesso'
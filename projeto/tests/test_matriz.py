@@ -0,0 +1,32 @@
+import numpy as np
+from etl.matriz import MatrizPrecos, calcular_retornos
+
+
+def test_alinhar_nao_repete_preco_apos_ultima_cotacao():
+    datas = np.array(['2026-01-05', '2026-01-06', '2026-01-07', '2026-01-08'], dtype='datetime64[ns]')
+    # ATIVO deixa de ser cotado depois de 06/01; OUTRO segue até o fim.
+    precos = np.array([
+        [10.0, 1.0],
+        [11.0, 1.1],
+        [np.nan, 1.2],
+        [np.nan, 1.3],
+    ])
+    matriz = MatrizPrecos('historico_teste', 'continuo', datas, ['ATIVO', 'OUTRO'], precos, calcular_retornos(precos))
+
+    destino = np.array(['2026-01-05', '2026-01-06', '2026-01-07', '2026-01-08', '2026-01-09'], dtype='datetime64[ns]')
+    alinhada = matriz.alinhar(destino, 'b3')
+
+    np.testing.assert_array_equal(alinhada.precos[:, 0], [10.0, 11.0, np.nan, np.nan, np.nan])
+    np.testing.assert_array_equal(alinhada.precos[:, 1], [1.0, 1.1, 1.2, 1.3, np.nan])
+    assert np.isnan(alinhada.retornos[2:, 0]).all()
+
+
+def test_alinhar_repete_preco_entre_cotacoes():
+    datas = np.array(['2026-01-02', '2026-01-05'], dtype='datetime64[ns]')
+    precos = np.array([[100.0], [110.0]])
+    matriz = MatrizPrecos('historico_teste', 'b3', datas, ['ATIVO'], precos, calcular_retornos(precos))
+
+    destino = np.array(['2026-01-02', '2026-01-03', '2026-01-04', '2026-01-05'], dtype='datetime64[ns]')
+    alinhada = matriz.alinhar(destino, 'continuo')
+
+    np.testing.assert_array_equal(alinhada.precos[:, 0], [100.0, 100.0, 100.0, 110.0])
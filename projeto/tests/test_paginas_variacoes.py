@@ -0,0 +1,39 @@
+import pandas as pd
+import pytest
+from etl import acoes, criptomoedas, cambio
+from etl.variacoes import obter_variacoes
+from etl.provedores import ProvedorSintetico, definir_provedor_mercado, obter_provedor_mercado
+
+
+@pytest.fixture
+def historicos():
+    anterior = obter_provedor_mercado()
+    definir_provedor_mercado(ProvedorSintetico(data_final='2024-12-31', anos_historico=2))
+    assert acoes.baixar_historico_acoes(tickers=ProvedorSintetico.universo(12), workers=2) > 0
+    assert criptomoedas.baixar_historico_cripto(workers=2) > 0
+    assert cambio.baixar_historico_cambio(workers=2) > 0
+    yield
+    definir_provedor_mercado(anterior)
+
+
+def _variacoes(nome, periodo):
+    df_variacoes = obter_variacoes(nome, periodo)
+    return dict(zip(df_variacoes['Simbolo'], df_variacoes['Variacao'].astype('float64').round(2)))
+
+
+def _exibidas(*tabelas):
+    df = pd.concat(tabelas, ignore_index=True)
+    return dict(zip(df['Símbolo'], df['Variação (%)']))
+
+
+def test_paginas_usam_a_mesma_variacao(historicos):
+    for periodo in ('1d', '1mo', '1y'):
+        esperadas = _variacoes('historico_acoes', periodo)
+        for simbolo, variacao in _exibidas(*acoes.obter_melhores_e_piores_acoes(periodo)).items():
+            assert variacao == esperadas[simbolo]
+
+        esperadas = _variacoes('historico_criptomoedas', periodo)
+        for simbolo, variacao in _exibidas(*criptomoedas.obter_melhores_e_piores_cripto(periodo)).items():
+            assert variacao == esperadas[simbolo]
+
+        assert _exibidas(cambio.obter_variacao_cambio(periodo)) == _variacoes('historico_cambio', periodo)
@@ -0,0 +1,33 @@
+import os
+import pytest
+from etl.catalogo import registrar_artefato, obter_artefato
+from etl.tratar_ibrx50 import processar_ibrx50
+
+CSV_B3 = (
+    "IBXL - Carteira do Dia 17/10/26\n"
+    "Código;Ação;Tipo;Qtde. Teórica;Part. (%);\n"
+    "PETR4;PETROBRAS;PN;4.000.000;10,500;\n"
+    "VALE3;VALE;ON;3.000.000;9,250;\n"
+    "Quantidade Teórica Total;7.000.000;\n"
+    "Redutor;1,0;\n"
+)
+
+
+def test_sem_registro_no_catalogo(diretorio_resultados):
+    # Um CSV solto em results/ não é mais usado como carteira.
+    (diretorio_resultados / 'IBXLDia_17-10-26.csv').write_text(CSV_B3, encoding='UTF-8')
+    with pytest.raises(FileNotFoundError, match='catálogo'):
+        processar_ibrx50()
+
+
+def test_csv_registrado_no_catalogo(diretorio_resultados):
+    caminho = diretorio_resultados / 'IBXLDia_17-10-26.csv'
+    caminho.write_text(CSV_B3, encoding='UTF-8')
+    registrar_artefato('ibrx50_bruto', str(caminho), 'ibrx50_download', data='2026-10-17')
+
+    df = processar_ibrx50()
+
+    assert df['Código'].tolist() == ['PETR4', 'VALE3']
+    registro = obter_artefato('ibrx50')
+    assert registro['data'] == '2026-10-17'
+    assert os.path.exists(registro['caminho'])
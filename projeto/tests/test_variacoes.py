@@ -0,0 +1,23 @@
+import pandas as pd
+import pytest
+from etl import acoes
+from etl.variacoes import obter_variacoes, obter_maiores_variacoes
+from etl.provedores import ProvedorSintetico, definir_provedor_mercado, obter_provedor_mercado
+
+
+@pytest.fixture
+def historico_acoes():
+    anterior = obter_provedor_mercado()
+    definir_provedor_mercado(ProvedorSintetico(data_final='2024-12-31', anos_historico=3))
+    assert acoes.baixar_historico_acoes(tickers=ProvedorSintetico.universo(30), workers=2) > 0
+    yield 'historico_acoes'
+    definir_provedor_mercado(anterior)
+
+
+def test_maiores_variacoes_seguem_obter_variacoes(historico_acoes):
+    for periodo in ('1d', '1mo', '1y'):
+        df_variacoes = obter_variacoes(historico_acoes, periodo)
+        melhores, piores = obter_maiores_variacoes(historico_acoes, periodo, k=5)
+
+        pd.testing.assert_frame_equal(melhores, df_variacoes.head(5).reset_index(drop=True))
+        pd.testing.assert_frame_equal(piores, df_variacoes.tail(5).iloc[::-1].reset_index(drop=True))